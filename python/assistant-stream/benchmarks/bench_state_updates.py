@@ -0,0 +1,153 @@
+"""Benchmark streaming text into the state.
+
+Appends tokens to the content of the last message in messages lists of
+increasing size, the pattern of LangGraph runs, and to a single draft
+string of increasing length. The time per update should grow with neither.
+Also sets a small value nested in the last message. Each benchmark is run
+with the in-place path updates and with the copy-on-update path updates
+they replaced, which copied every container along the path. Appended text
+is joined when read, so appends update the path once and the sets show the
+difference.
+
+Run from python/assistant-stream:
+    PYTHONPATH=src python benchmarks/bench_state_updates.py
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Any, Callable, List
+
+from assistant_stream import state_manager
+from assistant_stream.state_manager import StateManager
+
+TOKENS = 20000
+
+
+def copy_on_update_path(
+    data: Any, path: List[str], updater: Callable[[Any], Any]
+) -> Any:
+    """The previous _update_path, copying every container along the path."""
+    if not path:
+        return updater(data)
+    if data is None:
+        data = {}
+    if not isinstance(data, (dict, list)):
+        raise KeyError(f"Invalid path: [{', '.join(path)}]")
+
+    key, *rest = path
+    if isinstance(data, list):
+        try:
+            idx = int(key)
+            if idx < 0 or idx > len(data):
+                raise KeyError(key)
+            if not rest:
+                if idx == len(data):
+                    value = updater(None)
+                    if value is not None:
+                        data.append(value)
+                else:
+                    data[idx] = updater(data[idx])
+            else:
+                if idx == len(data):
+                    raise KeyError(key)
+                next_state = data.copy()
+                next_state[idx] = copy_on_update_path(next_state[idx], rest, updater)
+                data = next_state
+        except ValueError:
+            raise KeyError(key)
+    else:
+        if not rest:
+            if key not in data and updater(None) is None:
+                return data
+            data[key] = updater(data.get(key))
+        else:
+            if key not in data:
+                raise KeyError(key)
+            next_state = dict(data)
+            next_state[key] = copy_on_update_path(next_state[key], rest, updater)
+            data = next_state
+    return data
+
+
+@contextlib.contextmanager
+def path_updates(copying: bool):
+    in_place = state_manager._update_path
+    if copying:
+        state_manager._update_path = copy_on_update_path
+    try:
+        yield
+    finally:
+        state_manager._update_path = in_place
+
+
+def make_state(message_count: int) -> dict:
+    return {
+        "thread": {
+            "messages": [
+                {"role": "assistant", "content": f"message {i}", "metadata": {}}
+                for i in range(message_count)
+            ]
+        }
+    }
+
+
+async def bench(message_count: int) -> float:
+    manager = StateManager(lambda chunk: None, make_state(message_count))
+    content = manager.state["thread"]["messages"][-1]["content"]
+    start = time.perf_counter()
+    for _ in range(TOKENS):
+        content += "token "
+    elapsed = time.perf_counter() - start
+    manager.flush()
+    return elapsed / TOKENS
+
+
+async def bench_set(message_count: int) -> float:
+    manager = StateManager(lambda chunk: None, make_state(message_count))
+    metadata = manager.state["thread"]["messages"][-1]["metadata"]
+    start = time.perf_counter()
+    for i in range(TOKENS):
+        metadata["step"] = i
+    elapsed = time.perf_counter() - start
+    manager.flush()
+    return elapsed / TOKENS
+
+
+async def bench_draft(length: int) -> float:
+    manager = StateManager(lambda chunk: None, {"draft": ""})
+    updates = length // len("token ")
+    start = time.perf_counter()
+    for _ in range(updates):
+        manager.state["draft"] += "token "
+    manager.flush()
+    elapsed = time.perf_counter() - start
+    assert len(manager.state_data["draft"]) == updates * len("token ")
+    return elapsed / updates
+
+
+async def compare(bench_fn, size: int) -> str:
+    timings = []
+    for copying in (True, False):
+        with path_updates(copying):
+            timings.append(await bench_fn(size))
+    return f"{size:>10} " + " ".join(f"{t * 1e6:>10.2f}" for t in timings)
+
+
+async def main() -> None:
+    header = f"{'copying':>10} {'in place':>10}  (us/update)"
+    print(f"{'messages':>10} {header}  append to content")
+    for message_count in (10, 100, 1000, 10000):
+        print(await compare(bench, message_count))
+
+    print(f"{'messages':>10} {header}  set in metadata")
+    for message_count in (10, 100, 1000, 10000):
+        print(await compare(bench_set, message_count))
+
+    print(f"{'chars':>10} {header}  append to draft")
+    for length in (10_000, 100_000, 1_000_000):
+        print(await compare(bench_draft, length))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,15 +5,69 @@ from assistant_stream.create_run import (
     create_run,
     RunController,
 )
+from assistant_stream.thread_controller import ThreadRunController
+from assistant_stream.run_buffer import RunBufferFullError
+from assistant_stream.process_run import ProcessRunError
+from assistant_stream.run_registry import (
+    ReplayBuffer,
+    ReplayOffsetError,
+    RunRegistry,
+    resume_offset,
+)
+from assistant_stream.broadcast import BroadcastOverflowError, RunBroadcast
+from assistant_stream.run_cache import CachedRun, RunCache, cached_run
+from assistant_stream.recording import (
+    read_recording,
+    record_stream,
+    replay_recording,
+)
+from assistant_stream.scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    RunRejectedError,
+    RunScheduler,
+)
+from assistant_stream.metrics import MetricsAggregator, RunObserver
+from assistant_stream.tracing import Tracer, RecordingTracer, OpenTelemetryTracer
+from assistant_stream.loop_monitor import LoopLagMonitor
+from assistant_stream.flush_policy import FlushPolicy, AdaptiveFlushPolicy
+
+__all__ = [
+    "AssistantStreamResponse",
+    "create_run",
+    "RunController",
+    "ThreadRunController",
+    "RunBufferFullError",
+    "ProcessRunError",
+    "RunRegistry",
+    "ReplayBuffer",
+    "ReplayOffsetError",
+    "resume_offset",
+    "RunBroadcast",
+    "BroadcastOverflowError",
+    "RunCache",
+    "CachedRun",
+    "cached_run",
+    "record_stream",
+    "read_recording",
+    "replay_recording",
+    "RunScheduler",
+    "RunRejectedError",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_BATCH",
+    "MetricsAggregator",
+    "RunObserver",
+    "Tracer",
+    "RecordingTracer",
+    "OpenTelemetryTracer",
+    "LoopLagMonitor",
+    "FlushPolicy",
+    "AdaptiveFlushPolicy",
+]
 
 try:
     from assistant_stream.modules.langgraph import append_langgraph_event
 
-    __all__ = [
-        "AssistantStreamResponse",
-        "create_run",
-        "RunController",
-        "append_langgraph_event",
-    ]
+    __all__.append("append_langgraph_event")
 except ImportError:
-    __all__ = ["AssistantStreamResponse", "create_run", "RunController"]
+    pass
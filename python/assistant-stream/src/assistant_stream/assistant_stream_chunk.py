@@ -1,39 +1,74 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List, Literal, Optional, TypedDict, Union
-
-
-# Define the data classes for different chunk types
+from dataclasses import dataclass, fields
+from typing import Any, ClassVar, Dict, List, Literal, Optional, TypedDict, Union
+
+
+def _slotted(cls: type) -> type:
+    """Recreate a dataclass with __slots__, as dataclass(slots=True) does on 3.10+.
+
+    Instances have no __dict__, which makes them smaller and faster to create.
+    """
+    field_names = tuple(field.name for field in fields(cls))
+    cls_dict = dict(cls.__dict__)
+    # Defaults live in the generated __init__, the class attributes would
+    # conflict with the slots
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    cls_dict["__slots__"] = field_names
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    slotted_cls.__qualname__ = cls.__qualname__
+    return slotted_cls
+
+
+# Define the data classes for different chunk types. Every class has its type
+# tag as the class attribute TYPE, matching the default of its type field.
+@_slotted
 @dataclass
 class TextDeltaChunk:
+    TYPE: ClassVar[str] = "text-delta"
+
     text_delta: str
     type: str = "text-delta"
     parent_id: Optional[str] = None
 
 
+@_slotted
 @dataclass
 class ReasoningDeltaChunk:
+    TYPE: ClassVar[str] = "reasoning-delta"
+
     reasoning_delta: str
     type: str = "reasoning-delta"
     parent_id: Optional[str] = None
 
 
+@_slotted
 @dataclass
 class ToolCallBeginChunk:
+    TYPE: ClassVar[str] = "tool-call-begin"
+
     tool_call_id: str
     tool_name: str
     type: str = "tool-call-begin"
     parent_id: Optional[str] = None
 
 
+@_slotted
 @dataclass
 class ToolCallDeltaChunk:
+    TYPE: ClassVar[str] = "tool-call-delta"
+
     tool_call_id: str
     args_text_delta: str
     type: str = "tool-call-delta"
 
 
+@_slotted
 @dataclass
 class ToolResultChunk:
+    TYPE: ClassVar[str] = "tool-result"
+
     tool_call_id: str
     result: Any
     artifact: Any | None = None
@@ -41,14 +76,20 @@ class ToolResultChunk:
     type: str = "tool-result"
 
 
+@_slotted
 @dataclass
 class DataChunk:
+    TYPE: ClassVar[str] = "data"
+
     data: Any
     type: str = "data"
 
 
+@_slotted
 @dataclass
 class ErrorChunk:
+    TYPE: ClassVar[str] = "error"
+
     error: str
     type: str = "error"
 
@@ -69,14 +110,20 @@ class ObjectStreamAppendTextOperation(TypedDict):
 ObjectStreamOperation = Union[ObjectStreamSetOperation, ObjectStreamAppendTextOperation]
 
 
+@_slotted
 @dataclass
 class UpdateStateChunk:
+    TYPE: ClassVar[str] = "update-state"
+
     operations: List[ObjectStreamOperation]
     type: str = "update-state"
 
 
+@_slotted
 @dataclass
 class SourceChunk:
+    TYPE: ClassVar[str] = "source"
+
     id: str
     url: str
     source_type: str = "url"
@@ -97,3 +144,34 @@ AssistantStreamChunk = Union[
     UpdateStateChunk,
     SourceChunk,
 ]
+
+
+# Chunk classes by their type tag
+CHUNK_TYPES: Dict[str, type] = {
+    chunk_class.TYPE: chunk_class
+    for chunk_class in (
+        TextDeltaChunk,
+        ReasoningDeltaChunk,
+        ToolCallBeginChunk,
+        ToolCallDeltaChunk,
+        ToolResultChunk,
+        DataChunk,
+        ErrorChunk,
+        UpdateStateChunk,
+        SourceChunk,
+    )
+}
+
+
+def chunk_to_dict(chunk: AssistantStreamChunk) -> Dict[str, Any]:
+    """Convert a chunk to a dict of its fields, without copying the values."""
+    return {field.name: getattr(chunk, field.name) for field in fields(chunk)}
+
+
+def chunk_from_dict(data: Dict[str, Any]) -> AssistantStreamChunk:
+    """Create a chunk from a dict produced by chunk_to_dict."""
+    try:
+        chunk_class = CHUNK_TYPES[data["type"]]
+    except KeyError:
+        raise ValueError(f"Invalid chunk type: {data.get('type')}")
+    return chunk_class(**data)
@@ -0,0 +1,203 @@
+import asyncio
+import copy
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Dict, Optional, Set, Union
+
+from assistant_stream.assistant_stream_chunk import (
+    AssistantStreamChunk,
+    UpdateStateChunk,
+)
+from assistant_stream.serialization.data_stream import DataStreamEncoder
+from assistant_stream.serialization.stream_encoder import StreamEncoder
+from assistant_stream.state_manager import StateManager
+
+Frame = Union[str, bytes]
+
+
+class BroadcastOverflowError(Exception):
+    """Raised in a subscriber's stream when it fell too far behind the run."""
+
+
+class _Entry:
+    """A chunk of the run together with its encoded frames, per encoder."""
+
+    __slots__ = ("chunk", "frames")
+
+    def __init__(self, chunk: AssistantStreamChunk):
+        self.chunk = chunk
+        self.frames: Dict[StreamEncoder, Any] = {}
+
+
+class _Subscriber:
+    def __init__(self, max_buffered: Optional[int]):
+        self.max_buffered = max_buffered
+        self.entries: Deque[_Entry] = deque()
+        self.overflowed = False
+        self.wakeup = asyncio.Event()
+
+    def push(self, entry: _Entry) -> None:
+        if self.overflowed:
+            return
+        if self.max_buffered is not None and len(self.entries) >= self.max_buffered:
+            self.overflowed = True
+            self.entries.clear()
+        else:
+            self.entries.append(entry)
+        self.wakeup.set()
+
+
+class RunBroadcast:
+    """Fans out a single run to any number of subscribers.
+
+    The run is consumed once. Every subscriber has its own bounded buffer.
+    Frames are encoded once per encoder instance and shared between the
+    subscribers using it, including all subscribers of the default encoder.
+    Subscribers joining late receive a snapshot of the state followed by the
+    retained tail of the run.
+
+    Example:
+        broadcast = RunBroadcast(create_run(callback, state=state), state=state)
+
+        # in each request handler
+        return StreamingResponse(broadcast.subscribe(), media_type="text/plain")
+    """
+
+    def __init__(
+        self,
+        stream: AsyncGenerator[AssistantStreamChunk, None],
+        *,
+        state: Any = None,
+        tail_size: int = 1000,
+        max_buffered: Optional[int] = 1000,
+    ):
+        """
+        Args:
+            stream: The run to broadcast, e.g. the result of create_run
+            state: The initial state of the run
+            tail_size: Number of chunks retained for late joiners
+            max_buffered: Default number of chunks a subscriber may lag behind
+                before it is dropped
+        """
+        self._tail: Deque[_Entry] = deque()
+        self._tail_size = tail_size
+        self._max_buffered = max_buffered
+        # State as of the first chunk in the tail
+        self._base_state = StateManager(lambda _: None, copy.deepcopy(state))
+        self._base_state_changed = False
+        self._subscribers: Set[_Subscriber] = set()
+        self._default_encoder = DataStreamEncoder()
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._task = asyncio.create_task(self._pump(stream))
+
+    @property
+    def done(self) -> bool:
+        """Whether the run has finished."""
+        return self._done
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """The exception the run failed with, if any."""
+        return self._error
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of currently connected subscribers."""
+        return len(self._subscribers)
+
+    async def _pump(self, stream: AsyncGenerator[AssistantStreamChunk, None]) -> None:
+        try:
+            async for chunk in stream:
+                entry = _Entry(chunk)
+                self._tail.append(entry)
+                if len(self._tail) > self._tail_size:
+                    self._evict(self._tail.popleft())
+                for subscriber in self._subscribers:
+                    subscriber.push(entry)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            for subscriber in self._subscribers:
+                subscriber.wakeup.set()
+
+    def _evict(self, entry: _Entry) -> None:
+        """Fold the state operations of an evicted chunk into the base state."""
+        if not isinstance(entry.chunk, UpdateStateChunk):
+            return
+        self._base_state.apply_remote_operations(entry.chunk.operations)
+        self._base_state_changed = True
+
+    def _encode(self, entry: _Entry, encoder: StreamEncoder) -> Optional[Frame]:
+        frames = entry.frames
+        if encoder not in frames:
+            frames[encoder] = encoder.encode_chunk(entry.chunk)
+        return frames[encoder]
+
+    async def subscribe(
+        self,
+        stream_encoder: Optional[StreamEncoder] = None,
+        *,
+        max_buffered: Optional[int] = None,
+    ) -> AsyncGenerator[Frame, None]:
+        """Stream the run encoded with stream_encoder (DataStreamEncoder by default).
+
+        Pass the same encoder instance to several subscribers to encode each
+        chunk once for all of them. Encoders that only implement
+        encode_stream encode the run separately for each subscriber.
+        """
+        encoder = stream_encoder if stream_encoder is not None else self._default_encoder
+        if type(encoder).encode_chunk is StreamEncoder.encode_chunk:
+            async for frame in encoder.encode_stream(self._subscribe_chunks(max_buffered)):
+                yield frame
+            return
+
+        async for entry in self._subscribe(max_buffered):
+            frame = self._encode(entry, encoder)
+            if frame:
+                yield frame
+
+        async def no_chunks():
+            return
+            yield
+
+        async for frame in encoder.encode_stream(no_chunks()):
+            yield frame
+
+    async def _subscribe_chunks(
+        self, max_buffered: Optional[int]
+    ) -> AsyncGenerator[AssistantStreamChunk, None]:
+        async for entry in self._subscribe(max_buffered):
+            yield entry.chunk
+
+    async def _subscribe(self, max_buffered: Optional[int]) -> AsyncGenerator[_Entry, None]:
+        subscriber = _Subscriber(
+            max_buffered if max_buffered is not None else self._max_buffered
+        )
+        if self._base_state_changed:
+            snapshot = copy.deepcopy(self._base_state.state_data)
+            subscriber.entries.append(
+                _Entry(
+                    UpdateStateChunk(
+                        operations=[{"type": "set", "path": [], "value": snapshot}]
+                    )
+                )
+            )
+        subscriber.entries.extend(self._tail)
+        self._subscribers.add(subscriber)
+
+        try:
+            while True:
+                while subscriber.entries:
+                    yield subscriber.entries.popleft()
+
+                if subscriber.overflowed:
+                    raise BroadcastOverflowError(
+                        "Subscriber fell too far behind the broadcast run"
+                    )
+                if self._done:
+                    break
+                subscriber.wakeup.clear()
+                await subscriber.wakeup.wait()
+        finally:
+            self._subscribers.discard(subscriber)
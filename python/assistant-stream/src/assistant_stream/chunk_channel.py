@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+
+class ChunkChannel:
+    """Single-consumer channel for passing chunks to the event loop.
+
+    Items put from the event loop thread are appended directly. Items put from
+    other threads are collected and handed over to the loop in batches, with a
+    single thread-safe wakeup per batch.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._items: Deque[Any] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._lock = threading.Lock()
+        self._foreign_items: List[Any] = []
+        self._transfer_scheduled = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any) -> None:
+        """Put an item into the channel from any thread."""
+        if threading.get_ident() == self._thread_id:
+            if self._transfer_scheduled:
+                # Keep items from other threads ahead of this one
+                self._transfer_foreign_items()
+            self._items.append(item)
+            self._wakeup()
+            return
+
+        with self._lock:
+            self._foreign_items.append(item)
+            if self._transfer_scheduled:
+                return
+            self._transfer_scheduled = True
+        self._loop.call_soon_threadsafe(self._transfer_foreign_items)
+
+    def _transfer_foreign_items(self) -> None:
+        with self._lock:
+            self._items.extend(self._foreign_items)
+            self._foreign_items.clear()
+            self._transfer_scheduled = False
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(True)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the channel has items.
+
+        Returns False if the timeout expired before any item arrived.
+        """
+        if self._items:
+            return True
+
+        self._waiter = waiter = self._loop.create_future()
+        timer = None
+        if timeout is not None:
+            timer = self._loop.call_later(
+                timeout, lambda: waiter.done() or waiter.set_result(False)
+            )
+        try:
+            return await waiter
+        finally:
+            self._waiter = None
+            if timer is not None:
+                timer.cancel()
+
+    def drain(self) -> Deque[Any]:
+        """Remove and return all items currently in the channel."""
+        items = self._items
+        self._items = deque()
+        return items
@@ -0,0 +1,87 @@
+from dataclasses import replace
+from typing import Any, List, Optional, Tuple
+
+from assistant_stream.assistant_stream_chunk import (
+    AssistantStreamChunk,
+    ReasoningDeltaChunk,
+    TextDeltaChunk,
+    ToolCallDeltaChunk,
+)
+
+# Maps mergeable chunk classes to (delta field, grouping field)
+_DELTA_FIELDS = {
+    TextDeltaChunk: ("text_delta", "parent_id"),
+    ReasoningDeltaChunk: ("reasoning_delta", "parent_id"),
+    ToolCallDeltaChunk: ("args_text_delta", "tool_call_id"),
+}
+
+
+def delta_merge_key(chunk: AssistantStreamChunk) -> Optional[Tuple[type, Any]]:
+    """Return the key under which a delta chunk may be merged, or None."""
+    fields = _DELTA_FIELDS.get(type(chunk))
+    if fields is None:
+        return None
+    return type(chunk), getattr(chunk, fields[1])
+
+
+class DeltaCoalescer:
+    """Merges consecutive same-kind delta chunks into a single chunk.
+
+    Deltas are merged while they share the same chunk type and the same
+    parent_id/tool_call_id. Any other chunk ends the current merge, so the
+    relative order of chunks is preserved.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        """Initialize with an optional maximum length for a merged delta."""
+        self._max_size = max_size
+        self._pending: Optional[AssistantStreamChunk] = None
+        self._pending_key = None
+        self._parts: List[str] = []
+        self._size = 0
+
+    @property
+    def has_pending(self) -> bool:
+        """Whether a merged delta is waiting to be emitted."""
+        return self._pending is not None
+
+    def push(self, chunk: AssistantStreamChunk) -> List[AssistantStreamChunk]:
+        """Add a chunk and return the chunks that are ready to be emitted."""
+        key = delta_merge_key(chunk)
+        if key is None:
+            ready = self.flush()
+            ready.append(chunk)
+            return ready
+
+        delta = getattr(chunk, _DELTA_FIELDS[key[0]][0])
+        if key == self._pending_key and (
+            self._max_size is None or self._size + len(delta) <= self._max_size
+        ):
+            self._parts.append(delta)
+            self._size += len(delta)
+            return []
+
+        ready = self.flush()
+        self._pending = chunk
+        self._pending_key = key
+        self._parts = [delta]
+        self._size = len(delta)
+        if self._max_size is not None and self._size >= self._max_size:
+            ready.extend(self.flush())
+        return ready
+
+    def flush(self) -> List[AssistantStreamChunk]:
+        """Return the pending merged delta, if any, and reset."""
+        if self._pending is None:
+            return []
+
+        chunk = self._pending
+        if len(self._parts) > 1:
+            field = _DELTA_FIELDS[type(chunk)][0]
+            chunk = replace(chunk, **{field: "".join(self._parts)})
+
+        self._pending = None
+        self._pending_key = None
+        self._parts = []
+        self._size = 0
+        return [chunk]
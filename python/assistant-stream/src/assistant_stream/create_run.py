@@ -1,5 +1,8 @@
 import asyncio
-from typing import Any, AsyncGenerator, Callable, Coroutine, List, Optional
+import concurrent.futures
+import functools
+import inspect
+from typing import Any, AsyncGenerator, Callable, Coroutine, List, Optional, Union
 from assistant_stream.assistant_stream_chunk import (
     AssistantStreamChunk,
     TextDeltaChunk,
@@ -16,36 +19,113 @@ from assistant_stream.modules.tool_call import (
     generate_openai_style_tool_call_id,
 )
 from assistant_stream.state_manager import StateManager
+from assistant_stream.flush_policy import FlushPolicy
+from assistant_stream.chunk_channel import ChunkChannel
+from assistant_stream.chunk_coalescer import DeltaCoalescer
+from assistant_stream.run_buffer import BufferPolicy, RunBuffer
+from assistant_stream.scheduler import PRIORITY_INTERACTIVE, RunScheduler
+from assistant_stream.stream_fan_in import StreamFanIn
+from assistant_stream.metrics import RunObserver, RunStats
+from assistant_stream.tracing import Span, Tracer
+from assistant_stream.loop_monitor import LoopLagMonitor, RunLagStats
+from assistant_stream.thread_controller import ThreadRunController
+from assistant_stream.process_run import ProcessRunError, run_in_process
 
 
 class RunController:
-    def __init__(self, queue, state_data, parent_id: Optional[str] = None):
-        self._queue = queue
+    def __init__(
+        self,
+        channel: ChunkChannel,
+        state_data,
+        parent_id: Optional[str] = None,
+        buffer: Optional[RunBuffer] = None,
+    ):
+        self._channel = channel
         self._loop = asyncio.get_running_loop()
+        self._buffer = buffer if buffer is not None else RunBuffer(channel)
         self._dispose_callbacks = []
-        self._stream_tasks = []
+        self._fan_in = StreamFanIn()
+        self._tool_calls = []
+        self._cancelled_event = asyncio.Event()
+        self._queue_wait_time = 0.0
         self._state_manager = StateManager(self._put_chunk_nowait, state_data)
+        self._tracer: Optional[Tracer] = None
+        self._span: Optional[Span] = None
+        self._spans = {}
+        self._loop_monitor: Optional[LoopLagMonitor] = None
+        self._loop_lag: Optional[RunLagStats] = None
         self._parent_id = parent_id
 
     def with_parent_id(self, parent_id: str) -> 'RunController':
         """Create a new RunController instance with the specified parent_id."""
-        controller = RunController(self._queue, self._state_manager._state_data, parent_id)
+        controller = RunController(
+            self._channel, self._state_manager._state_data, parent_id, self._buffer
+        )
         controller._loop = self._loop
         controller._dispose_callbacks = self._dispose_callbacks
-        controller._stream_tasks = self._stream_tasks
+        controller._fan_in = self._fan_in
+        controller._tool_calls = self._tool_calls
+        controller._cancelled_event = self._cancelled_event
+        controller._queue_wait_time = self._queue_wait_time
         controller._state_manager = self._state_manager
+        controller._tracer = self._tracer
+        controller._span = self._span
+        controller._spans = self._spans
+        controller._loop_monitor = self._loop_monitor
+        controller._loop_lag = self._loop_lag
         return controller
 
+    def _parent_span(self) -> Optional[Span]:
+        """Span of the tool call named by parent_id, or the run's span."""
+        return self._spans.get(self._parent_id, self._span)
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the run was cancelled, e.g. because the client disconnected."""
+        return self._cancelled_event.is_set()
+
+    @property
+    def queue_wait_time(self) -> float:
+        """Seconds the run waited for a RunScheduler slot before starting."""
+        return self._queue_wait_time
+
+    @property
+    def loop_lag(self) -> Optional[RunLagStats]:
+        """Event loop stalls caused by this run, if a LoopLagMonitor is attached."""
+        return self._loop_lag
+
+    @property
+    def cancelled_event(self) -> asyncio.Event:
+        """Event that is set when the run is cancelled."""
+        return self._cancelled_event
+
+    def _cancel(self) -> None:
+        """Cancel the run's substreams and open tool calls."""
+        self._cancelled_event.set()
+        for tool_call in self._tool_calls:
+            tool_call.cancel()
+        self._fan_in.cancel()
+
     def append_text(self, text_delta: str) -> None:
         """Append a text delta to the stream."""
         chunk = TextDeltaChunk(text_delta=text_delta, parent_id=self._parent_id)
         self._flush_and_put_chunk(chunk)
 
+    async def append_text_async(self, text_delta: str) -> None:
+        """Append a text delta, waiting for room in a bounded run buffer."""
+        await self._buffer.wait_for_space()
+        self.append_text(text_delta)
+
     def append_reasoning(self, reasoning_delta: str) -> None:
         """Append a reasoning delta to the stream."""
         chunk = ReasoningDeltaChunk(reasoning_delta=reasoning_delta, parent_id=self._parent_id)
         self._flush_and_put_chunk(chunk)
 
+    async def append_reasoning_async(self, reasoning_delta: str) -> None:
+        """Append a reasoning delta, waiting for room in a bounded run buffer."""
+        await self._buffer.wait_for_space()
+        self.append_reasoning(reasoning_delta)
+
     async def add_tool_call(
         self, tool_name: str, tool_call_id: str = None
     ) -> ToolCallController:
@@ -53,10 +133,26 @@ class RunController:
         if tool_call_id is None:
             tool_call_id = generate_openai_style_tool_call_id()
 
-        stream, controller = await create_tool_call(tool_name, tool_call_id, self._parent_id)
+        span = None
+        if self._tracer is not None:
+            span = self._tracer.start_span(
+                "assistant_stream.tool_call",
+                self._parent_span(),
+                {"tool_name": tool_name, "tool_call_id": tool_call_id},
+            )
+            self._spans[tool_call_id] = span
+
+        stream, controller = await create_tool_call(
+            tool_name,
+            tool_call_id,
+            self._parent_id,
+            run_buffer=self._buffer,
+            span=span,
+        )
         self._dispose_callbacks.append(controller.close)
+        self._tool_calls.append(controller)
 
-        self.add_stream(stream)
+        self._add_substream(stream)
         return controller
 
     def add_tool_result(self, tool_call_id: str, result: Any) -> None:
@@ -69,13 +165,22 @@ class RunController:
 
     def add_stream(self, stream: AsyncGenerator[AssistantStreamChunk, None]) -> None:
         """Append a substream to the main stream."""
+        span = None
+        if self._tracer is not None:
+            span = self._tracer.start_span(
+                "assistant_stream.substream", self._parent_span()
+            )
+        self._add_substream(stream, span)
 
-        async def reader():
-            async for chunk in stream:
-                self._flush_and_put_chunk(chunk)
+    def _add_substream(self, stream, span: Optional[Span] = None) -> None:
+        task = self._fan_in.add(stream, self._put_substream_chunk, span)
+        if self._loop_monitor is not None:
+            self._loop_monitor.track(task, self._loop_lag)
 
-        task = asyncio.create_task(reader())
-        self._stream_tasks.append(task)
+    async def _put_substream_chunk(self, chunk):
+        """Helper method to forward a substream chunk, waiting for buffer room."""
+        await self._buffer.wait_for_space()
+        self._flush_and_put_chunk(chunk, force=True)
 
     def add_data(self, data: Any) -> None:
         """Emit an event to the main stream."""
@@ -85,7 +190,7 @@ class RunController:
     def add_error(self, error: str) -> None:
         """Emit an error to the main stream."""
         chunk = ErrorChunk(error=error)
-        self._flush_and_put_chunk(chunk)
+        self._flush_and_put_chunk(chunk, force=True)
     
     def add_source(self, id: str, url: str, title: Optional[str] = None) -> None:
         """Add a source to the stream."""
@@ -98,21 +203,23 @@ class RunController:
         self._flush_and_put_chunk(chunk)
 
     def _put_chunk_nowait(self, chunk):
-        """Helper method to put a chunk in the queue without waiting.
+        """Helper method to put a chunk in the channel without waiting.
 
         This is used as a callback for the StateManager.
         """
-        self._loop.call_soon_threadsafe(self._queue.put_nowait, chunk)
+        self._buffer.put(chunk, force=True)
 
-    def _flush_and_put_chunk(self, chunk):
-        """Helper method to flush state operations and put a chunk in the queue.
+    def _flush_and_put_chunk(self, chunk, force: bool = False):
+        """Helper method to flush state operations and put a chunk in the channel.
 
         This ensures state operations are sent before other operations.
         """
+        if self._cancelled_event.is_set():
+            return
         # Flush any pending state operations first
         self._state_manager.flush()
-        # Add the chunk to the queue
-        self._loop.call_soon_threadsafe(self._queue.put_nowait, chunk)
+        # Add the chunk to the channel
+        self._buffer.put(chunk, force=force)
 
     @property
     def state(self):
@@ -140,44 +247,271 @@ class RunController:
         Args:
             value: The new state value to set
         """
-        self._state_manager.add_operations(
-            [{"type": "set", "path": [], "value": value}]
+        self._state_manager.set_value([], value)
+
+
+def _is_async_callable(callback: Callable) -> bool:
+    return inspect.iscoroutinefunction(callback) or inspect.iscoroutinefunction(
+        getattr(callback, "__call__", None)
+    )
+
+
+def _call_in_thread(callback: Callable, controller: ThreadRunController) -> None:
+    """Call a plain function callback, rejecting ones that return awaitables."""
+    result = callback(controller)
+    if inspect.isawaitable(result):
+        if inspect.iscoroutine(result):
+            result.close()
+        raise TypeError(
+            "Callbacks run in a thread must be plain functions, this one "
+            "returned an awaitable"
         )
 
 
 async def create_run(
-    callback: Callable[[RunController], Coroutine[Any, Any, None]],
+    callback: Union[
+        Callable[[RunController], Coroutine[Any, Any, None]],
+        Callable[[ThreadRunController], None],
+    ],
     *,
     state: Any | None = None,
+    coalesce_window: Optional[float] = None,
+    coalesce_max_size: Optional[int] = None,
+    max_buffered_chunks: Optional[int] = None,
+    max_buffered_bytes: Optional[int] = None,
+    buffer_policy: BufferPolicy = "block",
+    scheduler: Optional[RunScheduler] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    max_concurrent_streams: Optional[int] = None,
+    observer: Optional[RunObserver] = None,
+    tracer: Optional[Tracer] = None,
+    loop_monitor: Optional[LoopLagMonitor] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    process_pool: Optional[concurrent.futures.Executor] = None,
+    flush_policy: Optional[FlushPolicy] = None,
+    diff_state: bool = False,
+    run_in_thread: bool = False,
 ) -> AsyncGenerator[AssistantStreamChunk, None]:
-    queue = asyncio.Queue()
-    controller = RunController(queue, state_data=state)
+    """Run the callback and yield the chunks it produces.
+
+    Args:
+        callback: Function receiving the RunController, usually a coroutine
+            function. Awaitable results are awaited. With executor or
+            run_in_thread, a plain function receiving a ThreadRunController.
+        state: Initial state data
+        coalesce_window: Enables delta coalescing. Consecutive text, reasoning
+            and tool call argument deltas are merged for up to this many
+            seconds before being yielded.
+        coalesce_max_size: Enables delta coalescing. Maximum length of a
+            merged delta.
+        max_buffered_chunks: Maximum number of chunks produced but not yet
+            consumed before buffer_policy applies
+        max_buffered_bytes: Maximum text size of chunks produced but not yet
+            consumed before buffer_policy applies
+        buffer_policy: "block" to suspend awaitable producer methods such as
+            append_text_async, "coalesce" to merge deltas while the buffer is
+            full, or "fail" to raise RunBufferFullError. The limits also apply
+            separately to each tool call's chunks waiting to be forwarded.
+        scheduler: Limits concurrently active runs. The callback only starts
+            once the scheduler admits the run.
+        priority: Scheduling priority, lower values are admitted first
+        max_concurrent_streams: Maximum number of substreams added with
+            add_stream (including tool calls) that are read at once
+        observer: Receives the run's performance events, such as a
+            MetricsAggregator
+        tracer: Creates spans for the run, its substreams, tool calls and
+            state flushes
+        loop_monitor: Measures event loop stalls while the run is active and
+            attributes the ones caused by the callback or its substreams to
+            the run, see controller.loop_lag
+        executor: Runs a plain function callback in this executor, see
+            run_in_thread
+        process_pool: Runs the callback in a worker process of this pool,
+            e.g. a ProcessPoolExecutor. The callback and state must be
+            picklable. Chunks are streamed back to this process, and
+            cancelling the run cancels the callback in the worker.
+        flush_policy: Decides how long state updates are batched, e.g. a
+            FlushPolicy with a window or an AdaptiveFlushPolicy. By default
+            they are sent on the next event loop iteration.
+        diff_state: Send only the changed parts of values assigned to the
+            state, including the root state, instead of the whole values
+        run_in_thread: Run a plain function callback in executor, or the
+            event loop's default executor, with a thread-safe
+            ThreadRunController
+
+    If a substream fails, its error is emitted, the callback and the other
+    substreams are cancelled, and the error is raised once the stream ends.
+
+    If the consumer stops iterating before the run completes (the generator is
+    closed or cancelled, e.g. because the client disconnected), the callback,
+    substreams and open tool calls are cancelled and controller.cancelled is set.
+    """
+    if process_pool is not None:
+        if executor is not None:
+            raise TypeError("create_run() takes either executor or process_pool")
+        callback = functools.partial(run_in_process, callback, process_pool, state)
+
+    run_in_thread = run_in_thread or executor is not None
+    if run_in_thread and _is_async_callable(callback):
+        raise TypeError(
+            "create_run(executor=..., run_in_thread=True) requires a plain "
+            "function callback"
+        )
+
+    loop = asyncio.get_running_loop()
+    stats = None
+    if observer is not None:
+        stats = RunStats(loop.time())
+        observer.on_run_start(stats)
+    run_span = None
+    if tracer is not None:
+        run_span = tracer.start_span("assistant_stream.run")
+
+    def observe(chunk: AssistantStreamChunk) -> None:
+        nonlocal observe_first_chunk
+        if observe_first_chunk and run_span is not None:
+            observe_first_chunk = False
+            run_span.add_event("first_chunk", {"type": chunk.type})
+        if stats is not None:
+            queue_depth = backlog()
+            stats.record_chunk(chunk, loop.time(), queue_depth)
+            observer.on_chunk(stats, chunk, queue_depth)
+
+    instrumented = stats is not None or run_span is not None
+    observe_first_chunk = True
+
+    channel = ChunkChannel()
+    batch = channel.drain()
+
+    def backlog() -> int:
+        # Chunks drained by the consumer but not yielded yet are still waiting
+        return len(batch) + len(channel)
+
+    buffer = RunBuffer(channel, max_buffered_chunks, max_buffered_bytes, buffer_policy)
+    controller = RunController(channel, state_data=state, buffer=buffer)
+    if tracer is not None:
+        controller._tracer = tracer
+        controller._span = run_span
+        controller._state_manager.set_tracer(tracer, run_span)
+    if flush_policy is not None:
+        controller._state_manager.set_flush_policy(flush_policy, backlog)
+    controller._state_manager.diff_assignments = diff_state
+    if loop_monitor is not None:
+        controller._loop_monitor = loop_monitor
+        controller._loop_lag = loop_monitor.run_started()
+
+    def on_stream_error(error: BaseException) -> None:
+        controller.add_error(str(error))
+        task.cancel()
+
+    controller._fan_in = StreamFanIn(max_concurrent_streams, on_stream_error)
 
     async def background_task():
+        admitted = False
         try:
-            await callback(controller)
+            if scheduler is not None:
+                controller._queue_wait_time = await scheduler.acquire(priority)
+                admitted = True
+            if run_in_thread:
+                await loop.run_in_executor(
+                    executor, _call_in_thread, callback, ThreadRunController(controller)
+                )
+            else:
+                result = callback(controller)
+                if inspect.isawaitable(result):
+                    await result
         except Exception as e:
-            controller.add_error(str(e))
+            if run_span is not None:
+                run_span.record_exception(e)
+            if not (isinstance(e, ProcessRunError) and e.reported):
+                controller.add_error(str(e))
             raise
         finally:
             # Flush any pending state updates before disposing
-            controller._state_manager.flush()
+            controller._state_manager.complete()
 
             for dispose in controller._dispose_callbacks:
                 dispose()
             try:
-                for task in controller._stream_tasks:
-                    await task
+                await controller._fan_in.wait()
             finally:
-                asyncio.get_running_loop().call_soon_threadsafe(queue.put_nowait, None)
+                if admitted:
+                    scheduler.release()
+                buffer.put(None, force=True)
 
     task = asyncio.create_task(background_task())
+    if loop_monitor is not None:
+        loop_monitor.track(task, controller._loop_lag)
+
+    coalescer = None
+    if coalesce_window is not None or coalesce_max_size is not None:
+        coalescer = DeltaCoalescer(coalesce_max_size)
+    deadline = 0.0
+    try:
+        try:
+            while True:
+                if not batch:
+                    if coalescer is not None and coalescer.has_pending:
+                        # Wait for more deltas until the coalescing window closes
+                        timeout = deadline - loop.time()
+                        if timeout <= 0 or not await channel.wait(timeout):
+                            for ready in coalescer.flush():
+                                if instrumented:
+                                    observe(ready)
+                                yield ready
+                            continue
+                    else:
+                        await channel.wait()
+                    batch = channel.drain()
 
-    while True:
-        chunk = await controller._queue.get()
-        if chunk is None:
-            break
-        yield chunk
-        controller._queue.task_done()
+                chunk = batch.popleft()
+                if chunk is None:
+                    if coalescer is not None:
+                        for ready in coalescer.flush():
+                            if instrumented:
+                                observe(ready)
+                            yield ready
+                    break
 
-    await task
+                buffer.release(chunk)
+                if coalescer is None:
+                    if instrumented:
+                        observe(chunk)
+                    yield chunk
+                    continue
+
+                was_pending = coalescer.has_pending
+                ready_chunks = coalescer.push(chunk)
+                if coalescer.has_pending and (ready_chunks or not was_pending):
+                    # A new merge started, open a new window
+                    deadline = loop.time() + (coalesce_window or 0)
+                for ready in ready_chunks:
+                    if instrumented:
+                        observe(ready)
+                    yield ready
+        except BaseException:
+            # The consumer went away (generator closed or cancelled), stop the run
+            if stats is not None:
+                stats.cancelled = True
+            if run_span is not None:
+                run_span.set_attribute("cancelled", True)
+            controller._cancel()
+            task.cancel()
+            await asyncio.gather(task, *controller._fan_in.tasks, return_exceptions=True)
+            raise
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            # A failed substream cancels the callback, surface its error instead
+            if task.cancelled() and controller._fan_in.error is not None:
+                raise controller._fan_in.error
+            raise
+    finally:
+        if stats is not None:
+            stats.ended_at = loop.time()
+            observer.on_run_end(stats)
+        if run_span is not None:
+            run_span.end()
+        if loop_monitor is not None:
+            loop_monitor.run_finished()
@@ -0,0 +1,94 @@
+from typing import Any, Optional
+
+from assistant_stream.assistant_stream_chunk import ObjectStreamOperation
+
+
+class FlushPolicy:
+    """Decides when batched state operations are sent.
+
+    Operations are batched from the first pending one until the window
+    closes or a batch limit is reached. Explicit flushes, such as the one
+    before every other chunk of the run to keep updates in order, always send
+    pending operations immediately.
+
+    Example:
+        # Coarse batching for a dashboard updating many values
+        create_run(callback, flush_policy=FlushPolicy(window=0.5, max_operations=500))
+    """
+
+    def __init__(
+        self,
+        window: float = 0.0,
+        max_operations: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            window: Seconds operations are batched for. 0 sends them on the
+                next event loop iteration.
+            max_operations: Send once this many operations are pending
+            max_bytes: Send once the values of pending operations reach this
+                approximate size
+        """
+        self.window = window
+        self.max_operations = max_operations
+        self.max_bytes = max_bytes
+
+    def get_window(self, backlog: int) -> float:
+        """Seconds to batch for, given the chunks waiting to be consumed."""
+        return self.window
+
+    def is_full(self, operations: int, size: int) -> bool:
+        """Whether the pending operations must be sent now."""
+        if self.max_operations is not None and operations >= self.max_operations:
+            return True
+        if self.max_bytes is not None and size >= self.max_bytes:
+            return True
+        return False
+
+
+class AdaptiveFlushPolicy(FlushPolicy):
+    """Batches state operations for longer while the consumer falls behind.
+
+    The window grows linearly with the number of chunks waiting to be
+    consumed, from min_window when there are none to max_window at
+    max_backlog.
+    """
+
+    def __init__(
+        self,
+        min_window: float = 0.0,
+        max_window: float = 0.25,
+        max_backlog: int = 32,
+        max_operations: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        super().__init__(min_window, max_operations, max_bytes)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.max_backlog = max_backlog
+
+    def get_window(self, backlog: int) -> float:
+        if backlog >= self.max_backlog:
+            return self.max_window
+        return self.min_window + (self.max_window - self.min_window) * (
+            backlog / self.max_backlog
+        )
+
+
+def value_size(value: Any) -> int:
+    """Approximate JSON encoded size of a value."""
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(
+            len(str(key)) + 3 + value_size(item) for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return 2 + sum(value_size(item) + 1 for item in value)
+    return 8
+
+
+def operation_size(operation: ObjectStreamOperation) -> int:
+    """Approximate encoded size of an operation's value."""
+    return value_size(operation["value"])
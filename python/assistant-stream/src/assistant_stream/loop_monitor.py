@@ -0,0 +1,192 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Deque, Optional
+
+
+class LoopStall:
+    """A period during which the event loop did not run its callbacks.
+
+    Args:
+        duration: Seconds the loop was blocked
+        stack: Stack of the code that was running during the stall, if known
+        run: Statistics of the run whose task was running, if known
+    """
+
+    def __init__(
+        self,
+        duration: float,
+        stack: Optional[str] = None,
+        run: Optional["RunLagStats"] = None,
+    ):
+        self.duration = duration
+        self.stack = stack
+        self.run = run
+
+    def __repr__(self) -> str:
+        return f"LoopStall(duration={self.duration!r})"
+
+
+class RunLagStats:
+    """Event loop stalls caused by a single run."""
+
+    def __init__(self, max_stalls: int = 20):
+        self.stall_count = 0
+        self.total_stall_time = 0.0
+        self.max_stall_time = 0.0
+        self.stalls: Deque[LoopStall] = deque(maxlen=max_stalls)
+
+    def _record(self, stall: LoopStall) -> None:
+        self.stall_count += 1
+        self.total_stall_time += stall.duration
+        self.max_stall_time = max(self.max_stall_time, stall.duration)
+        self.stalls.append(stall)
+
+
+class LoopLagMonitor:
+    """Detects event loop stalls while runs are active and attributes them to runs.
+
+    A callback on the event loop checks how late it runs. A watchdog thread
+    samples the task and stack executing on the loop while a stall is in
+    progress, so stalls caused by a run's callback or substreams are counted
+    on that run.
+
+    Example:
+        monitor = LoopLagMonitor(threshold=0.1)
+
+        async def callback(controller):
+            ...
+            print(controller.loop_lag.stall_count)
+
+        create_run(callback, loop_monitor=monitor)
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        interval: float = 0.05,
+        capture_stacks: bool = True,
+        max_stalls: int = 100,
+    ):
+        """
+        Args:
+            threshold: Minimum lag, in seconds, that counts as a stall
+            interval: Seconds between lag measurements
+            capture_stacks: Whether to record the stack of the stalling code
+            max_stalls: Number of recent stalls kept, per monitor and per run
+        """
+        self._threshold = threshold
+        self._interval = interval
+        self._capture_stacks = capture_stacks
+        self._max_stalls = max_stalls
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._runs: "weakref.WeakKeyDictionary[asyncio.Task, RunLagStats]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._active_runs = 0
+        self._expected: Optional[float] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._capture: Optional[LoopStall] = None
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.stalls: Deque[LoopStall] = deque(maxlen=max_stalls)
+        self.stall_count = 0
+
+    def run_started(self) -> RunLagStats:
+        """Start measuring for a new run, call on the event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            self._loop_thread_id = threading.get_ident()
+        elif self._loop is not loop:
+            raise RuntimeError("LoopLagMonitor is bound to a different event loop")
+
+        self._active_runs += 1
+        if self._active_runs == 1:
+            self._expected = loop.time() + self._interval
+            self._handle = loop.call_at(self._expected, self._beat)
+            self._running.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._watch,
+                    name="assistant-stream-loop-monitor",
+                    daemon=True,
+                )
+                self._thread.start()
+        return RunLagStats(self._max_stalls)
+
+    def track(self, task: asyncio.Task, stats: RunLagStats) -> None:
+        """Attribute stalls while task is executing to a run."""
+        self._runs[task] = stats
+
+    def run_finished(self) -> None:
+        """Stop measuring for a run, call on the event loop."""
+        self._active_runs -= 1
+        if self._active_runs == 0:
+            self._running.clear()
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+            self._expected = None
+            self._capture = None
+
+    def close(self) -> None:
+        """Stop the watchdog thread."""
+        self._closed = True
+        self._running.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _beat(self) -> None:
+        loop = self._loop
+        now = loop.time()
+        lag = now - self._expected
+        if lag >= self._threshold:
+            stall = self._capture or LoopStall(0.0)
+            stall.duration = lag
+            self._record(stall)
+        self._capture = None
+        self._expected = now + self._interval
+        self._handle = loop.call_at(self._expected, self._beat)
+
+    def _record(self, stall: LoopStall) -> None:
+        self.stall_count += 1
+        self.stalls.append(stall)
+        if stall.run is not None:
+            stall.run._record(stall)
+
+    def _watch(self) -> None:
+        poll = min(self._interval, self._threshold) / 2
+        while True:
+            self._running.wait()
+            if self._closed:
+                return
+            time.sleep(poll)
+
+            loop = self._loop
+            expected = self._expected
+            if (
+                expected is None
+                or self._capture is not None
+                or loop.time() - expected < self._threshold
+            ):
+                continue
+
+            # The loop is stalled, sample what it is executing
+            task = asyncio.current_task(loop)
+            run = self._runs.get(task) if task is not None else None
+            stack = None
+            if self._capture_stacks:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    stack = "".join(traceback.format_stack(frame))
+            if self._expected == expected:
+                self._capture = LoopStall(0.0, stack, run)
+
@@ -0,0 +1,271 @@
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+from assistant_stream.assistant_stream_chunk import AssistantStreamChunk
+from assistant_stream.run_buffer import chunk_size
+
+
+class RunStats:
+    """Statistics of a single run, updated while the run is consumed.
+
+    Times are event loop times in seconds. Text bytes count the characters of
+    text, reasoning, tool argument and error deltas, as buffered by the run.
+    Encoded sizes are reported by encoders through RunObserver.on_encode.
+    """
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.first_chunk_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+        self.chunk_counts: Dict[str, int] = defaultdict(int)
+        self.chunk_text_bytes: Dict[str, int] = defaultdict(int)
+        self.state_flushes = 0
+        self.state_operations = 0
+        self.max_queue_depth = 0
+        self.cancelled = False
+
+    @property
+    def time_to_first_chunk(self) -> Optional[float]:
+        if self.first_chunk_at is None:
+            return None
+        return self.first_chunk_at - self.started_at
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.ended_at is None:
+            return None
+        return self.ended_at - self.started_at
+
+    @property
+    def total_chunks(self) -> int:
+        return sum(self.chunk_counts.values())
+
+    @property
+    def total_text_bytes(self) -> int:
+        return sum(self.chunk_text_bytes.values())
+
+    @property
+    def chunks_per_second(self) -> Optional[float]:
+        duration = self.duration
+        if not duration:
+            return None
+        return self.total_chunks / duration
+
+    def record_chunk(
+        self, chunk: AssistantStreamChunk, now: float, queue_depth: int
+    ) -> None:
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+        self.chunk_counts[chunk.type] += 1
+        self.chunk_text_bytes[chunk.type] += chunk_size(chunk)
+        if chunk.type == "update-state":
+            self.state_flushes += 1
+            self.state_operations += len(chunk.operations)
+        if queue_depth > self.max_queue_depth:
+            self.max_queue_depth = queue_depth
+
+
+class RunObserver:
+    """Receives performance events of runs and encoders.
+
+    All hooks do nothing by default, override the ones you need. Pass an
+    observer to create_run(observer=...) and DataStreamEncoder(observer=...).
+    """
+
+    def on_run_start(self, stats: RunStats) -> None:
+        """Called when a run starts."""
+
+    def on_chunk(
+        self, stats: RunStats, chunk: AssistantStreamChunk, queue_depth: int
+    ) -> None:
+        """Called for every chunk yielded by a run.
+
+        queue_depth is the number of chunks still waiting to be yielded.
+        """
+
+    def on_run_end(self, stats: RunStats) -> None:
+        """Called when a run ends, also when it was cancelled or failed."""
+
+    def on_encode(self, chunk_type: str, seconds: float, size: int) -> None:
+        """Called for every chunk encoded by an encoder.
+
+        size is the length of the encoded frame in bytes, 0 for chunks the
+        encoder skips.
+        """
+
+
+class Histogram:
+    """Keeps the most recent samples of a value for quantile summaries."""
+
+    def __init__(self, max_samples: int = 10_000):
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+_QUANTILES = (("0.5", 0.5), ("0.95", 0.95), ("0.99", 0.99))
+
+
+class MetricsAggregator(RunObserver):
+    """In-process aggregation of run metrics with p50/p95/p99 summaries.
+
+    Example:
+        metrics = MetricsAggregator()
+        create_run(callback, observer=metrics)
+
+        @app.get("/metrics")
+        def export():
+            return PlainTextResponse(metrics.to_prometheus())
+    """
+
+    def __init__(self, max_samples: int = 10_000, prefix: str = "assistant_stream"):
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self.runs_started = 0
+        self.runs_finished = 0
+        self.runs_cancelled = 0
+        self.chunks: Dict[str, int] = defaultdict(int)
+        self.text_bytes: Dict[str, int] = defaultdict(int)
+        self.encoded_bytes: Dict[str, int] = defaultdict(int)
+        self.state_flushes = 0
+        self.time_to_first_chunk = Histogram(max_samples)
+        self.duration = Histogram(max_samples)
+        self.chunks_per_second = Histogram(max_samples)
+        self.queue_depth = Histogram(max_samples)
+        self.encode_seconds: Dict[str, Histogram] = {}
+
+    @property
+    def active_runs(self) -> int:
+        return self.runs_started - self.runs_finished
+
+    def on_run_start(self, stats: RunStats) -> None:
+        with self._lock:
+            self.runs_started += 1
+
+    def on_run_end(self, stats: RunStats) -> None:
+        with self._lock:
+            self.runs_finished += 1
+            if stats.cancelled:
+                self.runs_cancelled += 1
+            for chunk_type, count in stats.chunk_counts.items():
+                self.chunks[chunk_type] += count
+            for chunk_type, size in stats.chunk_text_bytes.items():
+                self.text_bytes[chunk_type] += size
+            self.state_flushes += stats.state_flushes
+            self.queue_depth.observe(stats.max_queue_depth)
+            if stats.time_to_first_chunk is not None:
+                self.time_to_first_chunk.observe(stats.time_to_first_chunk)
+            if stats.duration is not None:
+                self.duration.observe(stats.duration)
+            if stats.chunks_per_second is not None:
+                self.chunks_per_second.observe(stats.chunks_per_second)
+
+    def on_encode(self, chunk_type: str, seconds: float, size: int) -> None:
+        with self._lock:
+            histogram = self.encode_seconds.get(chunk_type)
+            if histogram is None:
+                histogram = self.encode_seconds[chunk_type] = Histogram(
+                    self._max_samples
+                )
+            histogram.observe(seconds)
+            self.encoded_bytes[chunk_type] += size
+
+    def summary(self) -> Dict[str, object]:
+        """Aggregated metrics as a plain dict."""
+        with self._lock:
+            return {
+                "runs_started": self.runs_started,
+                "runs_finished": self.runs_finished,
+                "runs_cancelled": self.runs_cancelled,
+                "active_runs": self.active_runs,
+                "chunks": dict(self.chunks),
+                "text_bytes": dict(self.text_bytes),
+                "encoded_bytes": dict(self.encoded_bytes),
+                "state_flushes": self.state_flushes,
+                "time_to_first_chunk": self.time_to_first_chunk.summary(),
+                "duration": self.duration.summary(),
+                "chunks_per_second": self.chunks_per_second.summary(),
+                "max_queue_depth": self.queue_depth.summary(),
+                "encode_seconds": {
+                    chunk_type: histogram.summary()
+                    for chunk_type, histogram in self.encode_seconds.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """Aggregated metrics in the Prometheus text exposition format."""
+        p = self._prefix
+        lines: List[str] = []
+
+        def counter(name: str, value: float, labels: str = "") -> None:
+            lines.append(f"{p}_{name}{labels} {value}")
+
+        def summary(name: str, histogram: Histogram, label_text: str = "") -> None:
+            for text, q in _QUANTILES:
+                value = histogram.quantile(q)
+                if value is not None:
+                    quantile_labels = ",".join(
+                        filter(None, [label_text, f'quantile="{text}"'])
+                    )
+                    lines.append(f"{p}_{name}{{{quantile_labels}}} {value}")
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{p}_{name}_sum{suffix} {histogram.sum}")
+            lines.append(f"{p}_{name}_count{suffix} {histogram.count}")
+
+        with self._lock:
+            lines.append(f"# TYPE {p}_runs_started_total counter")
+            counter("runs_started_total", self.runs_started)
+            lines.append(f"# TYPE {p}_runs_cancelled_total counter")
+            counter("runs_cancelled_total", self.runs_cancelled)
+            lines.append(f"# TYPE {p}_active_runs gauge")
+            counter("active_runs", self.active_runs)
+            lines.append(f"# TYPE {p}_chunks_total counter")
+            for chunk_type, count in sorted(self.chunks.items()):
+                counter("chunks_total", count, f'{{type="{chunk_type}"}}')
+            lines.append(f"# TYPE {p}_chunk_text_bytes_total counter")
+            for chunk_type, size in sorted(self.text_bytes.items()):
+                counter("chunk_text_bytes_total", size, f'{{type="{chunk_type}"}}')
+            if self.encoded_bytes:
+                lines.append(f"# TYPE {p}_encoded_bytes_total counter")
+                for chunk_type, size in sorted(self.encoded_bytes.items()):
+                    counter("encoded_bytes_total", size, f'{{type="{chunk_type}"}}')
+            lines.append(f"# TYPE {p}_state_flushes_total counter")
+            counter("state_flushes_total", self.state_flushes)
+            for name, histogram in (
+                ("time_to_first_chunk_seconds", self.time_to_first_chunk),
+                ("run_duration_seconds", self.duration),
+                ("chunks_per_second", self.chunks_per_second),
+                ("max_queue_depth", self.queue_depth),
+            ):
+                lines.append(f"# TYPE {p}_{name} summary")
+                summary(name, histogram)
+            if self.encode_seconds:
+                lines.append(f"# TYPE {p}_encode_seconds summary")
+                for chunk_type, histogram in sorted(self.encode_seconds.items()):
+                    summary("encode_seconds", histogram, f'type="{chunk_type}"')
+
+        return "\n".join(lines) + "\n"
@@ -67,4 +67,5 @@ def append_langgraph_event(
                     #     continue
                     # state["messages"] = [c.model_dump() for c in channel_value]
 
+                # Runs created with diff_state=True send only the changes
                 state[channel_name] = channel_value
@@ -1,11 +1,13 @@
-import asyncio
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, Optional
 from assistant_stream.assistant_stream_chunk import (
     AssistantStreamChunk,
     ToolCallBeginChunk,
     ToolCallDeltaChunk,
     ToolResultChunk,
 )
+from assistant_stream.chunk_channel import ChunkChannel
+from assistant_stream.run_buffer import RunBuffer
+from assistant_stream.tracing import Span
 import string
 import random
 
@@ -18,18 +20,28 @@ def generate_openai_style_tool_call_id():
 
 
 class ToolCallController:
-    def __init__(self, queue, tool_name: str, tool_call_id: str, parent_id: str = None):
+    def __init__(
+        self,
+        channel: ChunkChannel,
+        tool_name: str,
+        tool_call_id: str,
+        parent_id: str = None,
+        buffer: Optional[RunBuffer] = None,
+        span: Optional[Span] = None,
+    ):
         self.tool_name = tool_name
         self.tool_call_id = tool_call_id
-        self.queue = queue
-        self.loop = asyncio.get_running_loop()
+        self.channel = channel
+        self._buffer = buffer if buffer is not None else RunBuffer(channel)
+        self._span = span
+        self._cancelled = False
 
         begin_chunk = ToolCallBeginChunk(
             tool_call_id=self.tool_call_id,
             tool_name=self.tool_name,
             parent_id=parent_id,
         )
-        self.queue.put_nowait(begin_chunk)
+        self._buffer.put(begin_chunk, force=True)
 
     def append_args_text(self, args_text_delta: str) -> None:
         """Append an args text delta to the stream."""
@@ -37,7 +49,12 @@ class ToolCallController:
             tool_call_id=self.tool_call_id,
             args_text_delta=args_text_delta,
         )
-        self.loop.call_soon_threadsafe(self.queue.put_nowait, chunk)
+        self._buffer.put(chunk)
+
+    async def append_args_text_async(self, args_text_delta: str) -> None:
+        """Append an args text delta, waiting for room in a bounded run buffer."""
+        await self._buffer.wait_for_space()
+        self.append_args_text(args_text_delta)
 
     def set_result(self, result: Any) -> None:
         """
@@ -65,28 +82,66 @@ class ToolCallController:
             artifact=artifact,
             is_error=is_error,
         )
-        self.loop.call_soon_threadsafe(self.queue.put_nowait, chunk)
+        self._buffer.put(chunk, force=True)
+        if self._span is not None and is_error:
+            self._span.set_attribute("is_error", True)
         self.close()
 
+    @property
+    def cancelled(self) -> bool:
+        """Whether the tool call was cancelled because its run was cancelled."""
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """Cancel the tool call and close its stream."""
+        if not self._cancelled:
+            self._cancelled = True
+            if self._span is not None:
+                self._span.set_attribute("cancelled", True)
+            self.close()
+
     def close(self) -> None:
         """Close the stream."""
-        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+        self._buffer.put(None, force=True)
+        if self._span is not None:
+            self._span.end()
 
 
 async def create_tool_call(
     tool_name: str,
     tool_call_id: str,
     parent_id: str = None,
+    run_buffer: Optional[RunBuffer] = None,
+    span: Optional[Span] = None,
 ) -> tuple[AsyncGenerator[AssistantStreamChunk, None], ToolCallController]:
-    queue = asyncio.Queue()
-    controller = ToolCallController(queue, tool_name, tool_call_id, parent_id)
+    """Create a tool call and the stream of its chunks.
+
+    Args:
+        tool_name: Name of the called tool
+        tool_call_id: ID of the tool call
+        parent_id: ID of the parent tool call, if any
+        run_buffer: The run's buffer. Its limits and policy also apply to the
+            chunks of the tool call that have not been forwarded to the run.
+        span: Span of the tool call, ended when the tool call is closed
+    """
+    channel = ChunkChannel()
+    buffer = (
+        run_buffer.with_channel(channel)
+        if run_buffer is not None
+        else RunBuffer(channel)
+    )
+    controller = ToolCallController(
+        channel, tool_name, tool_call_id, parent_id, buffer, span
+    )
 
     async def stream():
         while True:
-            chunk = await controller.queue.get()
-            if chunk is None:
-                break
-            yield chunk
-            controller.queue.task_done()
+            await channel.wait()
+            for chunk in channel.drain():
+                if chunk is None:
+                    return
+                yield chunk
+                # Forwarded to the run, make room for the producer
+                buffer.release(chunk)
 
     return stream(), controller
@@ -0,0 +1,211 @@
+import asyncio
+import concurrent.futures
+import hmac
+import json
+import os
+import struct
+from dataclasses import fields
+from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple
+
+from assistant_stream.assistant_stream_chunk import AssistantStreamChunk, CHUNK_TYPES
+from assistant_stream.serialization.json_backend import get_json_backend
+from assistant_stream.thread_controller import ThreadRunController
+
+# Avoid circular import
+if TYPE_CHECKING:
+    from assistant_stream.create_run import RunController
+
+# Frame: kind (1 byte), payload length (4 bytes), payload.
+# Chunk frames use the chunk class as kind and a JSON array of its field
+# values, in declaration order and without the type tag, as payload.
+_HEADER = struct.Struct("!BI")
+FRAME_HELLO = 0x00
+FRAME_DONE = 0xF0
+FRAME_ERROR = 0xF1
+FRAME_CANCEL = 0xF2
+
+_CHUNK_CLASSES = list(CHUNK_TYPES.values())
+_CHUNK_KINDS = {cls: kind for kind, cls in enumerate(_CHUNK_CLASSES, start=1)}
+_CHUNK_FIELDS = {
+    cls: tuple(field.name for field in fields(cls) if field.name != "type")
+    for cls in _CHUNK_CLASSES
+}
+
+# Child processes await drain once this many bytes are waiting to be sent
+_HIGH_WATER = 64 * 1024
+
+
+class ProcessRunError(Exception):
+    """Raised when a run executed in a worker process fails.
+
+    Args:
+        reported: Whether the child already emitted an error chunk for it
+    """
+
+    def __init__(self, message: str, reported: bool = False):
+        super().__init__(message)
+        self.reported = reported
+
+
+def encode_frame(kind: int, payload: bytes = b"") -> bytes:
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_chunk_frame(chunk: AssistantStreamChunk) -> bytes:
+    chunk_class = type(chunk)
+    values = [getattr(chunk, name) for name in _CHUNK_FIELDS[chunk_class]]
+    payload = get_json_backend().dumps(values)
+    return encode_frame(_CHUNK_KINDS[chunk_class], payload)
+
+
+def decode_chunk_frame(kind: int, payload: bytes) -> AssistantStreamChunk:
+    try:
+        chunk_class = _CHUNK_CLASSES[kind - 1]
+    except IndexError:
+        raise ValueError(f"Invalid frame kind: {kind}")
+    values = get_json_backend().loads(payload)
+    return chunk_class(**dict(zip(_CHUNK_FIELDS[chunk_class], values)))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    kind, length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    payload = await reader.readexactly(length) if length else b""
+    return kind, payload
+
+
+def _error_frame(error: BaseException, reported: bool) -> bytes:
+    payload = {"message": str(error), "reported": reported}
+    return encode_frame(FRAME_ERROR, json.dumps(payload).encode())
+
+
+def _child_main(
+    callback: Callable, host: str, port: int, token: bytes, state: Any
+) -> None:
+    """Entry point in the worker process."""
+    asyncio.run(_child_run(callback, host, port, token, state))
+
+
+async def _child_run(
+    callback: Callable, host: str, port: int, token: bytes, state: Any
+) -> None:
+    from assistant_stream.create_run import (
+        create_run,
+        _call_in_thread,
+        _is_async_callable,
+    )
+
+    loop = asyncio.get_running_loop()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_frame(FRAME_HELLO, token))
+
+    errors = []
+
+    async def guarded(controller: "RunController") -> None:
+        # Callback errors are reported to the parent, which emits the error chunk
+        try:
+            if _is_async_callable(callback):
+                await callback(controller)
+            else:
+                await loop.run_in_executor(
+                    None, _call_in_thread, callback, ThreadRunController(controller)
+                )
+        except Exception as e:
+            errors.append(e)
+
+    consumer = asyncio.current_task()
+
+    async def watch_parent() -> None:
+        # A cancel frame or a closed connection cancels the run
+        await reader.read(_HEADER.size)
+        consumer.cancel()
+
+    watcher = asyncio.create_task(watch_parent())
+    stream = create_run(guarded, state=state)
+    try:
+        try:
+            async for chunk in stream:
+                writer.write(encode_chunk_frame(chunk))
+                if writer.transport.get_write_buffer_size() > _HIGH_WATER:
+                    await writer.drain()
+        except Exception as e:
+            writer.write(_error_frame(e, reported=True))
+        else:
+            if errors:
+                writer.write(_error_frame(errors[0], reported=False))
+            else:
+                writer.write(encode_frame(FRAME_DONE))
+        await writer.drain()
+    except (asyncio.CancelledError, ConnectionError):
+        pass
+    finally:
+        watcher.cancel()
+        await stream.aclose()
+        writer.close()
+
+
+async def run_in_process(
+    callback: Callable,
+    process_pool: concurrent.futures.Executor,
+    state: Any,
+    controller: "RunController",
+) -> None:
+    """Run callback in a worker process, forwarding its chunks to controller.
+
+    Used by create_run(process_pool=...). The callback must be picklable,
+    e.g. a module level function. State updates from the child are applied
+    to the controller's local state.
+    """
+    loop = asyncio.get_running_loop()
+    token = os.urandom(16)
+    connected: asyncio.Future = loop.create_future()
+
+    def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if connected.done():
+            writer.close()
+        else:
+            connected.set_result((reader, writer))
+
+    server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    job = loop.run_in_executor(
+        process_pool, _child_main, callback, host, port, token, state
+    )
+    writer = None
+    try:
+        await asyncio.wait({connected, job}, return_when=asyncio.FIRST_COMPLETED)
+        if not connected.done():
+            # The worker failed to start, or finished before the connection
+            # was accepted
+            job.result()
+        reader, writer = await connected
+        server.close()
+
+        kind, payload = await read_frame(reader)
+        if kind != FRAME_HELLO or not hmac.compare_digest(payload, token):
+            raise ProcessRunError("Unexpected connection from worker process")
+
+        state_manager = controller._state_manager
+        while True:
+            kind, payload = await read_frame(reader)
+            if kind == FRAME_DONE:
+                break
+            if kind == FRAME_ERROR:
+                error: Dict[str, Any] = json.loads(payload)
+                raise ProcessRunError(error["message"], error["reported"])
+
+            chunk = decode_chunk_frame(kind, payload)
+            if chunk.type == "update-state":
+                state_manager.apply_remote_operations(chunk.operations)
+            await controller._put_substream_chunk(chunk)
+
+        await job
+    except asyncio.CancelledError:
+        if writer is not None and not writer.is_closing():
+            writer.write(encode_frame(FRAME_CANCEL))
+        raise
+    except asyncio.IncompleteReadError:
+        raise ProcessRunError("Worker process closed the connection")
+    finally:
+        server.close()
+        if writer is not None:
+            writer.close()
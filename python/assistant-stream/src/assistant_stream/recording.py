@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+from typing import IO, Any, AsyncGenerator, Iterator, List, Optional, Tuple
+
+from assistant_stream.assistant_stream_chunk import (
+    AssistantStreamChunk,
+    chunk_from_dict,
+    chunk_to_dict,
+)
+from assistant_stream.serialization.data_stream import StateProxyJSONEncoder
+
+# Each recorded run starts with a header line {"started_at": unix time},
+# followed by one line per chunk: [seconds since the first chunk, chunk fields]
+_encoder = StateProxyJSONEncoder(separators=(",", ":"))
+
+# Characters of recorded lines buffered before they are written
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+
+async def record_stream(
+    stream: AsyncGenerator[AssistantStreamChunk, None],
+    path: str,
+) -> AsyncGenerator[AssistantStreamChunk, None]:
+    """Pass a chunk stream through while appending every chunk to a recording.
+
+    A file can hold several runs, each is appended after the previous ones
+    and replayed separately. Lines are buffered and written in a worker
+    thread, so the file is complete once the stream ends or is closed.
+
+    Example:
+        stream = record_stream(create_run(callback), "recordings/run.jsonl")
+        return DataStreamResponse(stream)
+    """
+    f = await asyncio.to_thread(open, path, "a", encoding="utf-8")
+    lines = [_encoder.encode({"started_at": time.time()}), "\n"]
+    buffered = 0
+    start = None
+    try:
+        async for chunk in stream:
+            now = time.monotonic()
+            if start is None:
+                start = now
+            line = _encoder.encode([round(now - start, 6), chunk_to_dict(chunk)])
+            lines.append(line)
+            lines.append("\n")
+            buffered += len(line)
+            if buffered >= _WRITE_BUFFER_SIZE:
+                await asyncio.to_thread(f.writelines, lines)
+                lines = []
+                buffered = 0
+            yield chunk
+    finally:
+        try:
+            await stream.aclose()
+        finally:
+            await asyncio.to_thread(_write_and_close, f, lines)
+
+
+def _write_and_close(f: IO[str], lines: List[str]) -> None:
+    with f:
+        f.writelines(lines)
+
+
+def _read_records(path: str) -> Iterator[Tuple[int, Any]]:
+    """Yield the run index and record of each chunk line of a recording.
+
+    Each run header yields (run, None), so runs without chunks are found.
+    """
+    run = -1
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                run += 1
+                yield run, None
+                continue
+            # Chunks before the first header belong to run 0
+            run = max(run, 0)
+            yield run, record
+
+
+def read_recording(
+    path: str, run: int = 0
+) -> Iterator[Tuple[float, AssistantStreamChunk]]:
+    """Read the (time offset, chunk) pairs of a recording.
+
+    Args:
+        path: File written by record_stream
+        run: Index of the run in the file, negative values count from the
+            last run
+
+    Raises:
+        IndexError: If the file has no such run
+    """
+    if run < 0:
+        run += 1 + max((index for index, _ in _read_records(path)), default=-1)
+    found = False
+    for index, record in _read_records(path):
+        if index < run:
+            continue
+        if index > run:
+            return
+        found = True
+        if record is not None:
+            offset, data = record
+            yield offset, chunk_from_dict(data)
+    if not found:
+        raise IndexError(f"Recording {path} has no run {run}")
+
+
+async def replay_recording(
+    path: str,
+    speed: Optional[float] = 1.0,
+    run: int = 0,
+) -> AsyncGenerator[AssistantStreamChunk, None]:
+    """Replay a run of a recording as a chunk stream.
+
+    Args:
+        path: File written by record_stream
+        speed: Playback speed relative to the recording, e.g. 1.0 or 10.0.
+            None replays as fast as possible.
+        run: Index of the run in the file, negative values count from the
+            last run
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed must be positive")
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for offset, chunk in read_recording(path, run):
+        if speed is not None:
+            delay = start + offset / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield chunk
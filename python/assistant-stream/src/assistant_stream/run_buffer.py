@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from typing import Literal, Optional
+
+from assistant_stream.assistant_stream_chunk import (
+    AssistantStreamChunk,
+    ErrorChunk,
+    ReasoningDeltaChunk,
+    TextDeltaChunk,
+    ToolCallDeltaChunk,
+)
+from assistant_stream.chunk_channel import ChunkChannel
+from assistant_stream.chunk_coalescer import DeltaCoalescer, delta_merge_key
+
+BufferPolicy = Literal["block", "coalesce", "fail"]
+
+# Text fields counted towards the buffered size of a chunk
+_SIZE_FIELDS = {
+    TextDeltaChunk: "text_delta",
+    ReasoningDeltaChunk: "reasoning_delta",
+    ToolCallDeltaChunk: "args_text_delta",
+    ErrorChunk: "error",
+}
+
+
+def chunk_size(chunk: AssistantStreamChunk) -> int:
+    """Approximate buffered size of a chunk, based on its text payload."""
+    field = _SIZE_FIELDS.get(type(chunk))
+    if field is None:
+        return 0
+    return len(getattr(chunk, field))
+
+
+class RunBufferFullError(Exception):
+    """Raised when a chunk is produced while the run buffer is full."""
+
+
+class RunBuffer:
+    """Tracks chunks produced by a run that have not been consumed yet.
+
+    Without limits the buffer is unbounded. When max_chunks or max_bytes is
+    reached, the policy decides what happens to new chunks:
+
+    - "block": awaitable producer methods suspend until the consumer catches
+      up. Synchronous producer methods still enqueue.
+    - "coalesce": deltas are merged into a single pending delta that is
+      released once the consumer catches up.
+    - "fail": producer methods raise RunBufferFullError.
+    """
+
+    def __init__(
+        self,
+        channel: ChunkChannel,
+        max_chunks: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: BufferPolicy = "block",
+    ):
+        if policy not in ("block", "coalesce", "fail"):
+            raise ValueError(f"Invalid buffer policy: {policy}")
+
+        self._channel = channel
+        self._max_chunks = max_chunks
+        self._max_bytes = max_bytes
+        self._bounded = max_chunks is not None or max_bytes is not None
+        self._policy = policy
+        self._lock = threading.Lock()
+        self._chunks = 0
+        self._bytes = 0
+        self._space = asyncio.Event()
+        self._space.set()
+        self._overflow = DeltaCoalescer()
+
+    def with_channel(self, channel: ChunkChannel) -> "RunBuffer":
+        """Create a buffer for another channel with the same limits and policy."""
+        return RunBuffer(channel, self._max_chunks, self._max_bytes, self._policy)
+
+    @property
+    def is_full(self) -> bool:
+        """Whether the buffer has reached one of its limits."""
+        if self._max_chunks is not None and self._chunks >= self._max_chunks:
+            return True
+        if self._max_bytes is not None and self._bytes >= self._max_bytes:
+            return True
+        return False
+
+    def put(self, chunk: Optional[AssistantStreamChunk], force: bool = False) -> None:
+        """Enqueue a chunk from any thread.
+
+        Forced chunks (state updates, substream chunks, errors) are never
+        rejected by the "fail" policy.
+        """
+        if not self._bounded:
+            self._channel.put(chunk)
+            return
+
+        with self._lock:
+            if self.is_full:
+                if self._policy == "fail" and not force:
+                    raise RunBufferFullError(
+                        "Run buffer is full, the consumer is not keeping up"
+                    )
+                if self._policy == "coalesce" and delta_merge_key(chunk):
+                    ready = self._overflow.push(chunk)
+                    for item in ready:
+                        self._enqueue_locked(item)
+                    return
+
+            # Keep ordering: merged overflow deltas go out before this chunk
+            for item in self._overflow.flush():
+                self._enqueue_locked(item)
+            self._enqueue_locked(chunk)
+
+    def _enqueue_locked(self, chunk: Optional[AssistantStreamChunk]) -> None:
+        if chunk is not None:
+            self._chunks += 1
+            self._bytes += chunk_size(chunk)
+        self._channel.put(chunk)
+
+    def release(self, chunk: AssistantStreamChunk) -> None:
+        """Mark a chunk as consumed. Must be called on the event loop."""
+        if not self._bounded:
+            return
+
+        with self._lock:
+            self._chunks -= 1
+            self._bytes -= chunk_size(chunk)
+            if self.is_full:
+                return
+            for item in self._overflow.flush():
+                self._enqueue_locked(item)
+
+        self._space.set()
+
+    async def wait_for_space(self) -> None:
+        """Suspend until the buffer has room, if the policy is "block"."""
+        if self._policy != "block":
+            return
+        while self.is_full:
+            self._space.clear()
+            await self._space.wait()
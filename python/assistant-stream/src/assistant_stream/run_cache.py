@@ -0,0 +1,227 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Callable, Coroutine, List, Optional, Tuple
+
+from assistant_stream.assistant_stream_chunk import (
+    AssistantStreamChunk,
+    UpdateStateChunk,
+    chunk_from_dict,
+    chunk_to_dict,
+)
+from assistant_stream.create_run import RunController, create_run
+from assistant_stream.serialization.data_stream import StateProxyJSONEncoder
+from assistant_stream.state_manager import StateManager
+
+
+class CachedRun:
+    """A recorded run: its chunks with their time offsets and its final state."""
+
+    def __init__(
+        self,
+        chunks: List[Tuple[float, AssistantStreamChunk]],
+        final_state: Any = None,
+        created_at: Optional[float] = None,
+    ):
+        self.chunks = chunks
+        self.final_state = final_state
+        self.created_at = time.time() if created_at is None else created_at
+        self.size = 0
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "created_at": self.created_at,
+                "final_state": self.final_state,
+                "chunks": [[offset, chunk_to_dict(chunk)] for offset, chunk in self.chunks],
+            },
+            cls=StateProxyJSONEncoder,
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "CachedRun":
+        record = json.loads(data)
+        return cls(
+            [(offset, chunk_from_dict(chunk)) for offset, chunk in record["chunks"]],
+            record["final_state"],
+            record["created_at"],
+        )
+
+    async def replay(
+        self, preserve_timing: bool = False
+    ) -> AsyncGenerator[AssistantStreamChunk, None]:
+        """Yield the recorded chunks, optionally with their original timing."""
+        start = asyncio.get_running_loop().time()
+        for offset, chunk in self.chunks:
+            if preserve_timing:
+                delay = start + offset - asyncio.get_running_loop().time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield chunk
+
+
+class RunCache:
+    """LRU cache of recorded runs, with optional TTL and on-disk storage.
+
+    Entries are evicted when there are more than max_entries, when their
+    serialized size exceeds max_bytes in total, or when they are older than
+    ttl seconds. With a directory, entries are also written to disk and
+    loaded from there on a memory miss. The cache can be used from several
+    threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = 128,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        directory: Optional[str] = None,
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._directory = directory
+        self._entries: "OrderedDict[str, CachedRun]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, entry: CachedRun) -> bool:
+        return self._ttl is not None and time.time() - entry.created_at > self._ttl
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, f"{digest}.json")
+
+    def get(self, key: str) -> Optional[CachedRun]:
+        """Look up a run, refreshing its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry):
+                self._entries.move_to_end(key)
+                return entry
+        if entry is not None:
+            self.delete(key)
+            return None
+
+        if self._directory is None:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        entry = CachedRun.from_json(data)
+        if self._expired(entry):
+            self.delete(key)
+            return None
+        self._store_in_memory(key, entry, len(data))
+        return entry
+
+    def set(self, key: str, entry: CachedRun) -> None:
+        """Store a run in memory and, if configured, on disk."""
+        data = None
+        if self._max_bytes is not None or self._directory is not None:
+            data = entry.to_json()
+        if self._directory is not None:
+            path = self._path(key)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        self._store_in_memory(key, entry, len(data) if data is not None else 0)
+
+    def _store_in_memory(self, key: str, entry: CachedRun, size: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).size
+            entry.size = size
+            self._entries[key] = entry
+            self._bytes += size
+
+            while self._entries and (
+                (self._max_entries is not None and len(self._entries) > self._max_entries)
+                or (self._max_bytes is not None and self._bytes > self._max_bytes)
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def delete(self, key: str) -> None:
+        """Remove a run from memory and disk."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+        if self._directory is not None:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+async def cached_run(
+    cache: RunCache,
+    key: str,
+    callback: Callable[[RunController], Coroutine[Any, Any, None]],
+    *,
+    state: Any | None = None,
+    preserve_timing: bool = False,
+    **kwargs: Any,
+) -> AsyncGenerator[AssistantStreamChunk, None]:
+    """Like create_run, but replays a cached run for a known request fingerprint.
+
+    Args:
+        cache: The cache to look up and store runs in
+        key: Caller-supplied fingerprint of the request
+        callback: Coroutine function receiving the RunController
+        state: Initial state data
+        preserve_timing: Replay hits with the original inter-chunk timing
+            instead of at full speed
+        **kwargs: Further arguments for create_run
+
+    Only runs that complete without an error are stored. After a replayed
+    run, the state passed in holds the cached final state, as after the
+    original run.
+    """
+    # Lookups and stores may read files and serialize the run
+    entry = await asyncio.to_thread(cache.get, key)
+    if entry is not None:
+        async for chunk in entry.replay(preserve_timing):
+            yield chunk
+        _apply_final_state(state, entry.final_state)
+        return
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    final_state = StateManager(lambda _: None, copy.deepcopy(state))
+    chunks = []
+    stream = create_run(callback, state=state, **kwargs)
+    try:
+        async for chunk in stream:
+            chunks.append((loop.time() - start, chunk))
+            if isinstance(chunk, UpdateStateChunk):
+                final_state.apply_remote_operations(chunk.operations)
+            yield chunk
+    finally:
+        # Propagate an early close to the run so that it gets cancelled
+        await stream.aclose()
+
+    await asyncio.to_thread(cache.set, key, CachedRun(chunks, final_state.state_data))
+
+
+def _apply_final_state(state: Any, final_state: Any) -> None:
+    """Replace the contents of the caller's state with a copy of final_state."""
+    if isinstance(state, dict) and isinstance(final_state, dict):
+        state.clear()
+        state.update(copy.deepcopy(final_state))
+    elif isinstance(state, list) and isinstance(final_state, list):
+        state[:] = copy.deepcopy(final_state)
@@ -0,0 +1,251 @@
+import asyncio
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, Mapping, Optional, Union
+
+from starlette.responses import StreamingResponse
+
+from assistant_stream.assistant_stream_chunk import AssistantStreamChunk
+from assistant_stream.serialization.data_stream import DataStreamEncoder
+from assistant_stream.serialization.stream_encoder import StreamEncoder
+
+Frame = Union[str, bytes]
+
+
+class ReplayOffsetError(LookupError):
+    """Raised when a requested offset is no longer (or not yet) available."""
+
+
+class ReplayBuffer:
+    """Bounded buffer of encoded frames addressed by absolute offsets.
+
+    Frame offsets start at 0 and keep increasing when old frames are evicted,
+    so a reader can resume from the offset of the first frame it missed.
+    """
+
+    def __init__(self, max_frames: Optional[int] = None, max_bytes: Optional[int] = None):
+        self._max_frames = max_frames
+        self._max_bytes = max_bytes
+        self._frames: Deque[Frame] = deque()
+        self._sizes: Deque[int] = deque()
+        self._bytes = 0
+        self._first_offset = 0
+        self._closed = False
+        self._new_frame = asyncio.Event()
+
+    @property
+    def first_offset(self) -> int:
+        """Offset of the oldest frame still in the buffer."""
+        return self._first_offset
+
+    @property
+    def next_offset(self) -> int:
+        """Offset the next appended frame will get."""
+        return self._first_offset + len(self._frames)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the producing run has finished."""
+        return self._closed
+
+    def append(self, frame: Frame) -> None:
+        """Append a frame, evicting the oldest frames when over the limits."""
+        # Text frames are sent UTF-8 encoded
+        size = len(frame.encode()) if isinstance(frame, str) else len(frame)
+        self._frames.append(frame)
+        self._sizes.append(size)
+        self._bytes += size
+        while len(self._frames) > 1 and (
+            (self._max_frames is not None and len(self._frames) > self._max_frames)
+            or (self._max_bytes is not None and self._bytes > self._max_bytes)
+        ):
+            self._frames.popleft()
+            self._bytes -= self._sizes.popleft()
+            self._first_offset += 1
+        self._notify()
+
+    def close(self) -> None:
+        """Mark the buffer as complete and wake up all readers."""
+        self._closed = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._new_frame.set()
+        self._new_frame = asyncio.Event()
+
+    async def read_from(self, offset: int = 0) -> AsyncGenerator[Frame, None]:
+        """Yield the frames from offset onwards, followed by the live tail."""
+        if offset > self.next_offset:
+            raise ReplayOffsetError(f"Offset {offset} has not been produced yet")
+
+        while True:
+            while offset < self.next_offset:
+                if offset < self._first_offset:
+                    raise ReplayOffsetError(
+                        f"Offset {offset} was evicted from the replay buffer"
+                    )
+                frame = self._frames[offset - self._first_offset]
+                offset += 1
+                yield frame
+
+            if self._closed:
+                return
+            await self._new_frame.wait()
+
+
+class _RegisteredRun:
+    def __init__(self, buffer: ReplayBuffer, media_type: str):
+        self.buffer = buffer
+        self.media_type = media_type
+        self.task: Optional[asyncio.Task] = None
+        self.error: Optional[BaseException] = None
+
+
+class RunRegistry:
+    """Keeps in-flight runs alive independently of the client connection.
+
+    Each run is encoded once into a bounded ReplayBuffer, so a client that
+    reconnects can reattach from the offset of the first frame it missed.
+
+    Server-sent event responses carry the offset of each frame in its id
+    field, which EventSource clients send back as Last-Event-ID when they
+    reconnect. Other formats, such as the data stream protocol, have no id
+    field. There, the X-Run-Offset response header is the offset of the first
+    frame, each following frame has the next offset, and clients send the
+    offset of the last frame they received as Last-Event-ID.
+
+    Example:
+        registry = RunRegistry()
+
+        @app.post("/api/chat")
+        async def chat(request: Request):
+            run_id = str(uuid4())
+            registry.start(run_id, create_run(callback))
+            return registry.response(run_id)
+
+        @app.get("/api/chat/{run_id}")
+        async def resume(run_id: str, request: Request):
+            return registry.response(run_id, resume_offset(request.headers))
+    """
+
+    def __init__(
+        self,
+        max_frames: Optional[int] = 10_000,
+        max_bytes: Optional[int] = None,
+        retention: float = 60.0,
+    ):
+        """
+        Args:
+            max_frames: Maximum number of frames kept per run
+            max_bytes: Maximum size in UTF-8 bytes of the frames kept per run
+            retention: Seconds a finished run stays available for reattaching
+        """
+        self._max_frames = max_frames
+        self._max_bytes = max_bytes
+        self._retention = retention
+        self._runs: Dict[str, _RegisteredRun] = {}
+
+    def __contains__(self, run_id: str) -> bool:
+        return run_id in self._runs
+
+    def start(
+        self,
+        run_id: str,
+        stream: AsyncGenerator[AssistantStreamChunk, None],
+        stream_encoder: Optional[StreamEncoder] = None,
+    ) -> ReplayBuffer:
+        """Start consuming a run in the background and register it under run_id."""
+        if run_id in self._runs:
+            raise ValueError(f"Run {run_id} is already registered")
+
+        if stream_encoder is None:
+            stream_encoder = DataStreamEncoder()
+
+        run = _RegisteredRun(
+            ReplayBuffer(self._max_frames, self._max_bytes),
+            stream_encoder.get_media_type(),
+        )
+        self._runs[run_id] = run
+        run.task = asyncio.create_task(
+            self._pump(run_id, run, stream_encoder.encode_stream(stream))
+        )
+        return run.buffer
+
+    async def _pump(
+        self,
+        run_id: str,
+        run: _RegisteredRun,
+        frames: AsyncGenerator[Frame, None],
+    ) -> None:
+        try:
+            async for frame in frames:
+                run.buffer.append(frame)
+        except Exception as e:
+            run.error = e
+        finally:
+            run.buffer.close()
+            asyncio.get_running_loop().call_later(
+                self._retention, self._remove, run_id, run
+            )
+
+    def _remove(self, run_id: str, run: _RegisteredRun) -> None:
+        if self._runs.get(run_id) is run:
+            del self._runs[run_id]
+
+    def attach(self, run_id: str, offset: int = 0) -> AsyncGenerator[Frame, None]:
+        """Stream the encoded frames of a run starting at offset."""
+        run = self._runs.get(run_id)
+        if run is None:
+            raise KeyError(run_id)
+        return run.buffer.read_from(offset)
+
+    def response(self, run_id: str, offset: int = 0) -> StreamingResponse:
+        """Create a response streaming the run from offset.
+
+        Server-sent events get their offset as event id.
+        """
+        run = self._runs.get(run_id)
+        if run is None:
+            raise KeyError(run_id)
+        frames = self.attach(run_id, offset)
+        if run.media_type == "text/event-stream":
+            frames = _with_event_ids(frames, offset)
+        return StreamingResponse(
+            frames,
+            media_type=run.media_type,
+            headers={"X-Run-Id": run_id, "X-Run-Offset": str(offset)},
+        )
+
+    def cancel(self, run_id: str) -> None:
+        """Cancel a registered run."""
+        run = self._runs.get(run_id)
+        if run is not None and run.task is not None:
+            run.task.cancel()
+
+
+async def _with_event_ids(
+    frames: AsyncGenerator[Frame, None], offset: int
+) -> AsyncGenerator[Frame, None]:
+    """Prefix each server-sent event frame with an id field holding its offset."""
+    try:
+        async for frame in frames:
+            if isinstance(frame, bytes):
+                yield b"id: %d\n" % offset + frame
+            else:
+                yield f"id: {offset}\n{frame}"
+            offset += 1
+    finally:
+        await frames.aclose()
+
+
+def resume_offset(headers: Mapping[str, str]) -> int:
+    """Offset to resume from, based on the Last-Event-ID header.
+
+    Last-Event-ID holds the offset of the last frame the client received.
+    """
+    last_event_id = headers.get("last-event-id")
+    if last_event_id is None:
+        return 0
+    try:
+        return int(last_event_id) + 1
+    except ValueError:
+        return 0
@@ -0,0 +1,107 @@
+import asyncio
+import heapq
+import itertools
+from typing import List, Optional, Tuple
+
+# Lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class RunRejectedError(Exception):
+    """Raised when a run cannot be queued because the scheduler queue is full."""
+
+
+class RunScheduler:
+    """Limits the number of concurrently active runs in a process.
+
+    Runs beyond max_concurrent_runs wait in a priority queue. Among waiting
+    runs, lower priority values are admitted first, in arrival order.
+
+    Example:
+        scheduler = RunScheduler(max_concurrent_runs=50)
+
+        create_run(callback, scheduler=scheduler, priority=PRIORITY_INTERACTIVE)
+    """
+
+    def __init__(
+        self,
+        max_concurrent_runs: int,
+        max_queued_runs: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_concurrent_runs: Maximum number of runs executing at once
+            max_queued_runs: Maximum number of waiting runs, further runs are
+                rejected with RunRejectedError
+        """
+        if max_concurrent_runs < 1:
+            raise ValueError("max_concurrent_runs must be at least 1")
+        self._max_concurrent_runs = max_concurrent_runs
+        self._max_queued_runs = max_queued_runs
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._admitted = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    @property
+    def active_runs(self) -> int:
+        """Number of runs currently executing."""
+        return self._active
+
+    @property
+    def queued_runs(self) -> int:
+        """Number of runs waiting to be admitted."""
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    @property
+    def average_wait_time(self) -> float:
+        """Average time admitted runs spent in the queue, in seconds."""
+        return self._total_wait_time / self._admitted if self._admitted else 0.0
+
+    @property
+    def max_wait_time(self) -> float:
+        """Longest time an admitted run spent in the queue, in seconds."""
+        return self._max_wait_time
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Wait for a slot and return the time spent waiting, in seconds."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        if self._active < self._max_concurrent_runs and not self.queued_runs:
+            self._active += 1
+        else:
+            if (
+                self._max_queued_runs is not None
+                and self.queued_runs >= self._max_queued_runs
+            ):
+                raise RunRejectedError("Too many runs are waiting to be scheduled")
+
+            waiter = loop.create_future()
+            heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+            try:
+                # The slot is handed over by release()
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Admitted right before being cancelled, pass the slot on
+                    self.release()
+                raise
+
+        wait_time = loop.time() - start
+        self._admitted += 1
+        self._total_wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+        return wait_time
+
+    def release(self) -> None:
+        """Free a slot, admitting the next waiting run if there is one."""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
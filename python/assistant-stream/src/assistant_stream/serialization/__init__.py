@@ -2,6 +2,12 @@ from assistant_stream.serialization.data_stream import (
     DataStreamEncoder,
     DataStreamResponse,
 )
+from assistant_stream.serialization.json_backend import (
+    JSONBackend,
+    OrjsonBackend,
+    get_json_backend,
+    set_json_backend,
+)
 from assistant_stream.serialization.openai_stream import (
     OpenAIStreamEncoder,
     OpenAIStreamResponse,
@@ -12,4 +18,8 @@ __all__ = [
     "DataStreamResponse",
     "OpenAIStreamEncoder",
     "OpenAIStreamResponse",
+    "JSONBackend",
+    "OrjsonBackend",
+    "get_json_backend",
+    "set_json_backend",
 ]
@@ -1,8 +1,121 @@
+import asyncio
+import zlib
 from assistant_stream.assistant_stream_chunk import AssistantStreamChunk
 from assistant_stream.serialization.stream_encoder import StreamEncoder
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
+from starlette.datastructures import Headers
 from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Frames of these chunk types are sent without waiting for more data
+FLUSH_CHUNK_TYPES = frozenset({"tool-result", "error"})
+
+# Compressed responses are flushed at least this often, in uncompressed bytes
+DEFAULT_COMPRESSED_FLUSH_SIZE = 16 * 1024
+
+# Preferred first
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Choose gzip or deflate from an Accept-Encoding header, if accepted."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in _WBITS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _CoalescingWriter:
+    """Buffers response body frames and sends them in batches.
+
+    With a compressor, each batch is compressed with the same compression
+    stream and ends with a sync flush, so the client can decode it at once.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        flush_size: int,
+        flush_interval: float,
+        compressor: Optional["zlib._Compress"] = None,
+    ):
+        self._send = send
+        self._compressor = compressor
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval
+        self._loop = asyncio.get_running_loop()
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_flush: Optional[asyncio.Task] = None
+        self._first = True
+
+    async def write(self, frame: bytes, flush: bool = False) -> None:
+        timer_flush = self._timer_flush
+        if timer_flush is not None and timer_flush.done():
+            self._timer_flush = None
+            # Surfaces send errors, e.g. a disconnected client
+            timer_flush.result()
+
+        self._buffer += frame
+        if flush or self._first or len(self._buffer) >= self._flush_size:
+            # The first frame is sent immediately for time to first token
+            self._first = False
+            await self.flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self._flush_interval, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._timer_flush = self._loop.create_task(self.flush())
+
+    async def flush(self, more_body: bool = True) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            if not self._buffer and more_body:
+                return
+            body = bytes(self._buffer)
+            self._buffer.clear()
+            compressor = self._compressor
+            if compressor is not None:
+                body = compressor.compress(body) + compressor.flush(
+                    zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH
+                )
+            await self._send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+
+    async def close(self) -> None:
+        """Send the remaining frames and end the response body."""
+        await self.flush(more_body=False)
+
+    def cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        timer_flush = self._timer_flush
+        if timer_flush is not None:
+            self._timer_flush = None
+            if timer_flush.done():
+                if not timer_flush.cancelled():
+                    # Mark a send error as retrieved, the response already failed
+                    timer_flush.exception()
+            else:
+                timer_flush.cancel()
 
 
 class AssistantStreamResponse(StreamingResponse):
@@ -10,8 +123,106 @@ class AssistantStreamResponse(StreamingResponse):
         self,
         stream: AsyncGenerator[AssistantStreamChunk, None],
         stream_encoder: StreamEncoder,
+        flush_size: Optional[int] = None,
+        flush_interval: float = 0.01,
+        compression: bool = False,
+        compression_level: int = 6,
     ):
+        """
+        Args:
+            stream: The run's chunk stream
+            stream_encoder: Encodes the chunks into the response format
+            flush_size: Enables write coalescing. Encoded frames are buffered
+                and sent once this many bytes are waiting, when a tool result
+                or error is encoded, or at the end of the run. The first frame
+                is always sent immediately.
+            flush_interval: Maximum seconds a buffered frame waits before it
+                is sent, when write coalescing is enabled. This is also the
+                idle time after which compressed data is flushed.
+            compression: Compress the response with gzip or deflate if the
+                client accepts it. Output is flushed at the same points as
+                with write coalescing, with flush_size defaulting to
+                DEFAULT_COMPRESSED_FLUSH_SIZE.
+            compression_level: zlib compression level, from 1 to 9
+        """
+        self._stream = stream
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval
+        self._compression = compression
+        self._compression_level = compression_level
+        self._encoding: Optional[str] = None
+        self._last_chunk_type: Optional[str] = None
+        self._tracked_stream = None
+        if flush_size is not None or compression:
+            self._tracked_stream = self._track_chunk_types(stream)
+            stream = self._tracked_stream
         super().__init__(
             stream_encoder.encode_stream(stream),
             media_type=stream_encoder.get_media_type(),
         )
+        if compression:
+            self.headers.add_vary_header("Accept-Encoding")
+
+    async def _track_chunk_types(
+        self, stream: AsyncGenerator[AssistantStreamChunk, None]
+    ) -> AsyncGenerator[AssistantStreamChunk, None]:
+        # The encoder yields a chunk's frame before reading the next chunk, so
+        # this is the type of the chunk each frame was encoded from
+        async for chunk in stream:
+            self._last_chunk_type = chunk.type
+            yield chunk
+
+    async def stream_response(self, send: Send) -> None:
+        flush_size = self._flush_size
+        compressor = None
+        if self._encoding is not None:
+            compressor = zlib.compressobj(
+                self._compression_level, zlib.DEFLATED, _WBITS[self._encoding]
+            )
+            if flush_size is None:
+                flush_size = DEFAULT_COMPRESSED_FLUSH_SIZE
+        elif flush_size is None:
+            await super().stream_response(send)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        writer = _CoalescingWriter(
+            send, flush_size, self._flush_interval, compressor
+        )
+        try:
+            async for frame in self.body_iterator:
+                if not isinstance(frame, (bytes, memoryview)):
+                    frame = frame.encode(self.charset)
+                await writer.write(
+                    frame, flush=self._last_chunk_type in FLUSH_CHUNK_TYPES
+                )
+            await writer.close()
+        finally:
+            writer.cancel()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            self._compression
+            and scope["type"] == "http"
+            and "content-encoding" not in self.headers
+        ):
+            self._encoding = negotiate_encoding(
+                Headers(scope=scope).get("accept-encoding", "")
+            )
+            if self._encoding is not None:
+                self.headers["Content-Encoding"] = self._encoding
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Close the streams explicitly so that a disconnected client cancels
+            # the run instead of leaving it running in the background
+            for iterator in (self.body_iterator, self._tracked_stream, self._stream):
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
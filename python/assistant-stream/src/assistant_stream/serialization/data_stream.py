@@ -1,86 +1,195 @@
 from assistant_stream.assistant_stream_chunk import (
     AssistantStreamChunk,
+    TextDeltaChunk,
+    ReasoningDeltaChunk,
+    ToolCallBeginChunk,
+    ToolCallDeltaChunk,
+    ToolResultChunk,
+    DataChunk,
+    ErrorChunk,
+    SourceChunk,
+    UpdateStateChunk,
 )
-import json
-from typing import AsyncGenerator, Any
+import time
+from typing import AsyncGenerator, Any, Callable, Dict, Optional
 from assistant_stream.serialization.assistant_stream_response import (
     AssistantStreamResponse,
 )
 from assistant_stream.serialization.stream_encoder import StreamEncoder
-from assistant_stream.state_proxy import StateProxy
+from assistant_stream.serialization.json_backend import (
+    JSONBackend,
+    StateProxyJSONEncoder,
+    get_json_backend,
+)
+from assistant_stream.metrics import RunObserver
+from assistant_stream.tracing import Tracer
+
+
+Dumps = Callable[[Any], bytes]
+
+
+def _encode_text_delta(chunk: TextDeltaChunk, dumps: Dumps) -> bytes:
+    if chunk.parent_id:
+        data = {"textDelta": chunk.text_delta, "parentId": chunk.parent_id}
+        return b"aui-text-delta:" + dumps(data) + b"\n"
+    return b"0:" + dumps(chunk.text_delta) + b"\n"
+
+
+def _encode_reasoning_delta(chunk: ReasoningDeltaChunk, dumps: Dumps) -> bytes:
+    if chunk.parent_id:
+        data = {"reasoningDelta": chunk.reasoning_delta, "parentId": chunk.parent_id}
+        return b"aui-reasoning-delta:" + dumps(data) + b"\n"
+    return b"g:" + dumps(chunk.reasoning_delta) + b"\n"
+
+
+def _encode_tool_call_begin(chunk: ToolCallBeginChunk, dumps: Dumps) -> bytes:
+    data = {"toolCallId": chunk.tool_call_id, "toolName": chunk.tool_name}
+    if chunk.parent_id:
+        data["parentId"] = chunk.parent_id
+    return b"b:" + dumps(data) + b"\n"
+
+
+def _encode_tool_call_delta(chunk: ToolCallDeltaChunk, dumps: Dumps) -> bytes:
+    data = {"toolCallId": chunk.tool_call_id, "argsTextDelta": chunk.args_text_delta}
+    return b"c:" + dumps(data) + b"\n"
+
+
+def _encode_tool_result(chunk: ToolResultChunk, dumps: Dumps) -> bytes:
+    res = {"toolCallId": chunk.tool_call_id, "result": chunk.result}
+    if chunk.artifact is not None:
+        res["artifact"] = chunk.artifact
+    if chunk.is_error:
+        res["isError"] = chunk.is_error
+    return b"a:" + dumps(res) + b"\n"
+
 
+def _encode_data(chunk: DataChunk, dumps: Dumps) -> bytes:
+    return b"2:" + dumps([chunk.data]) + b"\n"
 
-class StateProxyJSONEncoder(json.JSONEncoder):
-    """Custom JSON encoder that can handle StateProxy objects."""
-    def default(self, obj: Any) -> Any:
-        if isinstance(obj, StateProxy):
-            return obj._get_value()
-        return super().default(obj)
+
+def _encode_error(chunk: ErrorChunk, dumps: Dumps) -> bytes:
+    return b"3:" + dumps(chunk.error) + b"\n"
+
+
+def _encode_source(chunk: SourceChunk, dumps: Dumps) -> bytes:
+    source_data = {
+        "sourceType": chunk.source_type,
+        "id": chunk.id,
+        "url": chunk.url
+    }
+    if chunk.title is not None:
+        source_data["title"] = chunk.title
+    if chunk.parent_id:
+        source_data["parentId"] = chunk.parent_id
+    return b"h:" + dumps(source_data) + b"\n"
+
+
+def _encode_update_state(chunk: UpdateStateChunk, dumps: Dumps) -> bytes:
+    return b"aui-state:" + dumps(chunk.operations) + b"\n"
+
+
+_CHUNK_ENCODERS: Dict[type, Callable[[Any, Dumps], bytes]] = {
+    TextDeltaChunk: _encode_text_delta,
+    ReasoningDeltaChunk: _encode_reasoning_delta,
+    ToolCallBeginChunk: _encode_tool_call_begin,
+    ToolCallDeltaChunk: _encode_tool_call_delta,
+    ToolResultChunk: _encode_tool_result,
+    DataChunk: _encode_data,
+    ErrorChunk: _encode_error,
+    SourceChunk: _encode_source,
+    UpdateStateChunk: _encode_update_state,
+}
+# Fallback for other classes carrying a known type tag
+_CHUNK_ENCODERS_BY_TYPE = {
+    chunk_class.TYPE: encode for chunk_class, encode in _CHUNK_ENCODERS.items()
+}
 
 
 class DataStreamEncoder(StreamEncoder):
-    def __init__(self):
-        pass
-
-    def encode_chunk(self, chunk: AssistantStreamChunk) -> str:
-        if chunk.type == "text-delta":
-            if hasattr(chunk, 'parent_id') and chunk.parent_id:
-                return f"aui-text-delta:{json.dumps({'textDelta': chunk.text_delta, 'parentId': chunk.parent_id}, cls=StateProxyJSONEncoder)}\n"
-            else:
-                return f"0:{json.dumps(chunk.text_delta, cls=StateProxyJSONEncoder)}\n"
-        elif chunk.type == "reasoning-delta":
-            if hasattr(chunk, 'parent_id') and chunk.parent_id:
-                return f"aui-reasoning-delta:{json.dumps({'reasoningDelta': chunk.reasoning_delta, 'parentId': chunk.parent_id}, cls=StateProxyJSONEncoder)}\n"
-            else:
-                return f"g:{json.dumps(chunk.reasoning_delta, cls=StateProxyJSONEncoder)}\n"
-        elif chunk.type == "tool-call-begin":
-            data = {"toolCallId": chunk.tool_call_id, "toolName": chunk.tool_name}
-            if hasattr(chunk, 'parent_id') and chunk.parent_id:
-                data["parentId"] = chunk.parent_id
-            return f'b:{json.dumps(data, cls=StateProxyJSONEncoder)}\n'
-        elif chunk.type == "tool-call-delta":
-            return f'c:{json.dumps({ "toolCallId": chunk.tool_call_id, "argsTextDelta": chunk.args_text_delta }, cls=StateProxyJSONEncoder)}\n'
-        elif chunk.type == "tool-result":
-            res = {"toolCallId": chunk.tool_call_id, "result": chunk.result}
-            if chunk.artifact is not None:
-                res["artifact"] = chunk.artifact
-            if chunk.is_error:
-                res["isError"] = chunk.is_error
-            return f"a:{json.dumps(res, cls=StateProxyJSONEncoder)}\n"
-        elif chunk.type == "data":
-            return f"2:{json.dumps([chunk.data], cls=StateProxyJSONEncoder)}\n"
-        elif chunk.type == "error":
-            return f"3:{json.dumps(chunk.error, cls=StateProxyJSONEncoder)}\n"
-        elif chunk.type == "source":
-            source_data = {
-                "sourceType": chunk.source_type,
-                "id": chunk.id,
-                "url": chunk.url
-            }
-            if chunk.title is not None:
-                source_data["title"] = chunk.title
-            if hasattr(chunk, 'parent_id') and chunk.parent_id:
-                source_data["parentId"] = chunk.parent_id
-            return f"h:{json.dumps(source_data, cls=StateProxyJSONEncoder)}\n"
-        elif chunk.type == "update-state":
-            return f"aui-state:{json.dumps(chunk.operations, cls=StateProxyJSONEncoder)}\n"
+    """Encodes chunks into the data stream protocol, as UTF-8 bytes."""
+
+    def __init__(
+        self,
+        observer: Optional[RunObserver] = None,
+        tracer: Optional[Tracer] = None,
+        json_backend: Optional[JSONBackend] = None,
+    ):
+        """
+        Args:
+            observer: Receives the time spent encoding each chunk
+            tracer: Creates a span covering the encoding of each stream
+            json_backend: Serializes payloads, defaults to get_json_backend()
+        """
+        self._observer = observer
+        self._tracer = tracer
+        if json_backend is None:
+            json_backend = get_json_backend()
+        self._dumps = json_backend.dumps
+
+    def encode_chunk(self, chunk: AssistantStreamChunk) -> Optional[bytes]:
+        encode = _CHUNK_ENCODERS.get(type(chunk))
+        if encode is None:
+            encode = _CHUNK_ENCODERS_BY_TYPE.get(chunk.type)
+            if encode is None:
+                return None
+        return encode(chunk, self._dumps)
 
     def get_media_type(self) -> str:
         return "text/plain"
 
     async def encode_stream(
         self, stream: AsyncGenerator[AssistantStreamChunk, None]
-    ) -> AsyncGenerator[str, None]:
-        async for chunk in stream:
-            encoded = self.encode_chunk(chunk)
-            if encoded is None:
-                continue
-            yield encoded
+    ) -> AsyncGenerator[bytes, None]:
+        if self._observer is None and self._tracer is None:
+            async for chunk in stream:
+                encoded = self.encode_chunk(chunk)
+                if encoded is None:
+                    continue
+                yield encoded
+            return
+
+        observer = self._observer
+        span = None
+        if self._tracer is not None:
+            span = self._tracer.start_span("assistant_stream.encode")
+        chunks = 0
+        encode_time = 0.0
+        try:
+            async for chunk in stream:
+                start = time.perf_counter()
+                encoded = self.encode_chunk(chunk)
+                elapsed = time.perf_counter() - start
+                chunks += 1
+                encode_time += elapsed
+                if observer is not None:
+                    observer.on_encode(
+                        chunk.type, elapsed, len(encoded) if encoded is not None else 0
+                    )
+                if encoded is None:
+                    continue
+                yield encoded
+        finally:
+            if span is not None:
+                span.set_attribute("chunks", chunks)
+                span.set_attribute("encode_seconds", encode_time)
+                span.end()
 
 
 class DataStreamResponse(AssistantStreamResponse):
     def __init__(
         self,
         stream: AsyncGenerator[AssistantStreamChunk, None],
+        observer: Optional[RunObserver] = None,
+        tracer: Optional[Tracer] = None,
+        json_backend: Optional[JSONBackend] = None,
+        flush_size: Optional[int] = None,
+        flush_interval: float = 0.01,
+        compression: bool = False,
     ):
-        super().__init__(stream, DataStreamEncoder())
+        super().__init__(
+            stream,
+            DataStreamEncoder(observer, tracer, json_backend),
+            flush_size=flush_size,
+            flush_interval=flush_interval,
+            compression=compression,
+        )
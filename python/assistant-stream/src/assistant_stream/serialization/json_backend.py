@@ -0,0 +1,120 @@
+# assistant_ui.json_backend in the sync server client has the same API, keep
+# the two in sync. Its default differs, see there.
+import json
+import os
+from json.encoder import encode_basestring_ascii
+from typing import Any, Optional, Union
+
+from assistant_stream.state_proxy import StateProxy
+
+
+class StateProxyJSONEncoder(json.JSONEncoder):
+    """Custom JSON encoder that can handle StateProxy objects."""
+    def default(self, obj: Any) -> Any:
+        if isinstance(obj, StateProxy):
+            return obj._get_value()
+        return super().default(obj)
+
+
+class JSONBackend:
+    """Serializes values to JSON bytes with the standard library.
+
+    The output matches json.dumps with default settings. Subclass to plug in
+    another JSON library, see OrjsonBackend.
+    """
+
+    name = "json"
+
+    def __init__(self):
+        # Shared instances, json.dumps(..., cls=...) would create one per call
+        self._ascii_encoder = StateProxyJSONEncoder()
+        self._unicode_encoder = StateProxyJSONEncoder(ensure_ascii=False)
+
+    def dumps(self, value: Any, *, ensure_ascii: bool = True) -> bytes:
+        """Serialize value, including StateProxy values, to UTF-8 bytes."""
+        if not ensure_ascii:
+            return self._unicode_encoder.encode(value).encode()
+        if type(value) is str:
+            # Same output as the encoder, without its machinery
+            return encode_basestring_ascii(value).encode()
+        return self._ascii_encoder.encode(value).encode()
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, StateProxy):
+        return obj._get_value()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonBackend(JSONBackend):
+    """Serializes values with orjson. Requires the orjson package.
+
+    Output is compact and not ASCII-escaped, so it differs byte-wise from the
+    standard library's, but parses to the same values. Values orjson cannot
+    serialize (e.g. integers over 64 bits) fall back to the standard library.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError("OrjsonBackend requires the orjson package") from e
+        super().__init__()
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value: Any, *, ensure_ascii: bool = True) -> bytes:
+        try:
+            return self._orjson.dumps(
+                value, default=_orjson_default, option=self._option
+            )
+        except TypeError:
+            return super().dumps(value, ensure_ascii=ensure_ascii)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._orjson.loads(data)
+
+
+_BACKENDS = {"json": JSONBackend, "orjson": OrjsonBackend}
+_backend: Optional[JSONBackend] = None
+
+
+def set_json_backend(backend: Optional[Union[str, JSONBackend]]) -> JSONBackend:
+    """Set the JSON backend used by encoders created afterwards.
+
+    Args:
+        backend: "json", "orjson", "auto" (orjson if installed, otherwise
+            json), a JSONBackend instance, or None for the default: the
+            ASSISTANT_STREAM_JSON_BACKEND environment variable if set,
+            otherwise json
+
+    Returns:
+        The selected backend
+    """
+    global _backend
+    if backend is None:
+        backend = os.environ.get("ASSISTANT_STREAM_JSON_BACKEND") or "json"
+    if isinstance(backend, str):
+        if backend == "auto":
+            try:
+                backend = OrjsonBackend()
+            except ImportError:
+                backend = JSONBackend()
+        elif backend in _BACKENDS:
+            backend = _BACKENDS[backend]()
+        else:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+    _backend = backend
+    return backend
+
+
+def get_json_backend() -> JSONBackend:
+    """The current JSON backend, see set_json_backend."""
+    if _backend is None:
+        return set_json_backend(None)
+    return _backend
@@ -1,13 +1,13 @@
 from assistant_stream.assistant_stream_chunk import AssistantStreamChunk
-import json
 import time
 import string
 import random
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from assistant_stream.serialization.assistant_stream_response import (
     AssistantStreamResponse,
 )
 from assistant_stream.serialization.stream_encoder import StreamEncoder
+from assistant_stream.serialization.json_backend import JSONBackend, get_json_backend
 
 
 def generate_openai_style_id():
@@ -18,11 +18,18 @@ def generate_openai_style_id():
 
 
 class OpenAIStreamEncoder(StreamEncoder):
-    def __init__(self, model="assistant_stream", system_fingerprint="fp_0000000000"):
+    def __init__(
+        self,
+        model="assistant_stream",
+        system_fingerprint="fp_0000000000",
+        json_backend: Optional[JSONBackend] = None,
+    ):
         self.id = generate_openai_style_id()
         self.model = model
         self.system_fingerprint = system_fingerprint
-        pass
+        self._json_backend = (
+            json_backend if json_backend is not None else get_json_backend()
+        )
 
     def get_media_type(self) -> str:
         return "text/event-stream"
@@ -43,7 +50,8 @@ class OpenAIStreamEncoder(StreamEncoder):
                 }
             ],
         }
-        return f"data: {json.dumps(response, ensure_ascii=False)}\n\n"
+        data = self._json_backend.dumps(response, ensure_ascii=False).decode()
+        return f"data: {data}\n\n"
 
     def encode_chunk(self, chunk: AssistantStreamChunk) -> str:
         """
@@ -75,8 +83,17 @@ class OpenAIStreamResponse(AssistantStreamResponse):
     def __init__(
         self,
         stream: AsyncGenerator[AssistantStreamChunk, None],
+        flush_size: Optional[int] = None,
+        flush_interval: float = 0.01,
+        compression: bool = False,
     ):
         """
         Initializes the response with the OpenAI SSE encoder.
         """
-        super().__init__(stream, OpenAIStreamEncoder())
+        super().__init__(
+            stream,
+            OpenAIStreamEncoder(),
+            flush_size=flush_size,
+            flush_interval=flush_interval,
+            compression=compression,
+        )
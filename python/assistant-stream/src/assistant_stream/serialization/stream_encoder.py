@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional, Union
 from assistant_stream.assistant_stream_chunk import AssistantStreamChunk
 
 
@@ -15,10 +15,20 @@ class StreamEncoder(ABC):
         """
         pass
 
+    def encode_chunk(self, chunk: AssistantStreamChunk) -> Optional[Union[str, bytes]]:
+        """
+        Encode a single chunk as text or UTF-8 bytes. Returns None or an empty
+        value for chunks that are not part of the format.
+
+        Optional. It lets RunBroadcast encode each chunk once for all
+        subscribers, encoders without it are driven through encode_stream.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def encode_stream(
         self, stream: AsyncGenerator[AssistantStreamChunk, None]
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[Union[str, bytes], None]:
         """
         Encode the stream of AssistantStreamChunk into a specific format.
         This method must be implemented by subclasses.
@@ -1,15 +1,29 @@
 import asyncio
-from typing import Any, Callable, Dict, List
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from assistant_stream.assistant_stream_chunk import (
     ObjectStreamOperation,
     UpdateStateChunk,
 )
+from assistant_stream.flush_policy import FlushPolicy, operation_size, value_size
 from assistant_stream.state_proxy import StateProxy
+from assistant_stream.tracing import Span, Tracer
 
 
 class StateManager:
-    """Manages state operations with efficient batching and local updates."""
+    """Manages state operations with efficient batching and local updates.
+
+    State can be read and updated from threads other than the event loop's,
+    e.g. by callbacks running in an executor. Updates are batched and sent
+    from the event loop.
+
+    Text appended to a string is kept as a list of pieces and joined when the
+    string is read, so streaming text into the state is linear in its length.
+
+    With diff_assignments set, assignments send only the changed parts of
+    the assigned value, see assign_diff.
+    """
 
     def __init__(
         self,
@@ -18,11 +32,40 @@ class StateManager:
     ):
         """Initialize with callback for sending state updates."""
         self._state_data = state_data
+        # Path -> text appended to the string at path, not joined yet
+        self._text_appends: Dict[Tuple[str, ...], List[str]] = {}
         self._pending_operations = []
+        self._pending_bytes = 0
         self._update_scheduled = False
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._flush_policy = FlushPolicy()
+        self._backlog: Callable[[], int] = lambda: 0
+        self.diff_assignments = False
         self._put_chunk_callback = put_chunk_callback
         self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._lock = threading.RLock()
         self._state_proxy = StateProxy(self, [])
+        self._tracer: Optional[Tracer] = None
+        self._span: Optional[Span] = None
+
+    def set_tracer(self, tracer: Optional[Tracer], span: Optional[Span] = None) -> None:
+        """Trace flushes as children of span."""
+        self._tracer = tracer
+        self._span = span
+
+    def set_flush_policy(
+        self, policy: FlushPolicy, backlog: Optional[Callable[[], int]] = None
+    ) -> None:
+        """Batch operations according to policy.
+
+        Args:
+            policy: Decides when pending operations are sent
+            backlog: Returns the number of chunks waiting to be consumed
+        """
+        self._flush_policy = policy
+        if backlog is not None:
+            self._backlog = backlog
 
     @property
     def state(self) -> Any:
@@ -38,70 +81,215 @@ class StateManager:
     @property
     def state_data(self) -> Dict[str, Any]:
         """Current state data."""
+        if self._text_appends:
+            with self._lock:
+                self._join_text_appends()
         return self._state_data
 
     def add_operations(self, operations: List[ObjectStreamOperation]) -> None:
         """Add operations to pending batch and apply locally."""
-        # Apply to local state immediately
-        for operation in operations:
-            self._apply_operation_to_local_state(operation)
-
-        # Add to pending operations
-        self._pending_operations.extend(operations)
+        with self._lock:
+            # Apply to local state immediately
+            for operation in operations:
+                self._apply_operation_to_local_state(operation)
+
+            # Add to pending operations
+            self._pending_operations.extend(operations)
+            policy = self._flush_policy
+            if policy.max_bytes is not None:
+                for operation in operations:
+                    self._pending_bytes += operation_size(operation)
+            on_loop = threading.get_ident() == self._thread_id
+
+            if policy.is_full(len(self._pending_operations), self._pending_bytes):
+                if on_loop:
+                    self._flush_updates()
+                    return
+                window = 0.0
+            elif self._update_scheduled:
+                return
+            else:
+                window = policy.get_window(self._backlog())
 
-        # Schedule batch update if needed
-        if not self._update_scheduled:
+            # Schedule batch update
             self._update_scheduled = True
-            self._loop.call_soon_threadsafe(self._flush_updates)
+            if on_loop:
+                self._schedule_flush(window)
+            else:
+                self._loop.call_soon_threadsafe(self._schedule_flush, window)
+
+    def _schedule_flush(self, window: float) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        if window > 0:
+            self._flush_handle = self._loop.call_later(window, self._flush_updates)
+        else:
+            self._flush_handle = self._loop.call_soon(self._flush_updates)
+
+    def set_value(self, path: List[str], value: Any) -> None:
+        """Set the value at path, the value may be a StateProxy.
+
+        Assigning a proxy to its own path does nothing, e.g. the assignment
+        after state["text"] += "more", whose update was already added.
+        """
+        if isinstance(value, StateProxy):
+            if value._manager is self and value._path == path:
+                return
+            value = _copy_value(value)
+        if self.diff_assignments:
+            self.assign_diff(path, value)
+        else:
+            self.add_operations([{"type": "set", "path": path, "value": value}])
+
+    def assign_diff(self, path: List[str], value: Any) -> None:
+        """Set the value at path, sending only the parts that changed.
+
+        See diff_operations. Useful for large values of which few parts change
+        between assignments.
+        """
+        if isinstance(value, StateProxy):
+            if value._manager is self and value._path == path:
+                return
+            value = _copy_value(value)
+        with self._lock:
+            try:
+                current = self.get_value_at_path(path)
+            except KeyError:
+                operations = [{"type": "set", "path": path, "value": value}]
+            else:
+                operations = diff_operations(path, current, value)
+            if operations:
+                self.add_operations(operations)
+
+    def apply_remote_operations(self, operations: List[ObjectStreamOperation]) -> None:
+        """Apply operations received from another run to local state only.
+
+        Nothing is sent. Set values are copied, so later operations do not
+        modify the objects held by the given operations.
+        """
+        with self._lock:
+            for operation in operations:
+                self._apply_operation_to_local_state(operation)
 
     def _flush_updates(self) -> None:
         """Send pending operations as a batch."""
-        if self._pending_operations:
-            operations_to_send = self._pending_operations.copy()
-            self._pending_operations.clear()
-            self._put_chunk_callback(UpdateStateChunk(operations=operations_to_send))
+        with self._lock:
+            # Handles can only be cancelled on the event loop, a stale one
+            # flushes nothing
+            if (
+                self._flush_handle is not None
+                and threading.get_ident() == self._thread_id
+            ):
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            self._pending_bytes = 0
+            if self._pending_operations:
+                operations_to_send = compact_operations(self._pending_operations)
+                self._pending_operations.clear()
+                if self._tracer is None:
+                    self._put_chunk_callback(
+                        UpdateStateChunk(operations=operations_to_send)
+                    )
+                else:
+                    with self._tracer.start_span(
+                        "assistant_stream.state_flush",
+                        self._span,
+                        {"operations": len(operations_to_send)},
+                    ):
+                        self._put_chunk_callback(
+                            UpdateStateChunk(operations=operations_to_send)
+                        )
 
-        self._update_scheduled = False
+            self._update_scheduled = False
 
     def flush(self) -> None:
         """Explicitly flush any pending operations.
 
         This should be called before the run completes to ensure all state updates are sent.
         """
-        if self._pending_operations:
-            self._flush_updates()
+        with self._lock:
+            if self._pending_operations:
+                self._flush_updates()
+
+    def complete(self) -> None:
+        """Flush pending operations and join appended text, when the run ends.
+
+        Afterwards the state object passed in holds the final state.
+        """
+        with self._lock:
+            self.flush()
+            self._join_text_appends()
 
     def _apply_operation_to_local_state(self, operation: ObjectStreamOperation) -> None:
         """Apply operation to local state."""
         op_type = operation["type"]
 
         if op_type == "set":
-            self._update_path(operation["path"], lambda _: operation["value"])
+            # Later operations modify the state in place, they must not change
+            # the caller's objects or values of operations not sent yet
+            value = _copy_value(operation["value"])
+            path = operation["path"]
+            self._update_path(path, lambda _: value)
+            if self._text_appends:
+                # Text appended to replaced strings is discarded
+                prefix = tuple(path)
+                for text_path in list(self._text_appends):
+                    if text_path[: len(prefix)] == prefix:
+                        del self._text_appends[text_path]
 
         elif op_type == "append-text":
+            path = operation["path"]
+            pieces = self._text_appends.get(tuple(path))
+            if pieces is not None:
+                pieces.append(operation["value"])
+                return
 
-            def append_text(current):
+            def check_text(current):
                 if not isinstance(current, str):
-                    path_str = ", ".join(operation["path"])
+                    path_str = ", ".join(path)
                     raise TypeError(f"Expected string at path [{path_str}]")
-                return current + operation["value"]
+                return current
 
-            self._update_path(operation["path"], append_text)
+            self._update_path(path, check_text)
+            # The string is left as is, appends are joined when it is read
+            self._text_appends[tuple(path)] = [operation["value"]]
 
         else:
             raise TypeError(f"Invalid operation type: {op_type}")
 
+    def _join_text_appends(self) -> None:
+        """Apply the text appended to strings since they were last read."""
+        text_appends = self._text_appends
+        if not text_appends:
+            return
+        self._text_appends = {}
+        for path, pieces in text_appends.items():
+            self._state_data = _update_path(
+                self._state_data,
+                list(path),
+                lambda current: "".join([current, *pieces]),
+            )
+
     def get_value_at_path(self, path: List[str]) -> Any:
         """Get value at path, raising KeyError for invalid paths."""
+        if self._text_appends:
+            with self._lock:
+                self._join_text_appends()
+        return self.peek_value_at_path(path)
+
+    def peek_value_at_path(self, path: List[str]) -> Any:
+        """Get value at path without joining appended text.
+
+        Strings may miss recently appended text, use for type checks only.
+        """
+        current = self._state_data
         if not path:
-            return self._state_data
+            return current
 
         # If state is None, we can't navigate further
-        if self._state_data is None:
+        if current is None:
             raise KeyError(path[0] if path else "")
 
-        current = self._state_data
-
         for key in path:
             try:
                 if isinstance(current, list):
@@ -119,73 +307,277 @@ class StateManager:
         return current
 
     def _update_path(self, path: List[str], updater: Callable[[Any], Any]) -> None:
-        """Update value at path without creating parent objects."""
-        # Handle empty path (update root state)
-        if not path:
-            self._state_data = updater(self._state_data)
-            return
-
-        # Initialize state as empty object if it's null
-        if self._state_data is None:
-            self._state_data = {}
-
-        if not isinstance(self._state_data, (dict, list)):
-            raise KeyError(f"Invalid path: [{', '.join(path)}]")
-
-        key, *rest = path
-
-        # Handle list access
-        if isinstance(self._state_data, list):
+        """Update value at path in place without creating parent objects."""
+        self._state_data = _update_path(self._state_data, path, updater)
+
+
+class _PathNode:
+    """Node of a tree of operation paths, used by compact_operations."""
+
+    __slots__ = ("index", "earlier", "children")
+
+    def __init__(self):
+        # Last kept operation on the path, and any kept before it
+        self.index: Optional[int] = None
+        self.earlier: List[int] = []
+        self.children: Dict[str, "_PathNode"] = {}
+
+
+def _collect_indices(node: _PathNode, indices: List[int]) -> None:
+    for child in node.children.values():
+        if child.index is not None:
+            indices.append(child.index)
+        indices.extend(child.earlier)
+        _collect_indices(child, indices)
+
+
+def compact_operations(
+    operations: List[ObjectStreamOperation],
+) -> List[ObjectStreamOperation]:
+    """Return fewer operations that produce the same state as operations.
+
+    - A set replaces the earlier operation on the same path, in its place,
+      unless either of them sets None
+    - A set drops the earlier operations below its path
+    - An append-text is merged into the earlier operation on the same path,
+      an append-text or a set of a string
+
+    Operations keep their order otherwise, so lists grow in the same order.
+    """
+    compacted: List[Optional[ObjectStreamOperation]] = []
+    appended: Dict[int, List[str]] = {}
+    root = _PathNode()
+
+    for operation in operations:
+        node = root
+        for key in operation["path"]:
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _PathNode()
+            node = child
+        index = node.index
+
+        if operation["type"] == "append-text":
+            if index is not None:
+                previous = compacted[index]
+                if previous["type"] == "append-text" or isinstance(
+                    previous["value"], str
+                ):
+                    appended.setdefault(index, []).append(operation["value"])
+                    continue
+        elif operation["type"] == "set":
+            if node.children:
+                dropped: List[int] = []
+                _collect_indices(node, dropped)
+                for dropped_index in dropped:
+                    compacted[dropped_index] = None
+                    appended.pop(dropped_index, None)
+                node.children = {}
+            # Setting None does not create missing keys or list items, so it
+            # cannot replace an operation that may have created them
+            if index is not None and operation["value"] is not None:
+                appended.pop(index, None)
+                if compacted[index]["value"] is not None:
+                    compacted[index] = operation
+                    continue
+                # The earlier set of None may not have created the key, this
+                # one does, so it keeps its own position in the key order
+                compacted[index] = None
+                index = None
+
+        if index is not None:
+            node.earlier.append(index)
+        node.index = len(compacted)
+        compacted.append(operation)
+
+    for index, pieces in appended.items():
+        operation = compacted[index]
+        compacted[index] = {
+            **operation,
+            "value": "".join([operation["value"], *pieces]),
+        }
+    return [operation for operation in compacted if operation is not None]
+
+
+# Approximate encoded size of an operation, besides its path and value
+_OPERATION_SIZE = 32
+_MISSING = object()
+
+
+def _size_up_to(value: Any, limit: int) -> int:
+    """Approximate encoded size of value, counting stops above limit."""
+    size = 0
+    stack = [value]
+    while stack and size <= limit:
+        item = stack.pop()
+        if isinstance(item, str):
+            size += len(item) + 2
+        elif isinstance(item, dict):
+            size += 2
+            for key, child in item.items():
+                size += len(str(key)) + 3
+                stack.append(child)
+        elif isinstance(item, list):
+            size += 2 + len(item)
+            stack.extend(item)
+        else:
+            size += 8
+    return size
+
+
+def _set_operation(
+    path: List[str], value: Any, operations: List[ObjectStreamOperation]
+) -> int:
+    operations.append({"type": "set", "path": path, "value": value})
+    return _OPERATION_SIZE + sum(len(key) + 3 for key in path) + value_size(value)
+
+
+def _diff(
+    path: List[str], old: Any, new: Any, operations: List[ObjectStreamOperation]
+) -> int:
+    """Append the operations changing old into new, return their size."""
+    if type(old) is not type(new):
+        return _set_operation(path, new, operations)
+
+    if isinstance(new, str):
+        if new == old:
+            return 0
+        if len(new) > len(old) and new.startswith(old):
+            delta = new[len(old) :]
+            operations.append({"type": "append-text", "path": path, "value": delta})
+            return _OPERATION_SIZE + sum(len(key) + 3 for key in path) + len(delta)
+        return _set_operation(path, new, operations)
+
+    if isinstance(new, dict):
+        # There is no operation removing keys
+        if any(key not in new for key in old):
+            return _set_operation(path, new, operations)
+        pairs = (
+            (str(key), old.get(key, _MISSING), value) for key, value in new.items()
+        )
+    elif isinstance(new, list):
+        # Nor one removing list items
+        if len(new) < len(old):
+            return _set_operation(path, new, operations)
+        old_length = len(old)
+        pairs = (
+            (str(index), old[index] if index < old_length else _MISSING, value)
+            for index, value in enumerate(new)
+        )
+    else:
+        if new == old:
+            return 0
+        return _set_operation(path, new, operations)
+
+    start = len(operations)
+    size = 0
+    for key, old_value, value in pairs:
+        if old_value is _MISSING:
+            if value is None:
+                # Setting None does not create keys or list items
+                del operations[start:]
+                return _set_operation(path, new, operations)
+            size += _set_operation(path + [key], value, operations)
+        elif old_value is not value:
+            # Compared by _diff, == treats 1, 1.0 and True as equal
+            size += _diff(path + [key], old_value, value, operations)
+
+    if size:
+        # Set the value as a whole if that is smaller than its changes
+        whole = _OPERATION_SIZE + sum(len(key) + 3 for key in path)
+        whole += _size_up_to(new, size - whole)
+        if whole < size:
+            del operations[start:]
+            operations.append({"type": "set", "path": path, "value": new})
+            return whole
+    return size
+
+
+def diff_operations(
+    path: List[str], old: Any, new: Any
+) -> List[ObjectStreamOperation]:
+    """Operations changing the value at path from old to new.
+
+    Unchanged parts are skipped, text appended to a string becomes an
+    append-text operation, and new keys and list items are set one by one.
+    A value is set as a whole if that is smaller than its changes, or if
+    keys or list items were removed. Values are compared by type as well,
+    so 1 changing to 1.0 or True is a change at any depth.
+    """
+    operations: List[ObjectStreamOperation] = []
+    _diff(path, old, new, operations)
+    return operations
+
+
+def _copy_value(value: Any) -> Any:
+    """Copy the containers in value, so that the state does not share them."""
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    if isinstance(value, StateProxy):
+        return _copy_value(value._get_value())
+    return value
+
+
+def _update_path(data: Any, path: List[str], updater: Callable[[Any], Any]) -> Any:
+    """Replace the value at path by updater(value), in place.
+
+    Only the container holding the value is modified, so the cost depends on
+    the depth of the path and not on the size of the containers along it.
+    Returns the root, which is new if path is empty or data is None.
+    """
+    # Handle empty path (update root state)
+    if not path:
+        return updater(data)
+
+    # Initialize state as empty object if it's null
+    if data is None:
+        data = {}
+
+    container = data
+    last = len(path) - 1
+    for depth, key in enumerate(path):
+        if isinstance(container, list):
             try:
                 idx = int(key)
-                if idx < 0 or idx > len(self._state_data):
-                    raise KeyError(key)
+            except ValueError:
+                raise KeyError(key)
+            size = len(container)
+            if idx < 0 or idx > size:
+                raise KeyError(key)
 
-                if not rest:
-                    # For direct update
-                    if idx == len(self._state_data):  # Append case
-                        value = updater(None)
-                        if value is not None:
-                            self._state_data.append(value)
-                    else:  # Update existing element
-                        self._state_data[idx] = updater(self._state_data[idx])
+            if depth == last:
+                if idx == size:  # Append case
+                    value = updater(None)
+                    if value is not None:
+                        container.append(value)
                 else:
-                    # For nested update
-                    if idx == len(self._state_data):
-                        raise KeyError(key)
-
-                    # Create a copy for the nested update
-                    next_state = self._state_data.copy()
+                    container[idx] = updater(container[idx])
+                return data
 
-                    # Create a temporary manager for the nested path
-                    temp_manager = type(self)(lambda _: None)
-                    temp_manager._state_data = next_state[idx]
-
-                    # Update nested path
-                    temp_manager._update_path(rest, updater)
-                    next_state[idx] = temp_manager._state_data
-                    self._state_data = next_state
-            except ValueError:
+            if idx == size:
                 raise KeyError(key)
-        else:  # Handle dict access
-            if not rest:
-                # For direct update
-                if key not in self._state_data and updater(None) is None:
-                    return
-                self._state_data[key] = updater(self._state_data.get(key))
-            else:
-                # For nested update
-                if key not in self._state_data:
-                    raise KeyError(key)
+            parent, parent_key = container, idx
+        elif isinstance(container, dict):
+            if depth == last:
+                if key in container:
+                    container[key] = updater(container[key])
+                else:
+                    value = updater(None)
+                    if value is not None:
+                        container[key] = value
+                return data
 
-                # Create a copy for the nested update
-                next_state = dict(self._state_data)
+            if key not in container:
+                raise KeyError(key)
+            parent, parent_key = container, key
+        else:
+            raise KeyError(f"Invalid path: [{', '.join(path)}]")
 
-                # Create a temporary manager for the nested path
-                temp_manager = type(self)(lambda _: None)
-                temp_manager._state_data = next_state[key]
+        container = parent[parent_key]
+        if container is None:
+            # Initialize nested null values as empty objects
+            container = parent[parent_key] = {}
 
-                # Update nested path
-                temp_manager._update_path(rest, updater)
-                next_state[key] = temp_manager._state_data
-                self._state_data = next_state
+    return data
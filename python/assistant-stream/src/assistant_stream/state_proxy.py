@@ -30,7 +30,7 @@ class StateProxy:
 
     def __getitem__(self, key: Union[str, int]) -> Union["StateProxy", Any]:
         """Access nested values with dict-style syntax. Returns primitives directly except strings."""
-        current_value = self._manager.get_value_at_path(self._path)
+        current_value = self._manager.peek_value_at_path(self._path)
 
         # Handle list indexing
         if isinstance(current_value, list):
@@ -62,7 +62,7 @@ class StateProxy:
                 raise KeyError(key)
 
         # Get value at path
-        value = self._manager.get_value_at_path(self._path + [str_key])
+        value = self._manager.peek_value_at_path(self._path + [str_key])
 
         # Return primitives directly (except strings)
         if value is None or isinstance(value, (int, float, bool)):
@@ -73,7 +73,18 @@ class StateProxy:
 
     def __setitem__(self, key: Union[str, int], value: Any) -> None:
         """Set value with dict-style syntax."""
-        current_value = self._manager.get_value_at_path(self._path)
+        self._manager.set_value(self._child_path(key), value)
+
+    def assign_diff(self, key: Union[str, int], value: Any) -> None:
+        """Like state[key] = value, but only sends the parts of value that changed.
+
+        Example:
+            state.assign_diff("graph", new_graph_state)
+        """
+        self._manager.assign_diff(self._child_path(key), value)
+
+    def _child_path(self, key: Union[str, int]) -> List[str]:
+        current_value = self._manager.peek_value_at_path(self._path)
 
         # Handle list indexing
         if isinstance(current_value, list):
@@ -97,13 +108,11 @@ class StateProxy:
             # For dicts and other types, use string representation of key
             str_key = str(key)
 
-        self._manager.add_operations(
-            [{"type": "set", "path": self._path + [str_key], "value": value}]
-        )
+        return self._path + [str_key]
 
     def __iadd__(self, other: Any) -> "StateProxy":
         """Support += for strings and lists."""
-        current_value = self._manager.get_value_at_path(self._path)
+        current_value = self._manager.peek_value_at_path(self._path)
 
         # String concatenation
         if isinstance(current_value, str):
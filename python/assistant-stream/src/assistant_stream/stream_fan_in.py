@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Optional, Set
+
+from assistant_stream.assistant_stream_chunk import AssistantStreamChunk
+from assistant_stream.tracing import Span
+
+
+class StreamFanIn:
+    """Reads substreams concurrently and forwards their chunks into a run.
+
+    - At most max_concurrency substreams are read at once, the others wait.
+    - While several substreams are active, each yields to the event loop after
+      forwarding a chunk, so that they interleave fairly.
+    - The first substream to fail cancels its siblings and reports the error
+      through on_error.
+    - Finished readers are removed from tasks.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ):
+        self._semaphore = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency is not None else None
+        )
+        self._on_error = on_error
+        self._tasks: Set[asyncio.Task] = set()
+        self._active = 0
+        self.error: Optional[BaseException] = None
+
+    @property
+    def tasks(self) -> Set[asyncio.Task]:
+        """Reader tasks that have not finished yet."""
+        return self._tasks
+
+    def add(
+        self,
+        stream: AsyncIterable[AssistantStreamChunk],
+        put_chunk: Callable[[AssistantStreamChunk], Awaitable[Any]],
+        span: Optional[Span] = None,
+    ) -> asyncio.Task:
+        """Start reading a substream, forwarding its chunks to put_chunk.
+
+        The span, if given, is ended once the substream is done.
+        """
+        task = asyncio.create_task(self._read(stream, put_chunk, span))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _read(
+        self,
+        stream: AsyncIterable[AssistantStreamChunk],
+        put_chunk: Callable[[AssistantStreamChunk], Awaitable[Any]],
+        span: Optional[Span] = None,
+    ) -> None:
+        try:
+            if self._semaphore is None:
+                await self._forward(stream, put_chunk)
+            else:
+                async with self._semaphore:
+                    await self._forward(stream, put_chunk)
+        except asyncio.CancelledError:
+            if span is not None:
+                span.set_attribute("cancelled", True)
+            raise
+        except Exception as e:
+            if span is not None:
+                span.record_exception(e)
+            self._fail(e)
+        finally:
+            try:
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            finally:
+                if span is not None:
+                    span.end()
+
+    async def _forward(
+        self,
+        stream: AsyncIterable[AssistantStreamChunk],
+        put_chunk: Callable[[AssistantStreamChunk], Awaitable[Any]],
+    ) -> None:
+        self._active += 1
+        try:
+            async for chunk in stream:
+                await put_chunk(chunk)
+                if self._active > 1:
+                    # Let sibling substreams forward their chunks too
+                    await asyncio.sleep(0)
+        finally:
+            self._active -= 1
+
+    def _fail(self, error: BaseException) -> None:
+        if self.error is not None:
+            return
+        self.error = error
+        self.cancel()
+        if self._on_error is not None:
+            self._on_error(error)
+
+    def cancel(self) -> None:
+        """Cancel all readers, except the calling one."""
+        current = asyncio.current_task()
+        for task in list(self._tasks):
+            if task is not current:
+                task.cancel()
+
+    async def wait(self) -> None:
+        """Wait until all readers, including ones added meanwhile, have finished."""
+        while True:
+            pending = [task for task in self._tasks if not task.done()]
+            if not pending:
+                return
+            await asyncio.wait(pending)
@@ -0,0 +1,129 @@
+import asyncio
+import concurrent.futures
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Optional, TypeVar
+
+from assistant_stream.assistant_stream_chunk import AssistantStreamChunk
+from assistant_stream.modules.tool_call import ToolCallController
+
+# Avoid circular import
+if TYPE_CHECKING:
+    from assistant_stream.create_run import RunController
+
+T = TypeVar("T")
+
+
+class ThreadRunController:
+    """Controller for synchronous callbacks running in an executor thread.
+
+    Methods can be called from the callback's thread. Chunks and state
+    operations are batched and handed to the event loop; everything else is
+    run on the event loop and waited for.
+
+    If the run buffer is bounded with the "block" policy, append_text and
+    append_reasoning block the thread until the consumer catches up.
+
+    The thread cannot be interrupted when the run is cancelled. Long running
+    callbacks should check controller.cancelled, after cancellation all
+    methods do nothing.
+
+    Example:
+        def callback(controller: ThreadRunController):
+            for token in sync_client.stream(prompt):
+                if controller.cancelled:
+                    return
+                controller.append_text(token)
+
+        create_run(callback, executor=ThreadPoolExecutor(max_workers=8))
+    """
+
+    def __init__(self, controller: "RunController"):
+        self._controller = controller
+        self._loop = controller._loop
+
+    def _call(self, function: Callable[..., T], *args: Any) -> T:
+        """Run function on the event loop and return its result."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def run() -> None:
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self._loop.call_soon_threadsafe(run)
+        return future.result()
+
+    async def _wait_for_space(self) -> None:
+        space = asyncio.ensure_future(self._controller._buffer.wait_for_space())
+        cancelled = asyncio.ensure_future(self._controller._cancelled_event.wait())
+        await asyncio.wait({space, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+        space.cancel()
+        cancelled.cancel()
+
+    def _block_until_space(self) -> None:
+        if self._controller._buffer.is_full and not self.cancelled:
+            asyncio.run_coroutine_threadsafe(
+                self._wait_for_space(), self._loop
+            ).result()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the run was cancelled, e.g. because the client disconnected."""
+        return self._controller.cancelled
+
+    @property
+    def state(self):
+        """Access the state proxy object for making state updates."""
+        return self._controller.state
+
+    @state.setter
+    def state(self, value):
+        self._controller.state = value
+
+    def with_parent_id(self, parent_id: str) -> "ThreadRunController":
+        """Create a new controller with the specified parent_id."""
+        return ThreadRunController(
+            self._call(self._controller.with_parent_id, parent_id)
+        )
+
+    def append_text(self, text_delta: str) -> None:
+        """Append a text delta to the stream."""
+        self._block_until_space()
+        self._controller.append_text(text_delta)
+
+    def append_reasoning(self, reasoning_delta: str) -> None:
+        """Append a reasoning delta to the stream."""
+        self._block_until_space()
+        self._controller.append_reasoning(reasoning_delta)
+
+    def add_tool_call(
+        self, tool_name: str, tool_call_id: Optional[str] = None
+    ) -> ToolCallController:
+        """Add a tool call to the stream.
+
+        The returned controller's synchronous methods can be called from the
+        callback's thread.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._controller.add_tool_call(tool_name, tool_call_id), self._loop
+        ).result()
+
+    def add_tool_result(self, tool_call_id: str, result: Any) -> None:
+        """Add a tool result to the stream."""
+        self._controller.add_tool_result(tool_call_id, result)
+
+    def add_stream(self, stream: AsyncGenerator[AssistantStreamChunk, None]) -> None:
+        """Append a substream to the main stream. It is read on the event loop."""
+        self._call(self._controller.add_stream, stream)
+
+    def add_data(self, data: Any) -> None:
+        """Emit an event to the main stream."""
+        self._controller.add_data(data)
+
+    def add_error(self, error: str) -> None:
+        """Emit an error to the main stream."""
+        self._controller.add_error(error)
+
+    def add_source(self, id: str, url: str, title: Optional[str] = None) -> None:
+        """Add a source to the stream."""
+        self._controller.add_source(id, url, title)
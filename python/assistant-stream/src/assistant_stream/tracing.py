@@ -0,0 +1,179 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+Attributes = Dict[str, Any]
+
+
+class Span:
+    """A timed operation within a run. The base class records nothing.
+
+    Spans can be used as context managers, which end them and record an
+    exception raised in the block.
+    """
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Attributes] = None) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        """End the span. Further calls have no effect."""
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_value is not None:
+            self.record_exception(exc_value)
+        self.end()
+
+
+class Tracer:
+    """Creates spans for runs, substreams, tool calls, state flushes and encoding.
+
+    Pass a tracer to create_run(tracer=...) and DataStreamEncoder(tracer=...).
+    The base class creates spans that record nothing; subclass it to forward
+    spans to a tracing backend, see RecordingTracer and OpenTelemetryTracer.
+
+    Span names:
+        assistant_stream.run: The whole run, with a first_chunk event
+        assistant_stream.substream: A stream added with add_stream
+        assistant_stream.tool_call: A tool call, from begin until its response
+            is set or it is closed. Spans of controllers created with
+            with_parent_id(tool_call_id) are its children.
+        assistant_stream.state_flush: Sending a batch of state operations
+        assistant_stream.encode: Encoding a stream
+    """
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        attributes: Optional[Attributes] = None,
+    ) -> Span:
+        return Span()
+
+
+class RecordedSpan(Span):
+    """A span kept in memory by RecordingTracer. Times are perf_counter seconds."""
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["RecordedSpan"],
+        attributes: Optional[Attributes],
+    ):
+        self.name = name
+        self.parent = parent
+        self.attributes: Attributes = dict(attributes or {})
+        self.events: List[Tuple[str, float, Attributes]] = []
+        self.exception: Optional[BaseException] = None
+        self.start_time = time.perf_counter()
+        self.end_time: Optional[float] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Attributes] = None) -> None:
+        self.events.append((name, time.perf_counter(), dict(attributes or {})))
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.exception = exception
+
+    def end(self) -> None:
+        if self.end_time is None:
+            self.end_time = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return f"RecordedSpan({self.name!r}, duration={self.duration!r})"
+
+
+class RecordingTracer(Tracer):
+    """Keeps every span in memory, e.g. for tests or debugging."""
+
+    def __init__(self):
+        self.spans: List[RecordedSpan] = []
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        attributes: Optional[Attributes] = None,
+    ) -> RecordedSpan:
+        span = RecordedSpan(name, parent, attributes)
+        self.spans.append(span)
+        return span
+
+    def find(self, name: str) -> List[RecordedSpan]:
+        """Spans with the given name, in start order."""
+        return [span for span in self.spans if span.name == name]
+
+
+class _OpenTelemetrySpan(Span):
+    def __init__(self, span: Any):
+        self.span = span
+        self._ended = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.span.set_attribute(key, value)
+
+    def add_event(self, name: str, attributes: Optional[Attributes] = None) -> None:
+        self.span.add_event(name, attributes or {})
+
+    def record_exception(self, exception: BaseException) -> None:
+        from opentelemetry.trace import Status, StatusCode
+
+        self.span.record_exception(exception)
+        self.span.set_status(Status(StatusCode.ERROR, str(exception)))
+
+    def end(self) -> None:
+        if not self._ended:
+            self._ended = True
+            self.span.end()
+
+
+class OpenTelemetryTracer(Tracer):
+    """Forwards spans to OpenTelemetry.
+
+    Requires the opentelemetry-api package.
+
+    Args:
+        tracer: OpenTelemetry tracer, defaults to the global tracer provider's
+            "assistant_stream" tracer
+    """
+
+    def __init__(self, tracer: Any = None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryTracer requires the opentelemetry-api package"
+            ) from e
+
+        self._trace = trace
+        self._tracer = tracer if tracer is not None else trace.get_tracer(
+            "assistant_stream"
+        )
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        attributes: Optional[Attributes] = None,
+    ) -> Span:
+        context = None
+        if isinstance(parent, _OpenTelemetrySpan):
+            context = self._trace.set_span_in_context(parent.span)
+        return _OpenTelemetrySpan(
+            self._tracer.start_span(name, context=context, attributes=attributes)
+        )
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController, RunBufferFullError
+
+
+@pytest.mark.asyncio
+async def test_block_policy_suspends_producer():
+    """Test that awaitable producer methods wait for a slow consumer."""
+    max_backlog = 0
+
+    async def run_callback(controller: RunController):
+        nonlocal max_backlog
+        for i in range(20):
+            await controller.append_text_async(str(i))
+            max_backlog = max(max_backlog, controller._buffer._chunks)
+
+    chunks = []
+    async for chunk in create_run(run_callback, max_buffered_chunks=3):
+        chunks.append(chunk)
+        await asyncio.sleep(0.001)
+
+    assert "".join(chunk.text_delta for chunk in chunks) == "".join(
+        str(i) for i in range(20)
+    )
+    assert max_backlog <= 3
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_merges_while_full():
+    """Test that deltas are merged instead of queued while the buffer is full."""
+
+    async def run_callback(controller: RunController):
+        for i in range(10):
+            controller.append_text(str(i))
+        controller.add_data({"done": True})
+
+    chunks = [
+        chunk
+        async for chunk in create_run(
+            run_callback, max_buffered_chunks=2, buffer_policy="coalesce"
+        )
+    ]
+
+    assert [chunk.type for chunk in chunks] == [
+        "text-delta",
+        "text-delta",
+        "text-delta",
+        "data",
+    ]
+    assert "".join(chunk.text_delta for chunk in chunks[:-1]) == "0123456789"
+
+
+@pytest.mark.asyncio
+async def test_fail_policy_raises():
+    """Test that producing into a full buffer raises with the fail policy."""
+
+    async def run_callback(controller: RunController):
+        for i in range(10):
+            controller.append_text(str(i))
+
+    chunks = []
+    with pytest.raises(RunBufferFullError):
+        async for chunk in create_run(
+            run_callback, max_buffered_bytes=4, buffer_policy="fail"
+        ):
+            chunks.append(chunk)
+
+    assert [chunk.type for chunk in chunks] == ["text-delta"] * 4 + ["error"]
+
+
+@pytest.mark.asyncio
+async def test_tool_call_fail_policy_raises():
+    """Test that a fast tool argument producer cannot bypass the fail policy."""
+
+    async def run_callback(controller: RunController):
+        tool = await controller.add_tool_call("search", "call_1")
+        for i in range(10):
+            tool.append_args_text(str(i))
+
+    with pytest.raises(RunBufferFullError):
+        [
+            chunk
+            async for chunk in create_run(
+                run_callback, max_buffered_chunks=3, buffer_policy="fail"
+            )
+        ]
+
+
+@pytest.mark.asyncio
+async def test_tool_call_block_policy_suspends_producer():
+    """Test that append_args_text_async waits for the tool call's buffer."""
+    max_backlog = 0
+
+    async def run_callback(controller: RunController):
+        nonlocal max_backlog
+        tool = await controller.add_tool_call("search", "call_1")
+        for i in range(20):
+            await tool.append_args_text_async(str(i))
+            max_backlog = max(max_backlog, tool._buffer._chunks)
+        tool.set_response("ok")
+
+    chunks = []
+    async for chunk in create_run(run_callback, max_buffered_chunks=3):
+        chunks.append(chunk)
+        await asyncio.sleep(0.001)
+
+    deltas = [chunk for chunk in chunks if chunk.type == "tool-call-delta"]
+    assert "".join(chunk.args_text_delta for chunk in deltas) == "".join(
+        str(i) for i in range(20)
+    )
+    assert max_backlog <= 3
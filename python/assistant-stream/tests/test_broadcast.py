@@ -0,0 +1,155 @@
+import asyncio
+import json
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.broadcast import BroadcastOverflowError, RunBroadcast
+from assistant_stream.serialization import DataStreamEncoder, OpenAIStreamEncoder
+from assistant_stream.serialization.stream_encoder import StreamEncoder
+
+
+class CountingEncoder(DataStreamEncoder):
+    encoded = 0
+
+    def encode_chunk(self, chunk):
+        CountingEncoder.encoded += 1
+        return super().encode_chunk(chunk)
+
+
+class PrefixEncoder(DataStreamEncoder):
+    def __init__(self, prefix):
+        super().__init__()
+        self.prefix = prefix
+
+    def encode_chunk(self, chunk):
+        frame = super().encode_chunk(chunk)
+        return self.prefix + frame if frame else frame
+
+
+class StreamOnlyEncoder(StreamEncoder):
+    def get_media_type(self):
+        return "text/plain"
+
+    async def encode_stream(self, stream):
+        async for chunk in stream:
+            if chunk.type == "text-delta":
+                yield chunk.text_delta
+        yield "END"
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_encoding():
+    """Test that subscribers of the same encoder share encoded frames."""
+
+    async def run_callback(controller: RunController):
+        await asyncio.sleep(0.01)
+        controller.append_text("Hello")
+        controller.append_text(" world")
+
+    broadcast = RunBroadcast(create_run(run_callback))
+    CountingEncoder.encoded = 0
+
+    async def collect(encoder):
+        return [frame async for frame in broadcast.subscribe(encoder)]
+
+    encoder = CountingEncoder()
+    first, second, openai = await asyncio.gather(
+        collect(encoder),
+        collect(encoder),
+        collect(OpenAIStreamEncoder()),
+    )
+
+    assert first == second == [b'0:"Hello"\n', b'0:" world"\n']
+    assert CountingEncoder.encoded == 2
+    assert openai[-1] == "data: [DONE]\n\n"
+
+
+@pytest.mark.asyncio
+async def test_encoders_of_the_same_class_keep_their_configuration():
+    """Test that differently configured encoders of one class are not shared."""
+
+    async def run_callback(controller: RunController):
+        await asyncio.sleep(0.01)
+        controller.append_text("Hello")
+
+    broadcast = RunBroadcast(create_run(run_callback))
+
+    async def collect(encoder):
+        return [frame async for frame in broadcast.subscribe(encoder)]
+
+    first, second = await asyncio.gather(
+        collect(PrefixEncoder(b"a")), collect(PrefixEncoder(b"b"))
+    )
+
+    assert first == [b'a0:"Hello"\n']
+    assert second == [b'b0:"Hello"\n']
+
+
+@pytest.mark.asyncio
+async def test_stream_only_encoder():
+    """Test that encoders without encode_chunk are driven by encode_stream."""
+
+    async def run_callback(controller: RunController):
+        await asyncio.sleep(0.01)
+        controller.append_text("Hello")
+        controller.append_text(" world")
+
+    broadcast = RunBroadcast(create_run(run_callback))
+
+    frames = [frame async for frame in broadcast.subscribe(StreamOnlyEncoder())]
+
+    assert frames == ["Hello", " world", "END"]
+
+
+@pytest.mark.asyncio
+async def test_late_joiner_receives_state_snapshot_and_tail():
+    """Test that a late subscriber gets the evicted state plus the tail."""
+
+    async def run_callback(controller: RunController):
+        controller.state["title"] = "Draft"
+        await asyncio.sleep(0)
+        controller.state["count"] = 1
+        await asyncio.sleep(0)
+        controller.append_text("text")
+
+    state = {"title": "", "count": 0}
+    broadcast = RunBroadcast(
+        create_run(run_callback, state=state), state=state, tail_size=2
+    )
+    while not broadcast.done:
+        await asyncio.sleep(0)
+
+    frames = [frame async for frame in broadcast.subscribe()]
+
+    assert [frame.decode() for frame in frames] == [
+        "aui-state:"
+        + json.dumps(
+            [{"type": "set", "path": [], "value": {"title": "Draft", "count": 0}}]
+        )
+        + "\n",
+        "aui-state:"
+        + json.dumps([{"type": "set", "path": ["count"], "value": 1}])
+        + "\n",
+        '0:"text"\n',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped():
+    """Test that a subscriber exceeding its buffer is disconnected."""
+
+    async def run_callback(controller: RunController):
+        await asyncio.sleep(0.01)
+        for i in range(10):
+            controller.append_text(str(i))
+
+    broadcast = RunBroadcast(create_run(run_callback))
+    received = []
+
+    async def slow_subscriber():
+        async for frame in broadcast.subscribe(max_buffered=3):
+            received.append(frame)
+            await asyncio.sleep(0.01)
+
+    with pytest.raises(BroadcastOverflowError):
+        await slow_subscriber()
+    assert len(received) < 10
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.serialization import DataStreamResponse
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_cancels_run():
+    """Test that closing the generator cancels the callback and tool calls."""
+    callback_cancelled = asyncio.Event()
+    controllers = {}
+
+    async def run_callback(controller: RunController):
+        controllers["run"] = controller
+        controllers["tool"] = await controller.add_tool_call("search")
+        try:
+            while True:
+                controller.append_text("token")
+                await asyncio.sleep(0.001)
+        except asyncio.CancelledError:
+            callback_cancelled.set()
+            raise
+
+    stream = create_run(run_callback)
+    async for chunk in stream:
+        if chunk.type == "text-delta":
+            break
+    await stream.aclose()
+
+    assert callback_cancelled.is_set()
+    assert controllers["run"].cancelled
+    assert controllers["tool"].cancelled
+    assert not controllers["run"]._fan_in.tasks
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_run():
+    """Test that an ASGI disconnect stops the run behind a DataStreamResponse."""
+    cancelled = asyncio.Event()
+    sent = []
+
+    async def run_callback(controller: RunController):
+        while not controller.cancelled:
+            controller.append_text("token")
+            try:
+                await asyncio.sleep(0.001)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    async def receive():
+        await asyncio.sleep(0.02)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    response = DataStreamResponse(create_run(run_callback))
+    scope = {"type": "http", "asgi": {"spec_version": "2.0"}}
+    await response(scope, receive, send)
+
+    assert cancelled.is_set()
+    assert any(message.get("body") for message in sent)
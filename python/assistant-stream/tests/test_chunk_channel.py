@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.chunk_channel import ChunkChannel
+
+
+@pytest.mark.asyncio
+async def test_channel_batches_items_from_threads():
+    """Test that items from other threads arrive in order, in batches."""
+    channel = ChunkChannel()
+
+    def produce():
+        for i in range(100):
+            channel.put(i)
+        channel.put(None)
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+
+    received = []
+    batches = 0
+    while not received or received[-1] is not None:
+        await channel.wait()
+        received.extend(channel.drain())
+        batches += 1
+    thread.join()
+
+    assert received == list(range(100)) + [None]
+    assert batches <= len(received)
+
+
+@pytest.mark.asyncio
+async def test_channel_wait_timeout():
+    """Test that wait returns False when nothing arrives in time."""
+    channel = ChunkChannel()
+    assert await channel.wait(0.01) is False
+
+    asyncio.get_running_loop().call_later(0.01, channel.put, "x")
+    assert await channel.wait(1) is True
+    assert list(channel.drain()) == ["x"]
+
+
+@pytest.mark.asyncio
+async def test_create_run_from_executor_thread():
+    """Test that chunks appended from a worker thread are delivered."""
+
+    async def run_callback(controller: RunController):
+        def work():
+            for i in range(5):
+                controller.append_text(str(i))
+
+        await asyncio.get_running_loop().run_in_executor(None, work)
+
+    chunks = [chunk async for chunk in create_run(run_callback)]
+
+    assert "".join(chunk.text_delta for chunk in chunks) == "01234"
@@ -0,0 +1,36 @@
+import pickle
+from dataclasses import fields, replace
+
+import pytest
+from assistant_stream.assistant_stream_chunk import (
+    CHUNK_TYPES,
+    SourceChunk,
+    TextDeltaChunk,
+    chunk_from_dict,
+    chunk_to_dict,
+)
+
+
+@pytest.mark.parametrize("tag,chunk_class", sorted(CHUNK_TYPES.items()))
+def test_chunk_classes_are_slotted_with_type_tags(tag, chunk_class):
+    """Test that every chunk class has slots and a class level type tag."""
+    assert chunk_class.TYPE == tag
+    assert "__dict__" not in dir(chunk_class)
+    assert chunk_class.__slots__ == tuple(field.name for field in fields(chunk_class))
+    [type_field] = [field for field in fields(chunk_class) if field.name == "type"]
+    assert type_field.default == tag
+
+
+def test_slotted_chunks_behave_like_dataclasses():
+    """Test construction, equality, replace, pickling and dict conversion."""
+    chunk = TextDeltaChunk("Hello", parent_id="p1")
+    assert chunk.type == "text-delta"
+    assert not hasattr(chunk, "__dict__")
+    with pytest.raises(AttributeError):
+        chunk.unknown = 1
+
+    assert replace(chunk, text_delta="Hi") == TextDeltaChunk("Hi", parent_id="p1")
+    assert pickle.loads(pickle.dumps(chunk)) == chunk
+
+    source = SourceChunk(id="s1", url="https://example.com")
+    assert chunk_from_dict(chunk_to_dict(source)) == source
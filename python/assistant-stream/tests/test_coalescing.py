@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_consecutive_deltas():
+    """Test that consecutive same-kind deltas are merged."""
+
+    async def run_callback(controller: RunController):
+        for token in ["Hel", "lo", " wor", "ld"]:
+            controller.append_text(token)
+        controller.append_reasoning("thinking")
+        controller.append_reasoning("...")
+        controller.append_text("!")
+
+    chunks = await collect(create_run(run_callback, coalesce_window=0.05))
+
+    assert [chunk.type for chunk in chunks] == [
+        "text-delta",
+        "reasoning-delta",
+        "text-delta",
+    ]
+    assert chunks[0].text_delta == "Hello world"
+    assert chunks[1].reasoning_delta == "thinking..."
+    assert chunks[2].text_delta == "!"
+
+
+@pytest.mark.asyncio
+async def test_coalesce_preserves_order_with_state_updates():
+    """Test that state updates split merged deltas and keep their position."""
+
+    async def run_callback(controller: RunController):
+        controller.append_text("a")
+        controller.append_text("b")
+        controller.state["step"] = 1
+        await asyncio.sleep(0)
+        controller.append_text("c")
+        controller.append_text("d")
+
+    chunks = await collect(
+        create_run(run_callback, state={"step": 0}, coalesce_window=0.05)
+    )
+
+    assert [chunk.type for chunk in chunks] == [
+        "text-delta",
+        "update-state",
+        "text-delta",
+    ]
+    assert chunks[0].text_delta == "ab"
+    assert chunks[2].text_delta == "cd"
+
+
+@pytest.mark.asyncio
+async def test_coalesce_respects_parent_id_and_max_size():
+    """Test that deltas with different parents or over budget are not merged."""
+
+    async def run_callback(controller: RunController):
+        controller.append_text("aa")
+        controller.with_parent_id("p1").append_text("bb")
+        controller.append_text("cc")
+        controller.append_text("dd")
+        controller.append_text("ee")
+
+    chunks = await collect(create_run(run_callback, coalesce_max_size=4))
+
+    assert [(chunk.text_delta, chunk.parent_id) for chunk in chunks] == [
+        ("aa", None),
+        ("bb", "p1"),
+        ("ccdd", None),
+        ("ee", None),
+    ]
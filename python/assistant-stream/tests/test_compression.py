@@ -0,0 +1,96 @@
+import asyncio
+import zlib
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.serialization import DataStreamResponse
+from assistant_stream.serialization.assistant_stream_response import (
+    negotiate_encoding,
+)
+
+
+async def run_response(response, accept_encoding=None):
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    headers = []
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    scope = {"type": "http", "asgi": {"spec_version": "2.0"}, "headers": headers}
+    await response(scope, receive, send)
+    return sent
+
+
+def response_headers(sent):
+    return dict(sent[0]["headers"])
+
+
+async def reasoning(controller: RunController):
+    controller.append_reasoning("Let me think about this. " * 50)
+    controller.add_tool_result("call-1", {"rows": list(range(100))})
+    for i in range(100):
+        controller.append_text(f"token {i} ")
+        await asyncio.sleep(0)
+
+
+def test_negotiate_encoding():
+    """Test Accept-Encoding negotiation."""
+    assert negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert negotiate_encoding("deflate") == "deflate"
+    assert negotiate_encoding("gzip;q=0, deflate;q=0.5") == "deflate"
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+async def test_compressed_body_matches_uncompressed(encoding):
+    """Test that the decompressed body equals the uncompressed response."""
+    plain = await run_response(DataStreamResponse(create_run(reasoning)))
+    compressed = await run_response(
+        DataStreamResponse(create_run(reasoning), compression=True), encoding
+    )
+
+    headers = response_headers(compressed)
+    assert headers[b"content-encoding"] == encoding.encode()
+    assert headers[b"vary"] == b"Accept-Encoding"
+
+    plain_body = b"".join(m.get("body", b"") for m in plain)
+    compressed_body = b"".join(m.get("body", b"") for m in compressed)
+    wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+    assert zlib.decompress(compressed_body, wbits) == plain_body
+    assert len(compressed_body) < len(plain_body) / 2
+
+
+@pytest.mark.asyncio
+async def test_each_message_is_decodable_on_arrival():
+    """Test that sync flushes make every sent message decodable at once."""
+    sent = await run_response(
+        DataStreamResponse(create_run(reasoning), compression=True), "gzip"
+    )
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    bodies = [m["body"] for m in sent if m.get("body")]
+
+    first = decompressor.decompress(bodies[0])
+    assert first.startswith(b"g:")
+    # The tool result is a flush point
+    second = decompressor.decompress(bodies[1])
+    assert second.startswith(b"a:")
+
+
+@pytest.mark.asyncio
+async def test_no_compression_without_accept_encoding():
+    """Test that clients not accepting compression get the plain body."""
+    sent = await run_response(
+        DataStreamResponse(create_run(reasoning), compression=True)
+    )
+
+    headers = response_headers(sent)
+    assert b"content-encoding" not in headers
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert b"".join(m.get("body", b"") for m in sent).startswith(b"g:")
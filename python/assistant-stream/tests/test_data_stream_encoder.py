@@ -0,0 +1,137 @@
+import json
+
+import pytest
+from assistant_stream.assistant_stream_chunk import (
+    DataChunk,
+    ErrorChunk,
+    ReasoningDeltaChunk,
+    SourceChunk,
+    TextDeltaChunk,
+    ToolCallBeginChunk,
+    ToolCallDeltaChunk,
+    ToolResultChunk,
+    UpdateStateChunk,
+)
+from assistant_stream.serialization.data_stream import (
+    DataStreamEncoder,
+    StateProxyJSONEncoder,
+)
+from assistant_stream.state_manager import StateManager
+
+
+# The encoder before it produced bytes, kept as the protocol reference
+def reference_encode_chunk(chunk):
+    if chunk.type == "text-delta":
+        if hasattr(chunk, 'parent_id') and chunk.parent_id:
+            return f"aui-text-delta:{json.dumps({'textDelta': chunk.text_delta, 'parentId': chunk.parent_id}, cls=StateProxyJSONEncoder)}\n"
+        else:
+            return f"0:{json.dumps(chunk.text_delta, cls=StateProxyJSONEncoder)}\n"
+    elif chunk.type == "reasoning-delta":
+        if hasattr(chunk, 'parent_id') and chunk.parent_id:
+            return f"aui-reasoning-delta:{json.dumps({'reasoningDelta': chunk.reasoning_delta, 'parentId': chunk.parent_id}, cls=StateProxyJSONEncoder)}\n"
+        else:
+            return f"g:{json.dumps(chunk.reasoning_delta, cls=StateProxyJSONEncoder)}\n"
+    elif chunk.type == "tool-call-begin":
+        data = {"toolCallId": chunk.tool_call_id, "toolName": chunk.tool_name}
+        if hasattr(chunk, 'parent_id') and chunk.parent_id:
+            data["parentId"] = chunk.parent_id
+        return f'b:{json.dumps(data, cls=StateProxyJSONEncoder)}\n'
+    elif chunk.type == "tool-call-delta":
+        return f'c:{json.dumps({ "toolCallId": chunk.tool_call_id, "argsTextDelta": chunk.args_text_delta }, cls=StateProxyJSONEncoder)}\n'
+    elif chunk.type == "tool-result":
+        res = {"toolCallId": chunk.tool_call_id, "result": chunk.result}
+        if chunk.artifact is not None:
+            res["artifact"] = chunk.artifact
+        if chunk.is_error:
+            res["isError"] = chunk.is_error
+        return f"a:{json.dumps(res, cls=StateProxyJSONEncoder)}\n"
+    elif chunk.type == "data":
+        return f"2:{json.dumps([chunk.data], cls=StateProxyJSONEncoder)}\n"
+    elif chunk.type == "error":
+        return f"3:{json.dumps(chunk.error, cls=StateProxyJSONEncoder)}\n"
+    elif chunk.type == "source":
+        source_data = {
+            "sourceType": chunk.source_type,
+            "id": chunk.id,
+            "url": chunk.url
+        }
+        if chunk.title is not None:
+            source_data["title"] = chunk.title
+        if hasattr(chunk, 'parent_id') and chunk.parent_id:
+            source_data["parentId"] = chunk.parent_id
+        return f"h:{json.dumps(source_data, cls=StateProxyJSONEncoder)}\n"
+    elif chunk.type == "update-state":
+        return f"aui-state:{json.dumps(chunk.operations, cls=StateProxyJSONEncoder)}\n"
+
+
+STRINGS = [
+    "",
+    "Hello world",
+    'quotes " and \\ backslashes',
+    "line\nbreaks\tand\rcontrol\x00\x1f",
+    "unicode é ß 中文",
+    "emoji 😀 and surrogates \ud83d",
+    "</script>",
+]
+
+
+def corpus():
+    for text in STRINGS:
+        yield TextDeltaChunk(text_delta=text)
+        yield TextDeltaChunk(text_delta=text, parent_id="part-1")
+        yield ReasoningDeltaChunk(reasoning_delta=text)
+        yield ReasoningDeltaChunk(reasoning_delta=text, parent_id="part-1")
+        yield ToolCallDeltaChunk(tool_call_id="call_1", args_text_delta=text)
+        yield ErrorChunk(error=text)
+        yield DataChunk(data={"text": text, "items": [1, 2.5, None, True]})
+    yield ToolCallBeginChunk(tool_call_id="call_1", tool_name="search")
+    yield ToolCallBeginChunk(tool_call_id="call_1", tool_name="search", parent_id="p")
+    yield ToolResultChunk(tool_call_id="call_1", result={"hits": ["ä"]})
+    yield ToolResultChunk(
+        tool_call_id="call_1", result="err", artifact=[1], is_error=True
+    )
+    yield ToolResultChunk(tool_call_id="call_1", result=None, artifact=0)
+    yield SourceChunk(id="s1", url="https://example.com")
+    yield SourceChunk(id="s1", url="https://example.com", title="Ex", parent_id="p")
+    yield UpdateStateChunk(
+        operations=[
+            {"type": "set", "path": ["a", "0"], "value": {"x": [1, "ü"]}},
+            {"type": "append-text", "path": ["b"], "value": "more"},
+        ]
+    )
+    yield TextDeltaChunk(text_delta=None)
+    yield DataChunk(data=[])
+
+
+@pytest.mark.parametrize("chunk", list(corpus()), ids=repr)
+def test_encoder_output_is_byte_identical(chunk):
+    """Test that the bytes encoder matches the reference protocol output."""
+    assert DataStreamEncoder().encode_chunk(chunk) == reference_encode_chunk(
+        chunk
+    ).encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_state_proxy_values_are_encoded():
+    """Test that StateProxy values are serialized like before."""
+    manager = StateManager(lambda chunk: None, {"title": "Draft", "tags": ["a"]})
+    chunks = [
+        UpdateStateChunk(
+            operations=[{"type": "set", "path": ["copy"], "value": manager.state["tags"]}]
+        ),
+        TextDeltaChunk(text_delta=manager.state["title"]),
+        DataChunk(data=manager.state),
+    ]
+    for chunk in chunks:
+        assert DataStreamEncoder().encode_chunk(chunk) == reference_encode_chunk(
+            chunk
+        ).encode("utf-8")
+
+
+def test_unknown_chunks_are_skipped():
+    """Test that chunks without an encoding produce None."""
+
+    class CustomChunk:
+        type = "custom"
+
+    assert DataStreamEncoder().encode_chunk(CustomChunk()) is None
@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+from assistant_stream import (
+    create_run,
+    RunController,
+    FlushPolicy,
+    AdaptiveFlushPolicy,
+)
+
+
+async def collect_state_chunks(callback, **kwargs):
+    chunks = [chunk async for chunk in create_run(callback, state={}, **kwargs)]
+    return [chunk for chunk in chunks if chunk.type == "update-state"], chunks
+
+
+async def set_each_tick(controller: RunController):
+    for i in range(10):
+        controller.state[f"key{i}"] = i
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_default_policy_flushes_every_tick():
+    """Test that operations are sent on the next event loop iteration."""
+    updates, _ = await collect_state_chunks(set_each_tick)
+
+    assert len(updates) == 10
+
+
+@pytest.mark.asyncio
+async def test_window_batches_operations():
+    """Test that a window batches operations across event loop iterations."""
+    updates, _ = await collect_state_chunks(
+        set_each_tick, flush_policy=FlushPolicy(window=10)
+    )
+
+    assert len(updates) == 1
+    assert len(updates[0].operations) == 10
+
+
+@pytest.mark.asyncio
+async def test_max_operations_flushes_full_batches():
+    """Test that batches are sent once they reach max_operations."""
+
+    async def callback(controller: RunController):
+        for i in range(7):
+            controller.state[f"key{i}"] = i
+
+    updates, _ = await collect_state_chunks(
+        callback, flush_policy=FlushPolicy(window=10, max_operations=3)
+    )
+
+    assert [len(chunk.operations) for chunk in updates] == [3, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_max_bytes_flushes_large_batches():
+    """Test that batches are sent once their values reach max_bytes."""
+
+    async def callback(controller: RunController):
+        controller.state["small"] = "x"
+        controller.state["large"] = "x" * 100
+        controller.state["after"] = "x"
+
+    updates, _ = await collect_state_chunks(
+        callback, flush_policy=FlushPolicy(window=10, max_bytes=100)
+    )
+
+    assert [len(chunk.operations) for chunk in updates] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_other_chunks_flush_pending_operations():
+    """Test that state updates stay ordered before later chunks."""
+
+    async def callback(controller: RunController):
+        controller.state["status"] = "searching"
+        controller.append_text("Searching")
+
+    _, chunks = await collect_state_chunks(
+        callback, flush_policy=FlushPolicy(window=10)
+    )
+
+    assert [chunk.type for chunk in chunks] == ["update-state", "text-delta"]
+
+
+def test_adaptive_window_grows_with_backlog():
+    """Test the adaptive window for different consumer backlogs."""
+    policy = AdaptiveFlushPolicy(min_window=0.01, max_window=0.11, max_backlog=10)
+
+    assert policy.get_window(0) == 0.01
+    assert policy.get_window(5) == pytest.approx(0.06)
+    assert policy.get_window(100) == 0.11
+
+
+@pytest.mark.asyncio
+async def test_policy_applies_to_thread_callbacks():
+    """Test batching of operations added from an executor thread."""
+
+    def callback(controller):
+        for i in range(7):
+            controller.state[f"key{i}"] = i
+
+    updates, _ = await collect_state_chunks(
+        callback,
+        flush_policy=FlushPolicy(window=10, max_operations=3),
+        run_in_thread=True,
+    )
+
+    assert sum(len(chunk.operations) for chunk in updates) == 7
+
+
+@pytest.mark.asyncio
+async def test_backlog_includes_drained_chunks():
+    """Test that chunks taken by a slow consumer count towards the backlog."""
+    backlogs = []
+
+    class RecordingPolicy(FlushPolicy):
+        def get_window(self, backlog):
+            backlogs.append(backlog)
+            return 0.0
+
+    async def callback(controller: RunController):
+        for i in range(10):
+            controller.append_text(str(i))
+        # Let the consumer take the text chunks
+        await asyncio.sleep(0)
+        controller.state["done"] = True
+
+    async for _ in create_run(callback, state={}, flush_policy=RecordingPolicy()):
+        await asyncio.sleep(0.001)
+
+    assert backlogs and backlogs[0] >= 5
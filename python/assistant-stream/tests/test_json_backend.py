@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from assistant_stream.assistant_stream_chunk import (
+    DataChunk,
+    TextDeltaChunk,
+    ToolResultChunk,
+    UpdateStateChunk,
+)
+from assistant_stream.serialization import (
+    DataStreamEncoder,
+    JSONBackend,
+    OpenAIStreamEncoder,
+    get_json_backend,
+    set_json_backend,
+)
+from assistant_stream.serialization import json_backend
+from assistant_stream.state_manager import StateManager
+
+
+@pytest.fixture
+def restore_backend():
+    previous = json_backend._backend
+    yield
+    json_backend._backend = previous
+
+
+def test_stdlib_backend_matches_json_dumps():
+    """Test that the default backend produces json.dumps output."""
+    backend = JSONBackend()
+    for value in ["ä\n", {"a": [1, None, 2.5]}, [True, "x"]]:
+        assert backend.dumps(value) == json.dumps(value).encode()
+        assert (
+            backend.dumps(value, ensure_ascii=False)
+            == json.dumps(value, ensure_ascii=False).encode()
+        )
+
+
+def test_backend_selection(restore_backend, monkeypatch):
+    """Test selecting backends by name and from the environment."""
+    json_backend._backend = None
+    monkeypatch.setenv("ASSISTANT_STREAM_JSON_BACKEND", "json")
+    assert type(get_json_backend()) is JSONBackend
+
+    assert isinstance(set_json_backend("auto"), JSONBackend)
+    with pytest.raises(ValueError):
+        set_json_backend("yaml")
+
+    custom = JSONBackend()
+    set_json_backend(custom)
+    assert get_json_backend() is custom
+
+    # None restores the default
+    monkeypatch.delenv("ASSISTANT_STREAM_JSON_BACKEND")
+    assert type(set_json_backend(None)) is JSONBackend
+
+
+@pytest.mark.asyncio
+async def test_orjson_backend_parses_to_same_values():
+    """Test that orjson output parses like the stdlib output, StateProxy included."""
+    pytest.importorskip("orjson")
+    from assistant_stream.serialization import OrjsonBackend
+
+    manager = StateManager(lambda chunk: None, {"tags": ["a", "ü"]})
+    backend = OrjsonBackend()
+    chunks = [
+        TextDeltaChunk(text_delta="Hello ü"),
+        DataChunk(data={1: "int key", "big": 2**70}),
+        ToolResultChunk(tool_call_id="c", result={"rows": list(range(5))}),
+        UpdateStateChunk(
+            operations=[{"type": "set", "path": ["x"], "value": manager.state["tags"]}]
+        ),
+    ]
+
+    fast = DataStreamEncoder(json_backend=backend)
+    reference = DataStreamEncoder(json_backend=JSONBackend())
+    for chunk in chunks:
+        fast_prefix, fast_json = fast.encode_chunk(chunk).split(b":", 1)
+        prefix, expected_json = reference.encode_chunk(chunk).split(b":", 1)
+        assert fast_prefix == prefix
+        assert json.loads(fast_json) == json.loads(expected_json)
+
+    openai = OpenAIStreamEncoder(json_backend=backend).encode_chunk(chunks[0])
+    assert json.loads(openai[len("data: "):])["choices"][0]["delta"] == {
+        "content": "Hello ü"
+    }
@@ -1,10 +1,12 @@
 """Tests for the LangGraph integration."""
 
+import asyncio
 import unittest
 from unittest.mock import MagicMock, patch
 
 from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 
+from assistant_stream import create_run
 from assistant_stream.modules.langgraph import append_langgraph_event
 
 
@@ -98,6 +100,66 @@ class TestLangGraphIntegration(unittest.TestCase):
         # Check that messages channel is ignored
         self.assertNotIn("messages", controller.state["node1"])
     
+    def test_updates_event_with_plain_dict_state(self):
+        """Test that updates are assigned to a plain dict state."""
+        controller = MockRunController({"channel1": "old"})
+
+        append_langgraph_event(
+            controller, "test", "updates", {"node1": {"channel1": "value1"}}
+        )
+
+        self.assertEqual(controller.state, {"channel1": "value1"})
+
+    def test_updates_event_with_run_controller(self):
+        """Test that updates to a run's state are sent as plain assignments."""
+        state, operations = self._collect_channel_update(diff_state=False)
+
+        self.assertEqual(state, {"channel1": {"answer": "The end", "notes": "n" * 200}})
+        self.assertEqual(
+            operations,
+            [
+                {
+                    "type": "set",
+                    "path": ["channel1"],
+                    "value": {"answer": "The end", "notes": "n" * 200},
+                }
+            ],
+        )
+
+    def test_updates_event_with_diff_state(self):
+        """Test that updates to a run with diff_state send only the changes."""
+        state, operations = self._collect_channel_update(diff_state=True)
+
+        self.assertEqual(state, {"channel1": {"answer": "The end", "notes": "n" * 200}})
+        self.assertEqual(
+            operations,
+            [{"type": "append-text", "path": ["channel1", "answer"], "value": " end"}],
+        )
+
+    def _collect_channel_update(self, diff_state):
+        notes = "n" * 200
+
+        async def run_callback(controller):
+            append_langgraph_event(
+                controller,
+                "test",
+                "updates",
+                {"node1": {"channel1": {"answer": "The end", "notes": notes}}},
+            )
+
+        async def collect():
+            state = {"channel1": {"answer": "The", "notes": notes}}
+            chunks = [
+                chunk
+                async for chunk in create_run(
+                    run_callback, state=state, diff_state=diff_state
+                )
+                if chunk.type == "update-state"
+            ]
+            return state, [op for chunk in chunks for op in chunk.operations]
+
+        return asyncio.run(collect())
+
     def test_error_no_state(self):
         """Test error when controller has no state."""
         controller = MagicMock()
@@ -0,0 +1,66 @@
+import asyncio
+import time
+import pytest
+from assistant_stream import create_run, RunController, LoopLagMonitor
+
+
+def blocking_work():
+    time.sleep(0.2)
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_blocking_run():
+    """Test that a blocking callback is charged with the stall it causes."""
+    monitor = LoopLagMonitor(threshold=0.05, interval=0.01)
+    controllers = {}
+
+    async def blocking(controller: RunController):
+        controllers["blocking"] = controller
+        await asyncio.sleep(0.05)
+        blocking_work()
+        controller.append_text("done")
+
+    async def polite(controller: RunController):
+        controllers["polite"] = controller
+        for _ in range(20):
+            controller.append_text("token")
+            await asyncio.sleep(0.01)
+
+    async def consume(stream):
+        async for _ in stream:
+            pass
+
+    try:
+        await asyncio.gather(
+            consume(create_run(blocking, loop_monitor=monitor)),
+            consume(create_run(polite, loop_monitor=monitor)),
+        )
+    finally:
+        monitor.close()
+
+    blocking_lag = controllers["blocking"].loop_lag
+    assert blocking_lag.stall_count == 1
+    assert blocking_lag.max_stall_time >= 0.15
+    assert "blocking_work" in blocking_lag.stalls[0].stack
+    assert controllers["polite"].loop_lag.stall_count == 0
+    assert monitor.stall_count == 1
+
+
+@pytest.mark.asyncio
+async def test_no_stalls_without_blocking():
+    """Test that a cooperative run reports no stalls."""
+    monitor = LoopLagMonitor(threshold=0.05, interval=0.01)
+
+    async def run_callback(controller: RunController):
+        for _ in range(5):
+            controller.append_text("token")
+            await asyncio.sleep(0.01)
+        assert controller.loop_lag.stall_count == 0
+
+    try:
+        async for _ in create_run(run_callback, loop_monitor=monitor):
+            pass
+    finally:
+        monitor.close()
+
+    assert monitor.stall_count == 0
@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController, MetricsAggregator, RunObserver
+from assistant_stream.serialization.data_stream import DataStreamEncoder
+
+
+class RecordingObserver(RunObserver):
+    def __init__(self):
+        self.events = []
+        self.stats = None
+
+    def on_run_start(self, stats):
+        self.events.append("start")
+
+    def on_chunk(self, stats, chunk, queue_depth):
+        self.events.append(chunk.type)
+
+    def on_run_end(self, stats):
+        self.events.append("end")
+        self.stats = stats
+
+
+@pytest.mark.asyncio
+async def test_observer_receives_run_events():
+    """Test that an observer sees every chunk and the run's statistics."""
+    observer = RecordingObserver()
+
+    async def run_callback(controller: RunController):
+        controller.append_text("Hello")
+        controller.state["count"] = 1
+        controller.append_text(" world")
+
+    chunks = [
+        chunk
+        async for chunk in create_run(run_callback, state={}, observer=observer)
+    ]
+
+    assert observer.events == ["start", *[chunk.type for chunk in chunks], "end"]
+    stats = observer.stats
+    assert stats.chunk_counts["text-delta"] == 2
+    assert stats.chunk_text_bytes["text-delta"] == len("Hello world")
+    assert stats.state_flushes == 1
+    assert stats.time_to_first_chunk is not None
+    assert stats.duration >= stats.time_to_first_chunk
+    assert not stats.cancelled
+
+
+@pytest.mark.asyncio
+async def test_observer_sees_cancelled_run():
+    """Test that closing the stream ends the run for the observer."""
+    observer = RecordingObserver()
+
+    async def run_callback(controller: RunController):
+        while True:
+            controller.append_text("token")
+            await asyncio.sleep(0.001)
+
+    stream = create_run(run_callback, observer=observer)
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    assert observer.events[-1] == "end"
+    assert observer.stats.cancelled
+
+
+@pytest.mark.asyncio
+async def test_aggregator_exports_summaries():
+    """Test that the aggregator summarizes runs and encoder timings."""
+    metrics = MetricsAggregator()
+
+    async def run_callback(controller: RunController):
+        controller.append_text("Hello")
+        controller.add_data({"done": True})
+
+    for _ in range(3):
+        stream = create_run(run_callback, observer=metrics)
+        encoded = [
+            frame async for frame in DataStreamEncoder(metrics).encode_stream(stream)
+        ]
+        assert encoded == [b'0:"Hello"\n', b'2:[{"done": true}]\n']
+
+    summary = metrics.summary()
+    assert summary["runs_started"] == 3
+    assert summary["active_runs"] == 0
+    assert summary["chunks"] == {"text-delta": 3, "data": 3}
+    assert summary["time_to_first_chunk"]["count"] == 3
+    assert summary["time_to_first_chunk"]["p99"] is not None
+    assert summary["encode_seconds"]["text-delta"]["count"] == 3
+    # Encoded sizes include chunks without text, such as data
+    assert summary["encoded_bytes"] == {
+        "text-delta": 3 * len(b'0:"Hello"\n'),
+        "data": 3 * len(b'2:[{"done": true}]\n'),
+    }
+    assert summary["text_bytes"] == {"text-delta": 15, "data": 0}
+
+    text = metrics.to_prometheus()
+    assert 'assistant_stream_chunks_total{type="text-delta"} 3' in text
+    assert 'assistant_stream_time_to_first_chunk_seconds{quantile="0.5"}' in text
+    assert 'assistant_stream_encode_seconds{type="data",quantile="0.99"}' in text
+    assert "assistant_stream_run_duration_seconds_count 3" in text
+    assert 'assistant_stream_encoded_bytes_total{type="data"} 57' in text
@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from assistant_stream import create_run, RunController, ProcessRunError
+from assistant_stream.assistant_stream_chunk import ToolResultChunk
+from assistant_stream.process_run import decode_chunk_frame, encode_chunk_frame
+
+
+async def produce(controller: RunController):
+    controller.append_text(f"pid:{os.getpid()}")
+    controller.state["items"] = [1]
+    controller.state["items"].append(2)
+    tool = await controller.add_tool_call("search", "call_1")
+    tool.append_args_text("{}")
+    tool.set_response({"hits": 3})
+
+
+async def fail(controller: RunController):
+    controller.append_text("partial")
+    raise ValueError("boom")
+
+
+async def endless(marker: str, controller: RunController):
+    try:
+        while True:
+            controller.append_text("token")
+            await asyncio.sleep(0.001)
+    except asyncio.CancelledError:
+        with open(marker, "w") as f:
+            f.write("cancelled")
+        raise
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_chunk_frames_round_trip():
+    """Test that chunk frames rebuild equal chunks."""
+    chunk = ToolResultChunk(tool_call_id="call_1", result={"a": [1]}, is_error=True)
+    frame = encode_chunk_frame(chunk)
+    assert decode_chunk_frame(frame[0], frame[5:]) == chunk
+
+
+@pytest.mark.asyncio
+async def test_run_in_worker_process(process_pool):
+    """Test that chunks and state updates stream back from the worker."""
+    state = {}
+    chunks = [
+        chunk
+        async for chunk in create_run(produce, state=state, process_pool=process_pool)
+    ]
+
+    [text] = [chunk for chunk in chunks if chunk.type == "text-delta"]
+    assert text.text_delta != f"pid:{os.getpid()}"
+    assert [chunk.result for chunk in chunks if chunk.type == "tool-result"] == [
+        {"hits": 3}
+    ]
+    assert state == {"items": [1, 2]}
+
+
+@pytest.mark.asyncio
+async def test_worker_error_is_raised_once(process_pool):
+    """Test that a failing callback emits one error chunk and raises."""
+    chunks = []
+    with pytest.raises(ProcessRunError, match="boom"):
+        async for chunk in create_run(fail, process_pool=process_pool):
+            chunks.append(chunk)
+
+    assert [chunk.type for chunk in chunks] == ["text-delta", "error"]
+    assert chunks[-1].error == "boom"
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_cancels_worker(process_pool, tmp_path):
+    """Test that cancelling the run cancels the callback in the worker."""
+    marker = tmp_path / "cancelled"
+
+    stream = create_run(
+        functools.partial(endless, str(marker)), process_pool=process_pool
+    )
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    for _ in range(200):
+        if marker.exists():
+            break
+        await asyncio.sleep(0.01)
+    assert marker.read_text() == "cancelled"
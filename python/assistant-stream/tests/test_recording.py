@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.recording import read_recording, record_stream, replay_recording
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(tmp_path):
+    """Test that a recorded run replays the same chunks with its timing."""
+    path = str(tmp_path / "run.jsonl")
+
+    async def run_callback(controller: RunController):
+        controller.append_text("Hello")
+        await asyncio.sleep(0.05)
+        controller.state["done"] = True
+        controller.add_source("s1", "https://example.com", "Example")
+
+    recorded = [
+        chunk
+        async for chunk in record_stream(
+            create_run(run_callback, state={"done": False}), path
+        )
+    ]
+    offsets = [offset for offset, _ in read_recording(path)]
+
+    assert offsets[0] == 0
+    assert offsets[1] >= 0.04
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    replayed = [chunk async for chunk in replay_recording(path, speed=None)]
+    assert replayed == recorded
+    assert loop.time() - start < 0.04
+
+    start = loop.time()
+    replayed = [chunk async for chunk in replay_recording(path, speed=2.0)]
+    assert replayed == recorded
+    assert loop.time() - start >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_appended_runs_replay_separately(tmp_path):
+    """Test that each run appended to a recording is replayed on its own."""
+    path = str(tmp_path / "runs.jsonl")
+
+    def run_callback(text):
+        async def callback(controller: RunController):
+            controller.append_text(text)
+            await asyncio.sleep(0.02)
+            controller.append_text(text)
+
+        return callback
+
+    for text in ("first", "second"):
+        [chunk async for chunk in record_stream(create_run(run_callback(text)), path)]
+
+    for run, text in ((0, "first"), (1, "second"), (-1, "second")):
+        assert [offset > 0 for offset, _ in read_recording(path, run)] == [False, True]
+        replayed = [
+            chunk async for chunk in replay_recording(path, speed=None, run=run)
+        ]
+        assert [chunk.text_delta for chunk in replayed] == [text, text]
+
+    with pytest.raises(IndexError):
+        list(read_recording(path, 2))
+
+
+@pytest.mark.asyncio
+async def test_recording_is_written_when_closed_early(tmp_path):
+    """Test that buffered chunks are written when the stream is closed."""
+    path = str(tmp_path / "run.jsonl")
+
+    async def run_callback(controller: RunController):
+        controller.append_text("Hello")
+        await asyncio.sleep(1)
+
+    stream = record_stream(create_run(run_callback), path)
+    chunk = await stream.__anext__()
+    await stream.aclose()
+
+    assert [recorded for _, recorded in read_recording(path)] == [chunk]
+
+
+def test_empty_recording_has_no_runs(tmp_path):
+    """Test that an empty file has no runs to read."""
+    path = tmp_path / "empty.jsonl"
+    path.write_text("")
+
+    for run in (0, -1):
+        with pytest.raises(IndexError):
+            list(read_recording(str(path), run))
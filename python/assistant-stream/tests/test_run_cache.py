@@ -0,0 +1,85 @@
+import pytest
+from assistant_stream import RunController
+from assistant_stream.run_cache import RunCache, cached_run
+
+
+@pytest.mark.asyncio
+async def test_cache_replays_chunks_and_final_state(tmp_path):
+    """Test that a cached run is replayed without calling the callback."""
+    calls = 0
+
+    async def run_callback(controller: RunController):
+        nonlocal calls
+        calls += 1
+        controller.append_text("Hello")
+        controller.state["answer"] = 42
+        controller.add_tool_result("call_1", {"ok": True})
+
+    cache = RunCache(directory=str(tmp_path))
+
+    async def run():
+        stream = cached_run(cache, "faq:hello", run_callback, state={"answer": None})
+        return [chunk async for chunk in stream]
+
+    first = await run()
+    second = await run()
+
+    assert calls == 1
+    assert second == first
+    assert cache.get("faq:hello").final_state == {"answer": 42}
+
+    # A fresh cache reads the entry back from disk
+    disk_cache = RunCache(directory=str(tmp_path))
+    assert [chunk for _, chunk in disk_cache.get("faq:hello").chunks] == first
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used():
+    """Test LRU eviction when max_entries is exceeded."""
+
+    async def run_callback(controller: RunController):
+        controller.append_text("x")
+
+    cache = RunCache(max_entries=2)
+    for key in ["a", "b", "a", "c"]:
+        [chunk async for chunk in cached_run(cache, key, run_callback)]
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+@pytest.mark.asyncio
+async def test_cache_skips_failed_runs():
+    """Test that runs ending in an error are not cached."""
+
+    async def run_callback(controller: RunController):
+        raise ValueError("boom")
+
+    cache = RunCache()
+    with pytest.raises(ValueError):
+        [chunk async for chunk in cached_run(cache, "key", run_callback)]
+
+    assert cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_applies_final_state():
+    """Test that a replayed run leaves the caller's state as the original run did."""
+
+    async def run_callback(controller: RunController):
+        controller.state["answer"] = 42
+        controller.state["notes"] += " done"
+
+    cache = RunCache()
+    miss_state = {"answer": None, "notes": "started"}
+    [chunk async for chunk in cached_run(cache, "key", run_callback, state=miss_state)]
+    hit_state = {"answer": None, "notes": "started"}
+    [chunk async for chunk in cached_run(cache, "key", run_callback, state=hit_state)]
+
+    assert miss_state == {"answer": 42, "notes": "started done"}
+    assert hit_state == miss_state
+
+    # The cached final state is not shared with the caller
+    hit_state["answer"] = 0
+    assert cache.get("key").final_state["answer"] == 42
@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.serialization.openai_stream import OpenAIStreamEncoder
+from assistant_stream.run_registry import (
+    ReplayBuffer,
+    ReplayOffsetError,
+    RunRegistry,
+    resume_offset,
+)
+
+
+@pytest.mark.asyncio
+async def test_reattach_from_offset():
+    """Test that a reconnecting client receives the missed frames and the tail."""
+    release = asyncio.Event()
+
+    async def run_callback(controller: RunController):
+        controller.append_text("a")
+        controller.append_text("b")
+        await release.wait()
+        controller.append_text("c")
+
+    registry = RunRegistry()
+    registry.start("run-1", create_run(run_callback))
+
+    first = registry.attach("run-1")
+    received = [await first.__anext__(), await first.__anext__()]
+    await first.aclose()
+
+    release.set()
+    received += [frame async for frame in registry.attach("run-1", offset=1)]
+
+    assert received == [b'0:"a"\n', b'0:"b"\n', b'0:"b"\n', b'0:"c"\n']
+
+
+@pytest.mark.asyncio
+async def test_replay_buffer_evicts_old_frames():
+    """Test that evicted offsets can no longer be replayed."""
+    buffer = ReplayBuffer(max_frames=2)
+    for frame in ["a", "b", "c"]:
+        buffer.append(frame)
+    buffer.close()
+
+    assert buffer.first_offset == 1
+    assert [frame async for frame in buffer.read_from(1)] == ["b", "c"]
+    with pytest.raises(ReplayOffsetError):
+        [frame async for frame in buffer.read_from(0)]
+
+
+def test_replay_buffer_counts_utf8_bytes():
+    """Test that max_bytes counts text frames in UTF-8 bytes."""
+    buffer = ReplayBuffer(max_bytes=8)
+    for frame in ["héllo", b"abc", "日本"]:
+        buffer.append(frame)
+
+    assert buffer.first_offset == 2
+
+
+def test_resume_offset():
+    """Test that Last-Event-ID is turned into the next offset."""
+    assert resume_offset({}) == 0
+    assert resume_offset({"last-event-id": "4"}) == 5
+    assert resume_offset({"last-event-id": "oops"}) == 0
+
+
+async def receive_until(response, headers, count):
+    """Receive count body frames from a response, then disconnect."""
+    bodies = []
+    done = asyncio.Event()
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            bodies.append(dict(message["headers"]))
+        elif message.get("body"):
+            bodies.append(message["body"])
+            if len(bodies) == count + 1:
+                done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"spec_version": "2.0"},
+        "headers": [(key.encode(), value.encode()) for key, value in headers.items()],
+    }
+    # The response ends once receive reports the disconnect
+    await response(scope, receive, send)
+    return bodies[0], bodies[1:]
+
+
+@pytest.mark.asyncio
+async def test_event_stream_reconnect_with_last_event_id():
+    """Test that an SSE client resumes from the id of the last event it received."""
+    release = asyncio.Event()
+
+    async def run_callback(controller: RunController):
+        controller.append_text("a")
+        controller.append_text("b")
+        await release.wait()
+        controller.append_text("c")
+
+    registry = RunRegistry()
+    registry.start("run-1", create_run(run_callback), OpenAIStreamEncoder())
+
+    _, first = await receive_until(registry.response("run-1"), {}, 2)
+    last_event_id = first[-1].split(b"\n", 1)[0].removeprefix(b"id: ").decode()
+    release.set()
+
+    headers = {"last-event-id": last_event_id}
+    _, second = await receive_until(
+        registry.response("run-1", resume_offset(headers)), headers, 10
+    )
+
+    events = first + second
+    assert [event.split(b"\n", 1)[0] for event in events] == [
+        b"id: %d" % i for i in range(len(events))
+    ]
+    contents = [event for event in events if b'"content"' in event]
+    assert [event.split(b'"content": ')[1][:3] for event in contents] == [
+        b'"a"',
+        b'"b"',
+        b'"c"',
+    ]
+    assert events[-1].endswith(b"data: [DONE]\n\n")
+
+
+@pytest.mark.asyncio
+async def test_data_stream_reconnect_with_counted_offset():
+    """Test resuming a data stream from X-Run-Offset plus the frames received."""
+    release = asyncio.Event()
+
+    async def run_callback(controller: RunController):
+        controller.append_text("a")
+        controller.append_text("b")
+        await release.wait()
+        controller.append_text("c")
+
+    registry = RunRegistry()
+    registry.start("run-1", create_run(run_callback))
+
+    headers, first = await receive_until(registry.response("run-1"), {}, 2)
+    last_offset = int(headers[b"x-run-offset"]) + len(first) - 1
+    release.set()
+
+    resume_headers = {"last-event-id": str(last_offset)}
+    headers, second = await receive_until(
+        registry.response("run-1", resume_offset(resume_headers)), resume_headers, 1
+    )
+
+    assert headers[b"x-run-offset"] == b"2"
+    assert first + second == [b'0:"a"\n', b'0:"b"\n', b'0:"c"\n']
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    RunRejectedError,
+    RunScheduler,
+)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_concurrency_and_orders_by_priority():
+    """Test that excess runs wait and interactive runs are admitted first."""
+    scheduler = RunScheduler(max_concurrent_runs=1)
+    started = []
+    wait_times = {}
+
+    def make_callback(name):
+        async def run_callback(controller: RunController):
+            started.append(name)
+            wait_times[name] = controller.queue_wait_time
+            assert scheduler.active_runs == 1
+            await asyncio.sleep(0.01)
+            controller.append_text(name)
+
+        return run_callback
+
+    async def consume(name, priority):
+        stream = create_run(
+            make_callback(name), scheduler=scheduler, priority=priority
+        )
+        return [chunk.text_delta async for chunk in stream]
+
+    first = asyncio.ensure_future(consume("first", PRIORITY_BATCH))
+    await asyncio.sleep(0)
+    batch = asyncio.ensure_future(consume("batch", PRIORITY_BATCH))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(consume("interactive", PRIORITY_INTERACTIVE))
+    await asyncio.gather(first, batch, interactive)
+
+    assert started == ["first", "interactive", "batch"]
+    assert wait_times["first"] < 0.01
+    assert wait_times["batch"] >= 0.02
+    assert scheduler.active_runs == 0
+    assert scheduler.max_wait_time >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_when_queue_is_full():
+    """Test that runs are rejected once max_queued_runs are waiting."""
+    scheduler = RunScheduler(max_concurrent_runs=1, max_queued_runs=0)
+    await scheduler.acquire()
+
+    with pytest.raises(RunRejectedError):
+        await scheduler.acquire()
+
+    scheduler.release()
+    assert scheduler.active_runs == 0
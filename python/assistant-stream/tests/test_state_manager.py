@@ -0,0 +1,401 @@
+import copy
+import json
+import random
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.state_manager import (
+    StateManager,
+    compact_operations,
+    diff_operations,
+)
+
+
+def make_manager(state):
+    chunks = []
+    return StateManager(chunks.append, state), chunks
+
+
+@pytest.mark.asyncio
+async def test_nested_updates_do_not_copy_containers():
+    """Test that updates modify the containers along the path in place."""
+    messages = [{"content": ""} for _ in range(1000)]
+    state = {"messages": messages}
+    manager, _ = make_manager(state)
+
+    manager.state["messages"][500]["content"] += "Hel"
+    manager.state["messages"][500]["content"] += "lo"
+
+    assert manager.state_data is state
+    assert state["messages"] is messages
+    assert messages[500] == {"content": "Hello"}
+
+
+@pytest.mark.asyncio
+async def test_augmented_assignment_adds_single_operation():
+    """Test that += adds its operation once and keeps the value a string."""
+    manager, _ = make_manager({"text": "a", "items": [1]})
+
+    manager.state["text"] += "b"
+    manager.state["items"] += [2, 3]
+
+    assert manager.state_data == {"text": "ab", "items": [1, 2, 3]}
+    assert [op["type"] for op in manager._pending_operations] == [
+        "append-text",
+        "set",
+        "set",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_augmented_assignment_operations_are_sent():
+    """Test the operations sent for += on a string."""
+    async def run_callback(controller: RunController):
+        controller.state["text"] += " world"
+
+    chunks = [
+        chunk
+        async for chunk in create_run(run_callback, state={"text": "hello"})
+        if chunk.type == "update-state"
+    ]
+
+    assert [op for chunk in chunks for op in chunk.operations] == [
+        {"type": "append-text", "path": ["text"], "value": " world"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_assigned_values_are_copied():
+    """Test that state does not share containers with callers or operations."""
+    manager, _ = make_manager({})
+    value = {"content": ""}
+
+    manager.state["message"] = value
+    manager.state["message"]["content"] += "changed"
+
+    assert value == {"content": ""}
+    assert manager._pending_operations[0]["value"] == {"content": ""}
+
+    manager.state["copy"] = manager.state["message"]
+    manager.state["copy"]["content"] += "!"
+
+    assert manager.state_data["message"] == {"content": "changed"}
+    assert manager.state_data["copy"] == {"content": "changed!"}
+
+
+@pytest.mark.asyncio
+async def test_nested_null_becomes_object():
+    """Test that setting a key below a null value creates an object."""
+    manager, _ = make_manager({"user": None})
+
+    manager.add_operations([{"type": "set", "path": ["user", "name"], "value": "Ada"}])
+
+    assert manager.state_data == {"user": {"name": "Ada"}}
+
+
+@pytest.mark.asyncio
+async def test_invalid_paths_raise_key_error():
+    """Test that missing parents and out of range indices raise KeyError."""
+    manager, _ = make_manager({"items": [1], "text": "a"})
+
+    for path in (["missing", "key"], ["items", "2"], ["items", "1", "x"], ["text", "x"]):
+        with pytest.raises(KeyError):
+            manager.add_operations([{"type": "set", "path": path, "value": 1}])
+
+
+@pytest.mark.asyncio
+async def test_appended_text_is_joined_when_read():
+    """Test that appended text is kept in pieces until the string is read."""
+    manager, _ = make_manager({"draft": ""})
+
+    for token in ("a", "b", "c"):
+        manager.state["draft"] += token
+
+    assert manager._text_appends == {("draft",): ["a", "b", "c"]}
+    assert manager._state_data == {"draft": ""}
+    assert str(manager.state["draft"]) == "abc"
+    assert manager._text_appends == {}
+    assert manager.state_data == {"draft": "abc"}
+
+
+@pytest.mark.asyncio
+async def test_set_discards_appended_text():
+    """Test that replacing a string drops the text appended to it."""
+    manager, _ = make_manager({"doc": {"draft": ""}})
+
+    manager.state["doc"]["draft"] += "a"
+    manager.state["doc"]["draft"] += "b"
+    manager.state["doc"] = {"draft": "new"}
+    manager.state["doc"]["draft"] += "!"
+
+    assert manager.state_data == {"doc": {"draft": "new!"}}
+
+
+@pytest.mark.asyncio
+async def test_appended_text_is_in_final_state():
+    """Test that the caller's state holds the full text after the run."""
+    state = {"draft": ""}
+
+    async def run_callback(controller: RunController):
+        for i in range(100):
+            controller.state["draft"] += f"{i} "
+
+    async for _ in create_run(run_callback, state=state):
+        pass
+
+    assert state["draft"] == "".join(f"{i} " for i in range(100))
+
+
+def test_compaction_merges_and_drops_operations():
+    """Test the operations kept by compact_operations."""
+    operations = [
+        {"type": "set", "path": ["stats", "visits"], "value": 1},
+        {"type": "set", "path": ["text"], "value": ""},
+        {"type": "set", "path": ["stats", "visits"], "value": 2},
+        {"type": "append-text", "path": ["text"], "value": "Hel"},
+        {"type": "append-text", "path": ["reasoning"], "value": "a"},
+        {"type": "append-text", "path": ["text"], "value": "lo"},
+        {"type": "append-text", "path": ["reasoning"], "value": "b"},
+        {"type": "set", "path": ["doc", "title"], "value": "x"},
+        {"type": "set", "path": ["doc"], "value": {"title": "y"}},
+    ]
+
+    assert compact_operations(operations) == [
+        {"type": "set", "path": ["stats", "visits"], "value": 2},
+        {"type": "set", "path": ["text"], "value": "Hello"},
+        {"type": "append-text", "path": ["reasoning"], "value": "ab"},
+        {"type": "set", "path": ["doc"], "value": {"title": "y"}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_key_order():
+    """Test that a set after a set of None keeps the key order."""
+    operations = [
+        {"type": "set", "path": ["a"], "value": None},
+        {"type": "set", "path": ["b"], "value": 1},
+        {"type": "set", "path": ["a"], "value": 2},
+    ]
+
+    compacted = compact_operations(operations)
+    expected = StateManager(lambda _: None, {})
+    expected.apply_remote_operations(operations)
+    actual = StateManager(lambda _: None, {})
+    actual.apply_remote_operations(compacted)
+
+    assert compacted == operations[1:]
+    assert list(actual.state_data) == list(expected.state_data) == ["b", "a"]
+
+
+def random_operations(rng, state, count):
+    """Valid operations on state, applied to it as they are generated."""
+    operations = []
+
+    def paths(value, path):
+        yield path, value
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield from paths(item, path + [key])
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                yield from paths(item, path + [str(index)])
+
+    def random_value():
+        return rng.choice(["", "x", 1, None, {"a": ""}, {"b": [""]}, [], [""]])
+
+    for _ in range(count):
+        path, value = rng.choice(list(paths(state, [])))
+        if isinstance(value, str) and rng.random() < 0.6:
+            operation = {"type": "append-text", "path": path, "value": rng.choice("abc")}
+        elif isinstance(value, dict) and rng.random() < 0.5:
+            key = rng.choice("abcd")
+            operation = {"type": "set", "path": path + [key], "value": random_value()}
+        elif isinstance(value, list) and rng.random() < 0.5:
+            operation = {
+                "type": "set",
+                "path": path + [str(len(value))],
+                "value": random_value(),
+            }
+        elif path:
+            operation = {"type": "set", "path": path, "value": random_value()}
+        else:
+            continue
+        manager = StateManager(lambda _: None, state)
+        manager.apply_remote_operations([operation])
+        state = manager.state_data
+        operations.append(operation)
+    return operations
+
+
+@pytest.mark.asyncio
+async def test_compaction_preserves_state():
+    """Test that compacted operations produce the same state."""
+    rng = random.Random(0)
+    for _ in range(300):
+        initial = {"text": "", "items": [], "doc": {"a": ""}}
+        operations = random_operations(rng, copy.deepcopy(initial), 30)
+        compacted = compact_operations(operations)
+
+        expected = StateManager(lambda _: None, copy.deepcopy(initial))
+        expected.apply_remote_operations(operations)
+        actual = StateManager(lambda _: None, copy.deepcopy(initial))
+        actual.apply_remote_operations(compacted)
+
+        assert json.dumps(actual.state_data) == json.dumps(expected.state_data)
+        assert len(compacted) <= len(operations)
+
+
+def test_diff_operations():
+    """Test the operations produced for typical changes."""
+    old = {
+        "messages": [{"content": "Hel", "id": "1", "meta": "m" * 200}],
+        "stats": {"steps": 1, "notes": "n" * 200},
+        "items": [1, 2, 3],
+        "body": "b" * 500,
+    }
+    new = {
+        "messages": [
+            {"content": "Hello", "id": "1", "meta": "m" * 200},
+            {"content": "", "id": "2"},
+        ],
+        "stats": {"steps": 2, "notes": "n" * 200},
+        "items": [1, 2],
+        "body": "b" * 500,
+        "done": False,
+    }
+
+    assert diff_operations([], old, new) == [
+        {"type": "append-text", "path": ["messages", "0", "content"], "value": "lo"},
+        {"type": "set", "path": ["messages", "1"], "value": {"content": "", "id": "2"}},
+        {"type": "set", "path": ["stats", "steps"], "value": 2},
+        # Items were removed
+        {"type": "set", "path": ["items"], "value": [1, 2]},
+        {"type": "set", "path": ["done"], "value": False},
+    ]
+    assert diff_operations(["graph"], old, old) == []
+
+
+def test_diff_falls_back_to_whole_value():
+    """Test that a value is set as a whole when its changes are larger."""
+    old = {"a": "x", "b": "y", "c": "z"}
+    new = {"a": "1", "b": "2", "c": "3"}
+
+    assert diff_operations(["small"], old, new) == [
+        {"type": "set", "path": ["small"], "value": new}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_diff_compares_types_at_any_depth():
+    """Test that int to bool and int to float changes are sent in containers."""
+    notes = "n" * 200
+    cases = [
+        ([1], [True]),
+        ([1], [1.0]),
+        ({"a": [1], "notes": notes}, {"a": [True], "notes": notes}),
+        ({"a": [1], "notes": notes}, {"a": [1.0], "notes": notes}),
+    ]
+    for old, new in cases:
+        operations = diff_operations(["value"], old, new)
+        manager = StateManager(lambda _: None, {"value": copy.deepcopy(old)})
+        manager.apply_remote_operations(operations)
+
+        assert operations
+        value = manager.state_data["value"]
+        leaf = value[0] if isinstance(value, list) else value["a"][0]
+        assert type(leaf) is type(new[0] if isinstance(new, list) else new["a"][0])
+
+    # Large siblings make a nested operation smaller than the whole value
+    assert diff_operations(
+        ["value"], {"a": [1], "notes": notes}, {"a": [True], "notes": notes}
+    ) == [{"type": "set", "path": ["value", "a"], "value": [True]}]
+
+
+def random_change(rng, value):
+    if isinstance(value, dict):
+        value = dict(value)
+        key = rng.choice(list(value) + ["new"])
+        if key in value and rng.random() < 0.8:
+            value[key] = random_change(rng, value[key])
+        elif rng.random() < 0.8:
+            value[key] = rng.choice(["", "text", 1, None, [1], {"x": ""}])
+        else:
+            value.pop(key, None)
+        return value
+    if isinstance(value, list):
+        value = list(value)
+        roll = rng.random()
+        if value and roll < 0.6:
+            index = rng.randrange(len(value))
+            value[index] = random_change(rng, value[index])
+        elif roll < 0.9:
+            value.append(rng.choice(["", 2, {"x": "a"}, None]))
+        elif value:
+            value.pop()
+        return value
+    if isinstance(value, str) and rng.random() < 0.7:
+        return value + rng.choice(["a", "bc"])
+    return rng.choice(["", "text", 1, 2.5, True, None, [], {"y": "z"}])
+
+
+@pytest.mark.asyncio
+async def test_diff_operations_produce_new_value():
+    """Test that applying the diff of random changes gives the new value."""
+    rng = random.Random(0)
+    old = {"messages": [{"content": "", "id": "1"}], "meta": {"step": 0}}
+    for _ in range(500):
+        new = old
+        for _ in range(rng.randint(1, 4)):
+            new = random_change(rng, new)
+
+        manager = StateManager(lambda _: None, {"graph": copy.deepcopy(old)})
+        manager.apply_remote_operations(diff_operations(["graph"], old, new))
+
+        assert manager.state_data == {"graph": new}
+        old = new
+
+
+@pytest.mark.asyncio
+async def test_diff_state_sends_changed_parts():
+    """Test that diff_state turns assignments into small operations."""
+    documents = [{"id": i, "text": "x" * 100} for i in range(50)]
+
+    async def run_callback(controller: RunController):
+        controller.state = {"documents": documents, "step": 1}
+        controller.state = {"documents": documents, "step": 2}
+        controller.state["documents"] = documents + [{"id": 50, "text": ""}]
+
+    chunks = [
+        chunk
+        async for chunk in create_run(
+            run_callback, state={"documents": documents}, diff_state=True
+        )
+        if chunk.type == "update-state"
+    ]
+
+    assert [op for chunk in chunks for op in chunk.operations] == [
+        {"type": "set", "path": ["step"], "value": 2},
+        {"type": "set", "path": ["documents", "50"], "value": {"id": 50, "text": ""}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_proxy_assign_diff():
+    """Test assigning a key through StateProxy.assign_diff."""
+    notes = "n" * 200
+    manager, _ = make_manager({"graph": {"answer": "The", "sources": [], "notes": notes}})
+
+    manager.state.assign_diff(
+        "graph", {"answer": "The end", "sources": ["a"], "notes": notes}
+    )
+    manager.state.assign_diff("new", {"x": 1})
+
+    assert manager._pending_operations == [
+        {"type": "append-text", "path": ["graph", "answer"], "value": " end"},
+        # Smaller than setting the item
+        {"type": "set", "path": ["graph", "sources"], "value": ["a"]},
+        {"type": "set", "path": ["new"], "value": {"x": 1}},
+    ]
+    assert manager.state_data == {
+        "graph": {"answer": "The end", "sources": ["a"], "notes": notes},
+        "new": {"x": 1},
+    }
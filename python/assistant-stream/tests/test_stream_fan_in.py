@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.assistant_stream_chunk import TextDeltaChunk
+
+
+async def substream(name, count, delay=0.0, fail_at=None):
+    for i in range(count):
+        if i == fail_at:
+            raise RuntimeError(f"{name} failed")
+        await asyncio.sleep(delay)
+        yield TextDeltaChunk(text_delta=f"{name}{i}")
+
+
+@pytest.mark.asyncio
+async def test_substreams_respect_concurrency_limit():
+    """Test that only max_concurrent_streams substreams are read at once."""
+    active = 0
+    max_active = 0
+
+    async def tracked(name):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        try:
+            async for chunk in substream(name, 3, delay=0.001):
+                yield chunk
+        finally:
+            active -= 1
+
+    async def run_callback(controller: RunController):
+        for name in "abcde":
+            controller.add_stream(tracked(name))
+
+    chunks = [
+        chunk async for chunk in create_run(run_callback, max_concurrent_streams=2)
+    ]
+
+    assert len(chunks) == 15
+    assert max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_substreams_interleave_fairly():
+    """Test that substreams producing without suspending still interleave."""
+
+    async def run_callback(controller: RunController):
+        controller.add_stream(substream("a", 3))
+        controller.add_stream(substream("b", 3))
+
+    chunks = [chunk.text_delta async for chunk in create_run(run_callback)]
+
+    assert chunks == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+
+@pytest.mark.asyncio
+async def test_substream_error_cancels_siblings_and_callback():
+    """Test that a failing substream promptly stops the run."""
+    callback_cancelled = False
+
+    async def run_callback(controller: RunController):
+        nonlocal callback_cancelled
+        controller.add_stream(substream("ok", 100, delay=0.01))
+        controller.add_stream(substream("bad", 3, fail_at=1))
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            callback_cancelled = True
+            raise
+
+    chunks = []
+    with pytest.raises(RuntimeError, match="bad failed"):
+        async for chunk in create_run(run_callback):
+            chunks.append(chunk)
+
+    assert callback_cancelled
+    assert chunks[-1].type == "error"
+    assert len(chunks) < 10
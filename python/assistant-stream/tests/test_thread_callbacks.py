@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from assistant_stream import create_run, ThreadRunController
+from assistant_stream.assistant_stream_chunk import TextDeltaChunk
+
+
+@pytest.mark.asyncio
+async def test_sync_callback_runs_in_executor():
+    """Test that a plain function runs off the loop and its chunks arrive in order."""
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def run_callback(controller: ThreadRunController):
+        threads.append(threading.get_ident())
+        controller.append_text("Hello")
+        controller.state["messages"] = ["a"]
+        controller.state["messages"].append("b")
+        tool = controller.add_tool_call("search", "call_1")
+        tool.append_args_text('{"q": 1}')
+        tool.set_response("found")
+        controller.add_data({"done": True})
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        chunks = [
+            chunk
+            async for chunk in create_run(
+                run_callback, state={}, executor=executor
+            )
+        ]
+
+    assert threads and threads[0] != loop_thread
+    types = [chunk.type for chunk in chunks]
+    assert types[0] == "text-delta"
+    assert types.index("update-state") < types.index("tool-call-begin")
+    assert types.index("tool-call-begin") < types.index("tool-call-delta")
+    assert types.index("tool-call-delta") < types.index("tool-result")
+    assert "data" in types
+    operations = [
+        op for chunk in chunks if chunk.type == "update-state" for op in chunk.operations
+    ]
+    assert operations[-1] == {"type": "set", "path": ["messages", "1"], "value": "b"}
+
+
+@pytest.mark.asyncio
+async def test_sync_callback_uses_default_executor_and_substreams():
+    """Test that run_in_thread uses the default executor."""
+
+    async def substream():
+        yield TextDeltaChunk(text_delta="sub")
+
+    def run_callback(controller: ThreadRunController):
+        controller.add_stream(substream())
+        controller.with_parent_id("p1").append_text("nested")
+
+    chunks = [chunk async for chunk in create_run(run_callback, run_in_thread=True)]
+    assert sorted(chunk.text_delta for chunk in chunks) == ["nested", "sub"]
+    assert [chunk.parent_id for chunk in chunks if chunk.text_delta == "nested"] == [
+        "p1"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sync_callback_blocks_on_full_buffer_and_sees_cancellation():
+    """Test that a bounded buffer blocks the thread and cancellation releases it."""
+    produced = []
+    finished = threading.Event()
+
+    def run_callback(controller: ThreadRunController):
+        while not controller.cancelled:
+            controller.append_text("token")
+            produced.append(1)
+        finished.set()
+
+    stream = create_run(run_callback, max_buffered_chunks=5, run_in_thread=True)
+    async for _ in stream:
+        await asyncio.sleep(0.05)
+        break
+    assert len(produced) <= 6
+    await stream.aclose()
+
+    await asyncio.get_running_loop().run_in_executor(None, finished.wait, 1)
+    assert finished.is_set()
+
+
+@pytest.mark.asyncio
+async def test_executor_requires_plain_function():
+    """Test that an async callback cannot be combined with an executor."""
+
+    async def run_callback(controller):
+        pass
+
+    with pytest.raises(TypeError):
+        async for _ in create_run(run_callback, executor=ThreadPoolExecutor()):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_callables_returning_coroutines_run_on_the_loop():
+    """Test that a lambda or sync decorator returning a coroutine is awaited."""
+
+    async def handler(controller, text):
+        controller.append_text(text)
+
+    def decorator(function):
+        def wrapper(controller):
+            return function(controller, "decorated")
+
+        return wrapper
+
+    cases = [(lambda c: handler(c, "hi"), "hi"), (decorator(handler), "decorated")]
+    for callback, text in cases:
+        chunks = [chunk async for chunk in create_run(callback)]
+        assert [chunk.text_delta for chunk in chunks] == [text]
+
+
+@pytest.mark.asyncio
+async def test_thread_callback_returning_coroutine_raises():
+    """Test that thread mode rejects callbacks returning a coroutine."""
+
+    async def handler(controller):
+        pass
+
+    with pytest.raises(TypeError):
+        async for _ in create_run(lambda c: handler(c), run_in_thread=True):
+            pass
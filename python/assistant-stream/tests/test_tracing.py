@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController, RecordingTracer
+from assistant_stream.serialization.data_stream import DataStreamEncoder
+
+
+@pytest.mark.asyncio
+async def test_spans_follow_run_structure():
+    """Test that tool calls, substreams and state flushes are traced."""
+    tracer = RecordingTracer()
+
+    async def chunks():
+        from assistant_stream.assistant_stream_chunk import TextDeltaChunk
+
+        yield TextDeltaChunk(text_delta="sub")
+
+    async def run_callback(controller: RunController):
+        await asyncio.sleep(0.01)
+        controller.append_text("Hello")
+        tool = await controller.add_tool_call("search", "call_1")
+        nested = controller.with_parent_id("call_1")
+        nested.state["query"] = "cats"
+        nested.add_stream(chunks())
+        await asyncio.sleep(0.01)
+        tool.set_response("found")
+
+    stream = create_run(run_callback, state={}, tracer=tracer)
+    async for _ in DataStreamEncoder(tracer=tracer).encode_stream(stream):
+        pass
+
+    [run] = tracer.find("assistant_stream.run")
+    [tool] = tracer.find("assistant_stream.tool_call")
+    [substream_span] = tracer.find("assistant_stream.substream")
+    [flush] = tracer.find("assistant_stream.state_flush")
+    [encode] = tracer.find("assistant_stream.encode")
+
+    assert all(span.end_time is not None for span in tracer.spans)
+    assert tool.parent is run
+    assert tool.attributes["tool_name"] == "search"
+    assert tool.duration >= 0.01
+    assert substream_span.parent is tool
+    assert flush.parent is run
+    assert flush.attributes["operations"] == 1
+    assert encode.parent is None
+    assert encode.attributes["chunks"] > 0
+
+    [(name, first_chunk_at, _)] = run.events
+    assert name == "first_chunk"
+    assert first_chunk_at - run.start_time >= 0.01
+
+
+@pytest.mark.asyncio
+async def test_spans_record_failures_and_cancellation():
+    """Test that failed substreams and cancelled runs are marked on their spans."""
+    tracer = RecordingTracer()
+
+    async def failing():
+        raise ValueError("boom")
+        yield  # pragma: no cover
+
+    async def run_callback(controller: RunController):
+        controller.add_stream(failing())
+        await asyncio.sleep(1)
+
+    with pytest.raises(ValueError):
+        async for _ in create_run(run_callback, tracer=tracer):
+            pass
+
+    [substream] = tracer.find("assistant_stream.substream")
+    assert isinstance(substream.exception, ValueError)
+
+    tracer = RecordingTracer()
+
+    async def endless(controller: RunController):
+        while True:
+            controller.append_text("token")
+            await asyncio.sleep(0.001)
+
+    stream = create_run(endless, tracer=tracer)
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    [run] = tracer.find("assistant_stream.run")
+    assert run.attributes["cancelled"] is True
+    assert run.end_time is not None
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from assistant_stream import create_run, RunController
+from assistant_stream.serialization import DataStreamResponse
+
+
+async def run_response(response):
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.0"}}
+    await response(scope, receive, send)
+    return [message for message in sent if message["type"] == "http.response.body"]
+
+
+async def tokens(controller: RunController):
+    for i in range(200):
+        controller.append_text(f"token {i} ")
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_coalescing_sends_fewer_messages_with_same_body():
+    """Test that coalesced frames produce the same body in fewer sends."""
+    plain = await run_response(DataStreamResponse(create_run(tokens)))
+    coalesced = await run_response(
+        DataStreamResponse(create_run(tokens), flush_size=4096, flush_interval=1)
+    )
+
+    assert b"".join(m["body"] for m in coalesced) == b"".join(
+        m["body"] for m in plain
+    )
+    assert len(coalesced) < len(plain) / 10
+    assert not coalesced[-1]["more_body"]
+
+
+@pytest.mark.asyncio
+async def test_first_frame_is_sent_immediately():
+    """Test that the first frame does not wait for the buffer to fill."""
+    first_sent = asyncio.Event()
+    sent = []
+
+    async def callback(controller: RunController):
+        controller.append_text("Hello")
+        await asyncio.wait_for(first_sent.wait(), 1)
+        controller.append_text(" world")
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body"):
+            first_sent.set()
+
+    response = DataStreamResponse(
+        create_run(callback), flush_size=4096, flush_interval=10
+    )
+    await response({"type": "http", "asgi": {"spec_version": "2.0"}}, receive, send)
+
+    bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+    assert bodies == [b'0:"Hello"\n', b'0:" world"\n']
+
+
+@pytest.mark.asyncio
+async def test_timer_flushes_buffered_frames():
+    """Test that buffered frames are sent after the flush interval."""
+    flushed = asyncio.Event()
+    sent = []
+
+    async def callback(controller: RunController):
+        controller.append_text("a")
+        await asyncio.sleep(0.01)
+        controller.append_text("b")
+        # Only the timer can send "b" before the run ends
+        await asyncio.wait_for(flushed.wait(), 1)
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+        if b"b" in message.get("body", b""):
+            flushed.set()
+
+    response = DataStreamResponse(
+        create_run(callback), flush_size=4096, flush_interval=0.01
+    )
+    await response({"type": "http", "asgi": {"spec_version": "2.0"}}, receive, send)
+
+    assert flushed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_tool_result_is_a_flush_point():
+    """Test that a tool result is sent without waiting for the timer."""
+    sent = []
+    flushed = asyncio.Event()
+
+    async def callback(controller: RunController):
+        controller.append_text("start")
+        await asyncio.sleep(0.01)
+        controller.append_text("buffered")
+        controller.add_tool_result("call-1", {"ok": True})
+        await asyncio.wait_for(flushed.wait(), 1)
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body", b"").startswith(b'0:"buffered"'):
+            flushed.set()
+
+    response = DataStreamResponse(
+        create_run(callback), flush_size=4096, flush_interval=10
+    )
+    await response({"type": "http", "asgi": {"spec_version": "2.0"}}, receive, send)
+
+    bodies = [m["body"] for m in sent if m.get("body")]
+    assert bodies[1] == b'0:"buffered"\na:{"toolCallId": "call-1", "result": {"ok": true}}\n'
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_coalesced_run():
+    """Test that a disconnect stops the run when writes are coalesced."""
+    cancelled = asyncio.Event()
+
+    async def callback(controller: RunController):
+        while True:
+            controller.append_text("token")
+            try:
+                await asyncio.sleep(0.001)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    response = DataStreamResponse(
+        create_run(callback), flush_size=64, flush_interval=0.005
+    )
+    await response({"type": "http", "asgi": {"spec_version": "2.0"}}, receive, send)
+
+    assert cancelled.is_set()
@@ -1,4 +1,5 @@
 from .client import AssistantClient, ThreadClient
+from .json_backend import JSONBackend, OrjsonBackend, get_json_backend, set_json_backend
 from .types import (
     Message,
     TextPart,
@@ -17,6 +18,10 @@ from .types import (
 __all__ = [
     "AssistantClient",
     "ThreadClient",
+    "JSONBackend",
+    "OrjsonBackend",
+    "get_json_backend",
+    "set_json_backend",
     "Message",
     "SystemMessage",
     "UserMessage",
@@ -1,5 +1,6 @@
 from typing import Dict, List, Any, Optional, Union, Callable, Awaitable
 import httpx
+from .json_backend import JSONBackend, get_json_backend
 from .types import Message, Tool
 
 
@@ -149,6 +150,7 @@ class AssistantClient:
         base_url: str,
         headers: Optional[Union[Dict[str, str], Callable[[], Union[Dict[str, str], Awaitable[Dict[str, str]]]]]] = None,
         timeout: Optional[float] = None,
+        json_backend: Optional[JSONBackend] = None,
         **kwargs: Any
     ):
         """
@@ -158,12 +160,15 @@ class AssistantClient:
             base_url: Base URL for the API (e.g., "https://api.example.com")
             headers: Optional headers to include with requests
             timeout: Optional timeout for requests
+            json_backend: Optional JSON backend for request bodies, defaults
+                to get_json_backend()
             **kwargs: Additional arguments passed to httpx client
         """
         self.base_url = base_url.rstrip("/")
         self._headers = headers
         self._timeout = timeout
         self._client_kwargs = kwargs
+        self._json_backend = json_backend
         self._async_client: Optional[httpx.AsyncClient] = None
         self._sync_client: Optional[httpx.Client] = None
     
@@ -239,6 +244,12 @@ class AssistantClient:
             )
         return self._sync_client
     
+    def _encode_body(self, kwargs: Dict[str, Any]) -> None:
+        """Serialize a json= body with the configured JSON backend."""
+        backend = self._json_backend or get_json_backend()
+        if backend is not None and "json" in kwargs:
+            kwargs["content"] = backend.dumps(kwargs.pop("json"))
+    
     async def _make_request(
         self,
         method: str,
@@ -253,6 +264,7 @@ class AssistantClient:
         if "headers" in kwargs:
             headers.update(kwargs["headers"])
         kwargs["headers"] = headers
+        self._encode_body(kwargs)
         
         response = await client.request(method, path, **kwargs)
         
@@ -275,6 +287,7 @@ class AssistantClient:
         if "headers" in kwargs:
             headers.update(kwargs["headers"])
         kwargs["headers"] = headers
+        self._encode_body(kwargs)
         
         response = client.request(method, path, **kwargs)
         
@@ -0,0 +1,108 @@
+# Same API as assistant_stream.serialization.json_backend, keep the two in
+# sync. It is a copy because this package only depends on httpx. The default
+# differs: request bodies are serialized by httpx unless a backend is
+# configured, so existing clients keep sending the same bytes.
+import json
+import os
+from typing import Any, Optional, Union
+
+
+def _default(obj: Any) -> Any:
+    # Unwrap state proxies, e.g. assistant_stream's StateProxy
+    if hasattr(obj, "_get_value"):
+        return obj._get_value()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONBackend:
+    """Serializes request bodies to JSON bytes with the standard library.
+
+    The output matches json.dumps with default settings.
+    """
+
+    name = "json"
+
+    def __init__(self):
+        self._ascii_encoder = json.JSONEncoder(default=_default)
+        self._unicode_encoder = json.JSONEncoder(default=_default, ensure_ascii=False)
+
+    def dumps(self, value: Any, *, ensure_ascii: bool = True) -> bytes:
+        if not ensure_ascii:
+            return self._unicode_encoder.encode(value).encode()
+        return self._ascii_encoder.encode(value).encode()
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonBackend(JSONBackend):
+    """Serializes request bodies with orjson. Requires the orjson package."""
+
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError("OrjsonBackend requires the orjson package") from e
+        super().__init__()
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value: Any, *, ensure_ascii: bool = True) -> bytes:
+        try:
+            return self._orjson.dumps(value, default=_default, option=self._option)
+        except TypeError:
+            # e.g. integers over 64 bits
+            return super().dumps(value, ensure_ascii=ensure_ascii)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._orjson.loads(data)
+
+
+_BACKENDS = {"json": JSONBackend, "orjson": OrjsonBackend}
+_backend: Optional[JSONBackend] = None
+_configured = False
+
+
+def set_json_backend(backend: Optional[Union[str, JSONBackend]]) -> Optional[JSONBackend]:
+    """
+    Set the JSON backend used by clients without their own json_backend.
+
+    Args:
+        backend: "json", "orjson", "auto" (orjson if installed, otherwise
+            json), a JSONBackend instance, or None for the default: the
+            ASSISTANT_UI_JSON_BACKEND environment variable if set, otherwise
+            no backend, letting httpx serialize request bodies
+
+    Returns:
+        The selected backend
+    """
+    global _backend, _configured
+    if backend is None:
+        backend = os.environ.get("ASSISTANT_UI_JSON_BACKEND") or None
+    if isinstance(backend, str):
+        if backend == "auto":
+            try:
+                backend = OrjsonBackend()
+            except ImportError:
+                backend = JSONBackend()
+        elif backend in _BACKENDS:
+            backend = _BACKENDS[backend]()
+        else:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+    _backend = backend
+    _configured = True
+    return backend
+
+
+def get_json_backend() -> Optional[JSONBackend]:
+    """
+    Get the current JSON backend.
+
+    Returns None when request bodies are serialized by httpx, see
+    set_json_backend.
+    """
+    if not _configured:
+        return set_json_backend(None)
+    return _backend
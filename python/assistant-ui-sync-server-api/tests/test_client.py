@@ -1,9 +1,16 @@
 """Tests for the assistant-ui-sync-server-api client."""
 
+import json
 import pytest
 import httpx
 from unittest.mock import AsyncMock, Mock, patch
-from assistant_ui import AssistantClient
+from assistant_ui import (
+    AssistantClient,
+    JSONBackend,
+    OrjsonBackend,
+    get_json_backend,
+    set_json_backend,
+)
 from assistant_ui.types import Message
 
 
@@ -327,4 +334,71 @@ async def test_all_parameters():
         assert payload["state"] == {"session": "abc"}
         assert payload["custom_field"] == "custom_value"
     
-    await client.close()
\ No newline at end of file
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_json_backend_serializes_body():
+    """Test a configured JSON backend replaces httpx's serializer."""
+    class Proxy:
+        def _get_value(self):
+            return {"count": 1}
+
+    client = AssistantClient(
+        base_url="https://api.example.com", json_backend=JSONBackend()
+    )
+    
+    mock_response = AsyncMock()
+    mock_response.is_success = True
+    mock_response.status_code = 200
+    
+    with patch.object(client, "_ensure_async_client") as mock_ensure:
+        mock_client = AsyncMock()
+        mock_client.request = AsyncMock(return_value=mock_response)
+        mock_ensure.return_value = mock_client
+        
+        thread = client.threads("thread-json")
+        await thread.chat(messages=[], state=Proxy())
+        
+        call_args = mock_client.request.call_args
+        assert "json" not in call_args[1]
+        assert json.loads(call_args[1]["content"]) == {
+            "threadId": "thread-json",
+            "messages": [],
+            "state": {"count": 1},
+        }
+    
+    await client.close()
+
+
+def test_json_backend_orjson_matches_stdlib():
+    """Test the orjson backend produces the same values as the stdlib one."""
+    pytest.importorskip("orjson")
+    payload = {"threadId": "t", "messages": [{"role": "user", "content": "héllo"}]}
+    assert json.loads(OrjsonBackend().dumps(payload)) == json.loads(
+        JSONBackend().dumps(payload)
+    )
+
+
+def test_json_backend_api(monkeypatch):
+    """Test backend selection, which matches assistant_stream's API."""
+    from assistant_ui import json_backend
+
+    monkeypatch.setattr(json_backend, "_configured", False)
+    monkeypatch.setattr(json_backend, "_backend", None)
+    monkeypatch.delenv("ASSISTANT_UI_JSON_BACKEND", raising=False)
+    # Request bodies are left to httpx by default
+    assert get_json_backend() is None
+
+    monkeypatch.setenv("ASSISTANT_UI_JSON_BACKEND", "json")
+    assert type(set_json_backend(None)) is JSONBackend
+    assert type(set_json_backend("json")) is JSONBackend
+    with pytest.raises(ValueError):
+        set_json_backend("yaml")
+
+    backend = JSONBackend()
+    for value in ["ä\n", {"a": [1, None, 2.5]}]:
+        assert backend.dumps(value) == json.dumps(value).encode()
+        assert (
+            backend.dumps(value, ensure_ascii=False)
+            == json.dumps(value, ensure_ascii=False).encode()
+        )